@@ -0,0 +1,249 @@
+# admission.py
+# Admission control in front of the database pool.
+#
+# Every request that may touch the database needs a slot before it runs.
+# There are ADMISSION_LIMIT slots, by default one per connection the primary
+# pool can open (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW on MySQL), so admitted requests
+# never wait on a pool checkout and a burst queues here, in priority order,
+# instead of in the threadpool and the pool all at once.
+#
+# Requests are sorted into groups by path and method, highest priority first:
+#
+#   clinical  writes to appointments, lab reports and medical records; the
+#             only group allowed the last ADMISSION_CLINICAL_RESERVE slots
+#   writes    every other write
+#   reads     lists, lookups, search
+#   reports   reports, dashboards, exports and bulk imports
+#
+# Lower groups are also capped at a share of the slots. A request that cannot
+# start waits in its group's queue (at most ADMISSION_QUEUE_SIZE deep) until
+# its group's deadline; when it is full or the deadline passes, it gets 503
+# with Retry-After straight away, before holding a thread or a connection.
+#
+# Health, metrics, docs, the live queue stream and the in-memory stats are
+# never queued. Each worker process admits on its own.
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from starlette.responses import JSONResponse
+
+import metrics
+from database import pool_capacity
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") not in ("0", "false", "False")
+ADMISSION_LIMIT = int(os.getenv("ADMISSION_LIMIT", str(pool_capacity() or 30)))
+ADMISSION_CLINICAL_RESERVE = int(os.getenv("ADMISSION_CLINICAL_RESERVE", str(max(1, ADMISSION_LIMIT // 5))))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "50"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+ACTIVE = metrics.Gauge("hms_admission_active", "Requests holding an admission slot.", ("group",))
+QUEUED = metrics.Gauge("hms_admission_queue_depth", "Requests waiting for an admission slot.", ("group",))
+SHED = metrics.Counter("hms_admission_shed_total", "Requests refused with 503 by admission control.", ("group", "reason"))
+WAIT_SECONDS = metrics.Histogram(
+    "hms_admission_wait_seconds", "Time admitted requests spent queued.", ("group",), WAIT_BUCKETS
+)
+
+
+class Group:
+    """A class of requests: its `priority` (0 is highest), share of the slots and how long it may queue."""
+
+    def __init__(self, name: str, priority: int, share: float, queue_seconds: float):
+        self.name = name
+        self.priority = priority
+        self.share = share
+        self.queue_seconds = queue_seconds
+
+
+GROUPS = [
+    Group("clinical", 0, 1.0, 5.0),
+    Group("writes", 1, 1.0, 2.0),
+    Group("reads", 2, 0.6, 1.0),
+    Group("reports", 3, 0.25, 0.5),
+]
+BY_NAME = {group.name: group for group in GROUPS}
+
+_READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# First match wins: (methods or None for any, path pattern, group or None to
+# skip admission); anything else is "writes"
+RULES = [
+    (None, re.compile(r"^/(health|metrics|docs|redoc|openapi\.json)(/|$)|^/$"), None),
+    (None, re.compile(r"^/appointments/stream$"), None),
+    (None, re.compile(r"^/stats/(db-pool|cache|live|admission)$"), None),
+    (None, re.compile(r"^/(reports|stats)(/|$)|/export$|/bulk(/csv)?$"), "reports"),
+    (("POST",), re.compile(r"^/patients/match$"), "reads"),
+    (_READ_METHODS, re.compile(r""), "reads"),
+    (None, re.compile(r"^/(appointments|lab/reports|records)(/|$)"), "clinical"),
+]
+
+
+def classify(method: str, path: str):
+    """Group name for a request, or None if it is not admission-controlled."""
+    for methods, pattern, group in RULES:
+        if (methods is None or method in methods) and pattern.search(path):
+            return group
+    return "writes"
+
+
+# ------------ CONTROLLER ------------
+class AdmissionController:
+    """
+    Slots and per-group FIFO queues. State is guarded by a lock and waiters
+    are woken on their own event loop, so it is safe across threads.
+    """
+
+    def __init__(self, limit: int = ADMISSION_LIMIT, reserve: int = ADMISSION_CLINICAL_RESERVE,
+                 queue_size: int = ADMISSION_QUEUE_SIZE, groups=GROUPS):
+        self.limit = max(1, limit)
+        self.reserve = min(max(0, reserve), self.limit - 1)
+        self.queue_size = queue_size
+        self.groups = sorted(groups, key=lambda group: group.priority)
+        self.caps = {group.name: max(1, round(self.limit * group.share)) for group in self.groups}
+        self.active = 0
+        self.active_by = {group.name: 0 for group in self.groups}
+        self.waiting = {group.name: deque() for group in self.groups}
+        self.admitted = {group.name: 0 for group in self.groups}
+        self.shed = {group.name: {"queue_full": 0, "timeout": 0} for group in self.groups}
+        self._lock = threading.Lock()
+
+    def _can_start(self, group: Group) -> bool:
+        if self.active >= self.limit:
+            return False
+        # The reserve is kept for the top-priority group
+        if group.priority > self.groups[0].priority and self.active >= self.limit - self.reserve:
+            return False
+        return self.active_by[group.name] < self.caps[group.name]
+
+    def _queued_ahead(self, group: Group) -> bool:
+        return any(self.waiting[other.name] for other in self.groups if other.priority <= group.priority)
+
+    def _start(self, group: Group):
+        self.active += 1
+        self.active_by[group.name] += 1
+        self.admitted[group.name] += 1
+        ACTIVE.inc((group.name,))
+
+    def _shed(self, group: Group, reason: str):
+        self.shed[group.name][reason] += 1
+        SHED.inc((group.name, reason))
+
+    def _dispatch(self):
+        # Highest priority first; a group stuck at its own cap does not hold up the ones below it
+        for group in self.groups:
+            queue = self.waiting[group.name]
+            while queue and self._can_start(group):
+                waiter = queue.popleft()
+                QUEUED.dec((group.name,))
+                self._start(group)
+                waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+            if self.active >= self.limit:
+                return
+
+    async def acquire(self, group: Group) -> bool:
+        """Take a slot for `group`, queueing up to its deadline; False if the request should be shed."""
+        with self._lock:
+            if not self._queued_ahead(group) and self._can_start(group):
+                self._start(group)
+                return True
+            queue = self.waiting[group.name]
+            if len(queue) >= self.queue_size:
+                self._shed(group, "queue_full")
+                return False
+            waiter = asyncio.get_running_loop().create_future()
+            queue.append(waiter)
+            QUEUED.inc((group.name,))
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait({waiter}, timeout=group.queue_seconds)
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot granted meanwhile
+            if not self._withdraw(group, waiter):
+                self.release(group)
+            raise
+        if self._withdraw(group, waiter):
+            with self._lock:
+                self._shed(group, "timeout")
+            return False
+        WAIT_SECONDS.observe((group.name,), time.perf_counter() - started)
+        return True
+
+    def _withdraw(self, group: Group, waiter) -> bool:
+        """Take `waiter` out of its queue; False if it was already granted a slot."""
+        with self._lock:
+            try:
+                self.waiting[group.name].remove(waiter)
+            except ValueError:
+                return False
+            QUEUED.dec((group.name,))
+            return True
+
+    def release(self, group: Group):
+        with self._lock:
+            self.active -= 1
+            self.active_by[group.name] -= 1
+            ACTIVE.dec((group.name,))
+            self._dispatch()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": ADMISSION_CONTROL,
+                "limit": self.limit,
+                "clinical_reserve": self.reserve,
+                "active": self.active,
+                "groups": {
+                    group.name: {
+                        "priority": group.priority,
+                        "cap": self.caps[group.name],
+                        "queue_seconds": group.queue_seconds,
+                        "active": self.active_by[group.name],
+                        "queued": len(self.waiting[group.name]),
+                        "admitted": self.admitted[group.name],
+                        "shed": dict(self.shed[group.name]),
+                    }
+                    for group in self.groups
+                },
+            }
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(True)
+
+
+controller = AdmissionController()
+
+
+# ------------ MIDDLEWARE ------------
+class AdmissionMiddleware:
+    """Pure ASGI middleware holding an admission slot for the whole request, response body included."""
+
+    def __init__(self, app, controller: AdmissionController = controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_CONTROL:
+            return await self.app(scope, receive, send)
+        name = classify(scope["method"], scope["path"])
+        if name is None:
+            return await self.app(scope, receive, send)
+
+        group = BY_NAME[name]
+        if not await self.controller.acquire(group):
+            response = JSONResponse(
+                {"detail": "Server is busy, retry later"}, status_code=503,
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER)},
+            )
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(group)
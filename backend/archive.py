@@ -0,0 +1,181 @@
+# archive.py
+"""
+Hot/archive split for the tables that only ever grow: appointments,
+medical records, bills, pharmacy sales and lab reports.
+
+Closed rows older than the cutoff move from the hot table to its
+"<table>_archive" copy (see models.ARCHIVE_MODELS) in batches: one
+INSERT ... SELECT and one DELETE per batch of ids, each batch in its own
+short transaction. The hot tables and their indexes then stay bounded by the
+retention window instead of growing with the age of the data.
+
+Lists, searches and writes only see the hot tables. Get-by-id, the patient
+timeline and exports also read the archive when asked (`include_archive=true`).
+Rollups are left alone, so reports keep counting archived rows.
+
+    python -m archive run [--older-than-days N] [--tables appointments,billing]
+                          [--batch-size N] [--max-batches N] [--pause SECONDS]
+    python -m archive status
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import DateTime, delete, func, insert, select
+
+from cache import mark_changed
+import models
+from transitions import APPOINTMENT_TRANSITIONS, BILLING_TRANSITIONS, LAB_REPORT_TRANSITIONS
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
+
+def final_statuses(transitions: dict) -> set:
+    """Statuses a row can reach but never leave."""
+    return set().union(*transitions.values()) - set(transitions)
+
+
+class Tier:
+    """
+    Which rows of `hot` may move to its archive table: `timestamp` before
+    the cutoff and, for tables with a status lifecycle, a `closed` status.
+    """
+
+    def __init__(self, hot, timestamp: str, closed=None):
+        self.hot = hot
+        self.archive = models.ARCHIVE_MODELS[hot]
+        self.timestamp = timestamp
+        self.closed = closed
+
+    @property
+    def name(self) -> str:
+        return self.hot.__tablename__
+
+    def eligible(self, cutoff: date):
+        column = getattr(self.hot, self.timestamp)
+        bound = datetime.combine(cutoff, datetime.min.time()) if isinstance(column.type, DateTime) else cutoff
+        conditions = [column < bound]
+        if self.closed is not None:
+            conditions.append(self.hot.status.in_(sorted(self.closed)))
+        return conditions
+
+
+TIERS = [
+    Tier(models.Appointment, "appointment_date", closed=final_statuses(APPOINTMENT_TRANSITIONS)),
+    Tier(models.MedicalRecord, "visit_date"),
+    Tier(models.Billing, "created_at", closed=final_statuses(BILLING_TRANSITIONS)),
+    Tier(models.PharmacySale, "sale_date"),
+    Tier(models.LabReport, "test_date", closed=final_statuses(LAB_REPORT_TRANSITIONS)),
+]
+
+BY_NAME = {tier.name: tier for tier in TIERS}
+
+
+# ------------ READS ------------
+def get_including_archive(db, model, id: str, include_archive: bool):
+    """Row of `model` by id, looked up in its archive too when `include_archive` is set."""
+    obj = db.get(model, id)
+    if obj is None and include_archive:
+        obj = db.get(models.ARCHIVE_MODELS[model], id)
+    return obj
+
+
+# ------------ ARCHIVAL ------------
+def archive_batch(db, tier: Tier, cutoff: date, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move up to `batch_size` of the oldest eligible rows and commit; returns how many moved."""
+    hot = tier.hot.__table__
+    # Rows being written right now are skipped and picked up by the next run
+    ids = db.execute(
+        select(hot.c.id)
+        .where(*tier.eligible(cutoff))
+        .order_by(hot.c[tier.timestamp], hot.c.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        db.rollback()
+        return 0
+
+    names = [column.name for column in hot.columns]
+    db.execute(insert(tier.archive.__table__).from_select(names, select(*hot.columns).where(hot.c.id.in_(ids))))
+    db.execute(delete(hot).where(hot.c.id.in_(ids)))
+    mark_changed(db, hot.name, tier.archive.__table__.name)
+    db.commit()
+    return len(ids)
+
+
+def run(session_factory, tiers=TIERS, cutoff: date = None, batch_size: int = ARCHIVE_BATCH_SIZE,
+        max_batches: int = None, pause: float = 0.0, log=print) -> dict:
+    """
+    Archive every tier up to `cutoff` (default: ARCHIVE_AFTER_DAYS ago).
+    `max_batches` caps the batches per table and `pause` sleeps between
+    batches, to spread the work of a first run over several runs.
+    """
+    cutoff = cutoff or date.today() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    moved = {}
+    for tier in tiers:
+        moved[tier.name] = batches = 0
+        while max_batches is None or batches < max_batches:
+            with session_factory() as db:
+                count = archive_batch(db, tier, cutoff, batch_size)
+            if not count:
+                break
+            moved[tier.name] += count
+            batches += 1
+            log(f"{tier.name}: archived {moved[tier.name]} rows older than {cutoff}")
+            if pause:
+                time.sleep(pause)
+    return moved
+
+
+def status(db) -> list:
+    """Hot and archived row counts per table, with the oldest hot row."""
+    rows = []
+    for tier in TIERS:
+        count, oldest = db.execute(
+            select(func.count(tier.hot.id), func.min(getattr(tier.hot, tier.timestamp)))
+        ).one()
+        archived = db.execute(select(func.count(tier.archive.id))).scalar()
+        rows.append({"table": tier.name, "hot": count, "archived": archived, "oldest_hot": oldest})
+    return rows
+
+
+def main(argv):
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m archive", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="move closed rows past the cutoff to the archive tables")
+    run_parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    run_parser.add_argument("--tables", help=f"comma-separated, default all: {','.join(BY_NAME)}")
+    run_parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    run_parser.add_argument("--max-batches", type=int, help="per table (default: until done)")
+    run_parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    commands.add_parser("status", help="hot and archived row counts")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        with SessionLocal() as db:
+            for row in status(db):
+                print(f"{row['table']:<16} hot {row['hot']:>10}  archived {row['archived']:>10}  oldest hot {row['oldest_hot']}")
+        return 0
+
+    names = args.tables.split(",") if args.tables else list(BY_NAME)
+    unknown = set(names) - set(BY_NAME)
+    if unknown:
+        parser.error(f"unknown table: {', '.join(sorted(unknown))}")
+    moved = run(
+        SessionLocal, [BY_NAME[name] for name in names],
+        cutoff=date.today() - timedelta(days=args.older_than_days),
+        batch_size=args.batch_size, max_batches=args.max_batches, pause=args.pause,
+    )
+    print(", ".join(f"{name}: {count}" for name, count in moved.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,77 @@
+# availability.py
+# Slot arithmetic for doctor availability and booking validation.
+#
+# A doctor's day is split into fixed-length slots between work_start and
+# work_end. Booked appointments are kept as a sorted list of start minutes,
+# so checking a slot for overlap is a binary search instead of a scan.
+from bisect import bisect_left
+from datetime import date, datetime, time
+from typing import Iterable, Optional
+
+
+def _minutes(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def _time(minutes: int) -> time:
+    return time(minutes // 60, minutes % 60)
+
+
+def slot_starts(work_start: time, work_end: time, slot_minutes: int) -> list:
+    if slot_minutes <= 0:
+        return []
+    start, end = _minutes(work_start), _minutes(work_end)
+    return [_time(m) for m in range(start, end - slot_minutes + 1, slot_minutes)]
+
+
+def is_slot_start(t: time, work_start: time, work_end: time, slot_minutes: int) -> bool:
+    if slot_minutes <= 0:
+        return False
+    m = _minutes(t)
+    start, end = _minutes(work_start), _minutes(work_end)
+    return t.second == 0 and start <= m <= end - slot_minutes and (m - start) % slot_minutes == 0
+
+
+class BookedIntervals:
+    """Booked appointments of one doctor on one day, as sorted start minutes."""
+
+    def __init__(self, slot_minutes: int, booked: Iterable[time] = ()):
+        self.slot_minutes = slot_minutes
+        self.starts = sorted(_minutes(t) for t in booked if t is not None)
+
+    def overlaps(self, start: int) -> bool:
+        # a booking starting at b overlaps [start, start + slot) iff start - slot < b < start + slot
+        i = bisect_left(self.starts, start - self.slot_minutes + 1)
+        return i < len(self.starts) and self.starts[i] < start + self.slot_minutes
+
+
+def free_slots(
+    work_start: time,
+    work_end: time,
+    slot_minutes: int,
+    booked: Iterable[time],
+    day: date,
+    now: Optional[datetime] = None,
+) -> list:
+    """Slot start times on `day` that do not overlap a booking (and are not in the past)."""
+    intervals = BookedIntervals(slot_minutes, booked)
+    now = now or datetime.now()
+    earliest = _minutes(now.time()) if day == now.date() else -1
+    if day < now.date():
+        return []
+    return [
+        t for t in slot_starts(work_start, work_end, slot_minutes)
+        if _minutes(t) > earliest and not intervals.overlaps(_minutes(t))
+    ]
+
+
+def booking_error(doctor, appointment_time: Optional[time]) -> Optional[str]:
+    """Why `appointment_time` cannot be booked with `doctor`, or None if it can."""
+    if appointment_time is None:
+        return None
+    if not is_slot_start(appointment_time, doctor.work_start, doctor.work_end, doctor.slot_minutes):
+        return (
+            f"Appointment time must be the start of a {doctor.slot_minutes}-minute slot between "
+            f"{doctor.work_start.strftime('%H:%M')} and {doctor.work_end.strftime('%H:%M')}"
+        )
+    return None
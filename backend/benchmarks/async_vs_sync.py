@@ -0,0 +1,110 @@
+# benchmarks/async_vs_sync.py
+"""
+Concurrent-request throughput of the sync stack vs the async stack.
+
+Run from the backend folder:
+
+    python -m benchmarks.async_vs_sync --requests 2000 --concurrency 50
+
+By default both stacks run against a throwaway SQLite file (sqlite /
+aiosqlite). Pass --database-url and --async-database-url to point both at
+the same MySQL database instead. Each mode runs in its own process because
+the stack is chosen when the app is imported.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROUTERS = "patients,doctors,appointments,medical_records,billing,pharmacy,lab"
+
+
+def run_mode(args):
+    import httpx
+    from database import engine
+    from main import app
+    import migrations
+
+    # The ASGI transport does not run the app's lifespan, which applies migrations
+    migrations.upgrade(engine)
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            ids = []
+            for i in range(args.seed):
+                r = await client.post("/patients/", json={"name": f"Patient {i}", "phone": f"{args.mode}-{i}"})
+                ids.append(r.json()["id"])
+
+            queue = asyncio.Queue()
+            for i in range(args.requests):
+                queue.put_nowait(i)
+
+            async def worker():
+                while not queue.empty():
+                    i = queue.get_nowait()
+                    if i % 2:
+                        r = await client.get(f"/patients/{ids[i % len(ids)]}")
+                    else:
+                        r = await client.get("/patients/", params={"limit": 50})
+                    r.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - start
+
+        print(json.dumps({
+            "mode": args.mode,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(args.requests / elapsed, 1),
+        }))
+
+    asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=200, help="patients created before timing")
+    parser.add_argument("--database-url")
+    parser.add_argument("--async-database-url")
+    parser.add_argument("--mode", choices=["sync", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        return run_mode(args)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("sync", "async"):
+            env = dict(os.environ)
+            if args.database_url:
+                env["DATABASE_URL"] = args.database_url
+                env["ASYNC_DATABASE_URL"] = args.async_database_url or args.database_url
+            else:
+                path = os.path.join(tmp, f"{mode}.db")
+                env["DATABASE_URL"] = f"sqlite:///{path}"
+                env["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+            env["ASYNC_ROUTERS"] = ROUTERS if mode == "async" else ""
+
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.async_vs_sync", "--mode", mode,
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+                 "--seed", str(args.seed)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+
+    for r in results:
+        print(f"{r['mode']:>5}: {r['requests_per_second']:>8} req/s  ({r['requests']} requests, concurrency {r['concurrency']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# benchmarks/datagen.py
+"""
+Synthetic hospital data for benchmarks.
+
+Fills an empty, migrated database with patients, doctors, lab tests,
+medicines, appointments, medical records, bills, pharmacy sales and lab
+reports. Every foreign key points at an existing row, phones are unique,
+appointments never double-book a doctor's slot, and the search terms and
+rollups are built to match, so every endpoint sees consistent data.
+
+    python -m benchmarks.datagen --patients 10000 --appointments 50000
+
+Rows are written with multi-row INSERTs in batches; the same `--seed`
+always produces the same data.
+"""
+import argparse
+import random
+import uuid
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+
+FIRST_NAMES = [
+    "James", "Mary", "Ahmed", "Li", "Sofia", "Omar", "Anna", "Raj", "Lucas", "Emma", "Yuki", "Fatima",
+    "Carlos", "Olga", "Kwame", "Priya", "Noah", "Chloé", "Mateo", "Aisha", "Ivan", "Grace", "Hiro", "Zoë",
+]
+LAST_NAMES = [
+    "Smith", "Khan", "Wang", "Garcia", "Müller", "Okafor", "Singh", "Rossi", "Kim", "Novak", "Silva",
+    "Nguyen", "Cohen", "Dubois", "Haddad", "Larsen", "Mensah", "Tanaka", "Ivanova", "Brown",
+]
+SPECIALIZATIONS = ["Cardiology", "Neurology", "Pediatrics", "Orthopedics", "Dermatology", "General Medicine", "ENT"]
+DIAGNOSES = [
+    "Essential hypertension", "Type 2 diabetes mellitus", "Acute bronchitis", "Migraine without aura",
+    "Iron deficiency anemia", "Lumbar strain", "Allergic rhinitis", "Gastroesophageal reflux disease",
+    "Urinary tract infection", "Atopic dermatitis", "Viral pharyngitis", "Osteoarthritis of knee",
+]
+PRESCRIPTIONS = [
+    "Amlodipine 5mg once daily", "Metformin 500mg twice daily", "Amoxicillin 500mg three times daily",
+    "Sumatriptan 50mg as needed", "Ferrous sulfate 325mg daily", "Ibuprofen 400mg as needed",
+    "Cetirizine 10mg daily", "Omeprazole 20mg before breakfast", "Rest and fluids",
+]
+LAB_TESTS = [
+    ("Complete Blood Count", 250), ("Lipid Profile", 600), ("HbA1c", 450), ("Liver Function Test", 700),
+    ("Kidney Function Test", 650), ("Thyroid Profile", 550), ("Urinalysis", 150), ("Vitamin D", 900),
+    ("Blood Glucose Fasting", 100), ("Chest X-Ray", 800), ("ECG", 300), ("CRP", 350),
+]
+MEDICINES = [
+    "Paracetamol", "Ibuprofen", "Amoxicillin", "Azithromycin", "Metformin", "Amlodipine", "Atorvastatin",
+    "Omeprazole", "Cetirizine", "Salbutamol", "Losartan", "Levothyroxine", "Prednisolone", "Diclofenac",
+]
+
+DEFAULTS = {
+    "patients": 2000,
+    "doctors": 50,
+    "medicines": 200,
+    "appointments": 10000,
+    "records": 5000,
+    "bills": 5000,
+    "sales": 5000,
+    "lab_reports": 5000,
+}
+
+BATCH_SIZE = 5000
+DAYS_BACK = 365
+DAYS_AHEAD = 60
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _moment(rng, today):
+    day = today - timedelta(days=rng.randrange(DAYS_BACK))
+    return datetime.combine(day, time(rng.randrange(8, 20), rng.randrange(60), rng.randrange(60)))
+
+
+def _insert(conn, model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(model.__table__), rows[start:start + BATCH_SIZE])
+
+
+def generate(conn, counts: dict, seed: int = 42, log=print):
+    """Insert synthetic rows into an empty database through `conn`."""
+    import models
+    import rollups
+    from search import term_rows, patient_terms, medicine_terms
+    from matching import key_rows
+
+    rng = random.Random(seed)
+    today = date.today()
+    counts = {**DEFAULTS, **{k: v for k, v in counts.items() if v is not None}}
+
+    patients = []
+    for i in range(counts["patients"]):
+        dob = today - timedelta(days=rng.randrange(365, 90 * 365))
+        patients.append({
+            "id": _uuid(rng),
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "dob": dob,
+            "age": (today - dob).days // 365,
+            "gender": rng.choice(["male", "female"]),
+            "address": f"{rng.randrange(1, 999)} Main Street",
+            "phone": f"+1555{i:07d}",
+            "created_at": _moment(rng, today),
+        })
+    _insert(conn, models.Patient, patients)
+    _insert(conn, models.SearchTerm, term_rows("patient", patient_terms, patients))
+    _insert(conn, models.PatientMatchKey, key_rows(patients))
+    log(f"patients: {len(patients)}")
+
+    doctors = [
+        {
+            "id": _uuid(rng),
+            "name": f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "specialization": rng.choice(SPECIALIZATIONS),
+            "phone": f"+1444{i:07d}",
+            "room_no": str(100 + i),
+            "work_start": time(9, 0),
+            "work_end": time(17, 0),
+            "slot_minutes": 15,
+        }
+        for i in range(counts["doctors"])
+    ]
+    _insert(conn, models.Doctor, doctors)
+    log(f"doctors: {len(doctors)}")
+
+    tests = [
+        {"id": _uuid(rng), "test_name": name, "description": None, "charges": Decimal(charges)}
+        for name, charges in LAB_TESTS
+    ]
+    _insert(conn, models.LabTest, tests)
+
+    medicines = [
+        {
+            "id": _uuid(rng),
+            "name": f"{rng.choice(MEDICINES)} {rng.choice([50, 100, 250, 500])}mg",
+            "batch_no": f"B{i:05d}",
+            "stock": rng.randrange(100, 10000),
+            "price": Decimal(rng.randrange(100, 5000)) / 100,
+            "expiry_date": today + timedelta(days=rng.randrange(30, 900)),
+        }
+        for i in range(counts["medicines"])
+    ]
+    _insert(conn, models.PharmacyMedicine, medicines)
+    _insert(conn, models.SearchTerm, term_rows("medicine", medicine_terms, medicines))
+    log(f"lab tests: {len(tests)}, medicines: {len(medicines)}")
+
+    # One appointment per (doctor, day, slot) at most, so the slot lock holds
+    slots = [time(9 + m // 60, m % 60) for m in range(0, 8 * 60, 15)]
+    taken = set()
+    appointments = []
+    while len(appointments) < counts["appointments"]:
+        doctor = rng.choice(doctors)
+        day = today + timedelta(days=rng.randrange(-DAYS_BACK, DAYS_AHEAD))
+        slot = rng.choice(slots)
+        if (doctor["id"], day, slot) in taken:
+            continue
+        taken.add((doctor["id"], day, slot))
+        status = "scheduled" if day >= today else rng.choice(["completed", "completed", "completed", "cancelled"])
+        appointments.append({
+            "id": _uuid(rng),
+            "patient_id": rng.choice(patients)["id"],
+            "doctor_id": doctor["id"],
+            "appointment_date": day,
+            "appointment_time": slot,
+            "status": status,
+            "slot_taken": None if status in models.SLOT_RELEASING_STATUSES else 1,
+            "created_at": _moment(rng, today),
+        })
+    _insert(conn, models.Appointment, appointments)
+    log(f"appointments: {len(appointments)}")
+
+    _insert(conn, models.MedicalRecord, [
+        {
+            "id": _uuid(rng),
+            "patient_id": rng.choice(patients)["id"],
+            "doctor_id": rng.choice(doctors)["id"],
+            "diagnosis": rng.choice(DIAGNOSES),
+            "prescription": rng.choice(PRESCRIPTIONS),
+            "visit_date": _moment(rng, today),
+        }
+        for _ in range(counts["records"])
+    ])
+    log(f"medical records: {counts['records']}")
+
+    _insert(conn, models.Billing, [
+        {
+            "id": _uuid(rng),
+            "patient_id": rng.choice(patients)["id"],
+            "description": rng.choice(["Consultation", "Lab charges", "Procedure", "Room charges"]),
+            "total_amount": Decimal(rng.randrange(500, 500000)) / 100,
+            "status": rng.choice(["pending", "paid", "paid"]),
+            "created_at": _moment(rng, today),
+        }
+        for _ in range(counts["bills"])
+    ])
+    log(f"bills: {counts['bills']}")
+
+    sales = []
+    for _ in range(counts["sales"]):
+        medicine = rng.choice(medicines)
+        quantity = rng.randrange(1, 6)
+        sales.append({
+            "id": _uuid(rng),
+            "patient_id": rng.choice(patients)["id"],
+            "medicine_id": medicine["id"],
+            "quantity": quantity,
+            "total_amount": medicine["price"] * quantity,
+            "sale_date": _moment(rng, today),
+        })
+    _insert(conn, models.PharmacySale, sales)
+    log(f"pharmacy sales: {len(sales)}")
+
+    _insert(conn, models.LabReport, [
+        {
+            "id": _uuid(rng),
+            "patient_id": rng.choice(patients)["id"],
+            "doctor_id": rng.choice(doctors)["id"],
+            "test_id": rng.choice(tests)["id"],
+            "result": rng.choice([None, "Normal", "Borderline", "Abnormal"]),
+            "status": rng.choice(["pending", "completed", "completed"]),
+            "test_date": _moment(rng, today),
+        }
+        for _ in range(counts["lab_reports"])
+    ])
+    log(f"lab reports: {counts['lab_reports']}")
+
+    rollups.rebuild(conn)
+    log("rollups rebuilt")
+
+
+def sample_ids(conn, limit: int = 500) -> dict:
+    """Up to `limit` ids per table, for building benchmark requests."""
+    import models
+
+    tables = {
+        "patients": models.Patient, "doctors": models.Doctor, "appointments": models.Appointment,
+        "records": models.MedicalRecord, "bills": models.Billing, "medicines": models.PharmacyMedicine,
+        "lab_tests": models.LabTest, "lab_reports": models.LabReport,
+    }
+    return {name: list(conn.execute(select(model.id).limit(limit)).scalars()) for name, model in tables.items()}
+
+
+def add_count_arguments(parser):
+    for name, default in DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name, help=f"default {default}")
+    parser.add_argument("--seed", type=int, default=42, dest="random_seed", help="random seed (default 42)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_count_arguments(parser)
+    args = parser.parse_args()
+
+    import migrations
+    from database import engine
+
+    migrations.upgrade(engine)
+    with engine.begin() as conn:
+        generate(conn, {name: getattr(args, name) for name in DEFAULTS}, seed=args.random_seed)
+
+
+if __name__ == "__main__":
+    main()
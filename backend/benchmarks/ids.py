@@ -0,0 +1,136 @@
+# benchmarks/ids.py
+"""
+Insert throughput and index size of each id scheme: random (uuid4) or
+time-ordered (uuid7) ids, stored as CHAR(36) text or BINARY(16).
+
+Run from the backend folder:
+
+    python -m benchmarks.ids --rows 200000 --batch 1000
+
+Each scheme gets a bills-shaped table (id primary key, a patient id with a
+(patient_id, created_at) index) in a throwaway SQLite file (or
+--database-url, where the tables are dropped afterwards), filled with
+multi-row INSERTs. Prints rows/sec for the whole fill and for its last
+tenth, when the indexes are largest, then the table and index sizes: from
+dbstat on SQLite, information_schema on MySQL.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Index, MetaData, Numeric, String, Table, create_engine, insert, text
+
+SCHEMES = [("uuid4", "string"), ("uuid7", "string"), ("uuid4", "binary"), ("uuid7", "binary")]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=1000, help="rows per INSERT")
+    parser.add_argument("--patients", type=int, default=5000, help="distinct patient ids")
+    parser.add_argument("--database-url")
+    return parser.parse_args()
+
+
+def bench_table(metadata, format, storage):
+    import ids
+
+    id_type = ids.BinaryId if storage == "binary" else lambda: String(36)
+    name = f"bench_ids_{format}_{storage}"
+    return Table(
+        name, metadata,
+        Column("id", id_type(), primary_key=True),
+        Column("patient_id", id_type(), nullable=False),
+        Column("total_amount", Numeric(10, 2), nullable=False),
+        Column("created_at", DateTime, nullable=False),
+        Index(f"ix_{name}_patient_created", "patient_id", "created_at"),
+    )
+
+
+def fill(engine, table, format, args):
+    import ids
+
+    generate = ids.GENERATORS[format]
+    patients = [generate() for _ in range(args.patients)]
+    started_at = datetime(2025, 1, 1)
+    tail_from = args.rows - args.rows // 10
+    start = time.perf_counter()
+    tail_start = None
+    for offset in range(0, args.rows, args.batch):
+        if tail_start is None and offset >= tail_from:
+            tail_start = time.perf_counter()
+        count = min(args.batch, args.rows - offset)
+        rows = [
+            {"id": generate(), "patient_id": random.choice(patients),
+             "total_amount": round(random.uniform(5, 500), 2),
+             "created_at": started_at + timedelta(seconds=offset + i)}
+            for i in range(count)
+        ]
+        with engine.begin() as conn:
+            conn.execute(insert(table), rows)
+    end = time.perf_counter()
+    return args.rows / (end - start), (args.rows - tail_from) / (end - (tail_start or start))
+
+
+def sizes(engine, table) -> dict:
+    """Bytes used by the table and by its indexes."""
+    with engine.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            rows = conn.execute(
+                text("SELECT d.name, SUM(d.pgsize) FROM dbstat d JOIN sqlite_master m ON m.name = d.name"
+                     " WHERE m.tbl_name = :t GROUP BY d.name"),
+                {"t": table.name},
+            ).all()
+            # The rows live in the rowid B-tree; the primary key is a separate index
+            return {
+                "table": sum(size for name, size in rows if name == table.name),
+                "indexes": sum(size for name, size in rows if name != table.name),
+            }
+        conn.execute(text(f"ANALYZE TABLE `{table.name}`"))
+        data, index = conn.execute(
+            text("SELECT data_length, index_length FROM information_schema.tables"
+                 " WHERE table_schema = DATABASE() AND table_name = :t"),
+            {"t": table.name},
+        ).one()
+        # InnoDB clusters the rows on the primary key: data_length is that index
+        return {"table": int(data), "indexes": int(index)}
+
+
+def main():
+    args = parse_args()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(url)
+        metadata = MetaData()
+        for format, storage in SCHEMES:
+            table = bench_table(metadata, format, storage)
+            table.drop(engine, checkfirst=True)
+            table.create(engine)
+            try:
+                overall, tail = fill(engine, table, format, args)
+                results[f"{format}/{storage}"] = {
+                    "rows_per_second": round(overall),
+                    "last_tenth_rows_per_second": round(tail),
+                    **sizes(engine, table),
+                }
+            finally:
+                table.drop(engine)
+        engine.dispose()
+
+    base = results["uuid4/string"]
+    for result in results.values():
+        result["size_vs_uuid4_string"] = round(
+            (result["table"] + result["indexes"]) / (base["table"] + base["indexes"]), 2
+        )
+    print(json.dumps({"rows": args.rows, "batch": args.batch, "schemes": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
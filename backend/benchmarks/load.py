@@ -0,0 +1,265 @@
+# benchmarks/load.py
+"""
+Per-endpoint latency, throughput and SQL statement counts across every router.
+
+Run from the backend folder:
+
+    python -m benchmarks.load --concurrency 20 --requests 300 --output results.json
+    python -m benchmarks.load --output new.json --baseline results.json
+
+The app is driven in-process (httpx ASGITransport) against a throwaway SQLite
+file seeded by benchmarks.datagen; the datagen size options (--patients,
+--appointments, ...) apply. Pass --database-url to use an empty local MySQL
+database instead, or --no-seed to reuse one that is already seeded.
+
+Each endpoint is hit --requests times by --concurrency workers. The report
+shows p50 / p95 / p99 latency, requests per second and SQL statements per
+request, and --output saves it as JSON. With --baseline, endpoints whose p95
+or statement count grew by more than --threshold percent are listed and the
+exit status is 1, so the run can gate a change.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+
+from benchmarks.datagen import DEFAULTS, add_count_arguments, generate, sample_ids
+
+# Statement counter of the request being timed (shared with the threadpool
+# worker that runs a sync handler, since contextvars are copied there)
+_statements: ContextVar = ContextVar("statements", default=None)
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _statements.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def scenarios(ids: dict) -> dict:
+    """{name: (method, make_request(rng) -> (path, params, json))} for every router."""
+    today = date.today()
+
+    def pick(name):
+        return lambda rng: rng.choice(ids[name])
+
+    def day(rng):
+        return (today + timedelta(days=rng.randrange(-30, 30))).isoformat()
+
+    patient, doctor, appointment, record = pick("patients"), pick("doctors"), pick("appointments"), pick("records")
+    bill, medicine, lab_test, lab_report = pick("bills"), pick("medicines"), pick("lab_tests"), pick("lab_reports")
+    page = {"limit": 50}
+
+    return {
+        "patients.list": ("GET", lambda rng: ("/patients/", page, None)),
+        "patients.get": ("GET", lambda rng: (f"/patients/{patient(rng)}", None, None)),
+        "patients.search": ("GET", lambda rng: ("/patients/search", {"q": rng.choice(["smi", "khan", "ana", "5550"])}, None)),
+        "patients.timeline": ("GET", lambda rng: (f"/patients/{patient(rng)}/timeline", None, None)),
+        "patients.create": ("POST", lambda rng: ("/patients/", None, {
+            "name": "Bench Patient", "phone": f"+1666{rng.getrandbits(40):013d}"[:20],
+        })),
+        "doctors.list": ("GET", lambda rng: ("/doctors/", page, None)),
+        "doctors.get": ("GET", lambda rng: (f"/doctors/{doctor(rng)}", None, None)),
+        "doctors.availability": ("GET", lambda rng: (f"/doctors/{doctor(rng)}/availability", {"date": day(rng)}, None)),
+        "appointments.list": ("GET", lambda rng: ("/appointments/", {**page, "doctor_id": doctor(rng)}, None)),
+        "appointments.get": ("GET", lambda rng: (f"/appointments/{appointment(rng)}", None, None)),
+        "records.list": ("GET", lambda rng: ("/records/", {**page, "patient_id": patient(rng)}, None)),
+        "records.get": ("GET", lambda rng: (f"/records/{record(rng)}", None, None)),
+        "records.search": ("GET", lambda rng: ("/records/search", {"q": rng.choice(["hypert", "diabetes", "rhinitis"])}, None)),
+        "billing.list": ("GET", lambda rng: ("/billing/", {**page, "status": "pending"}, None)),
+        "billing.get": ("GET", lambda rng: (f"/billing/{bill(rng)}", None, None)),
+        "billing.create": ("POST", lambda rng: ("/billing/", None, {
+            "patient_id": patient(rng), "description": "Bench", "total_amount": 100.0,
+        })),
+        "pharmacy.medicines": ("GET", lambda rng: ("/pharmacy/medicines", page, None)),
+        "pharmacy.medicine": ("GET", lambda rng: (f"/pharmacy/medicines/{medicine(rng)}", None, None)),
+        "pharmacy.search": ("GET", lambda rng: ("/pharmacy/medicines/search", {"q": rng.choice(["para", "ibu", "amox"])}, None)),
+        "pharmacy.sales": ("GET", lambda rng: ("/pharmacy/sales", {**page, "patient_id": patient(rng)}, None)),
+        "pharmacy.checkout": ("POST", lambda rng: ("/pharmacy/checkout", None, {
+            "patient_id": patient(rng), "items": [{"medicine_id": medicine(rng), "quantity": 1}],
+        })),
+        "lab.tests": ("GET", lambda rng: ("/lab/tests", None, None)),
+        "lab.test": ("GET", lambda rng: (f"/lab/tests/{lab_test(rng)}", None, None)),
+        "lab.reports": ("GET", lambda rng: ("/lab/reports", {**page, "status": "pending"}, None)),
+        "lab.report": ("GET", lambda rng: (f"/lab/reports/{lab_report(rng)}", None, None)),
+    }
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+async def run_endpoint(client, method, make_request, requests, concurrency, rng):
+    latencies, statements, errors = [], [], 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(make_request(rng))
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            path, params, body = queue.get_nowait()
+            counter = [0]
+            _statements.set(counter)
+            start = time.perf_counter()
+            r = await client.request(method, path, params=params, json=body)
+            latencies.append(time.perf_counter() - start)
+            statements.append(counter[0])
+            if r.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)),
+        "requests_per_second": round(requests / elapsed, 1),
+        "sql_per_request": round(sum(statements) / len(statements), 2),
+        "sql_max": max(statements),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Endpoints whose p95 latency or SQL statement count regressed past `threshold` percent."""
+    regressions = []
+    for name, current in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        for metric in ("p95_ms", "sql_per_request"):
+            old, new = before[metric], current[metric]
+            if old and new > old * (1 + threshold / 100):
+                regressions.append(f"{name}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+            elif not old and new > 0 and metric == "sql_per_request":
+                regressions.append(f"{name}: {metric} {old} -> {new}")
+    return regressions
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    import httpx
+    from sqlalchemy import event
+
+    from database import engine
+    from main import app
+    import migrations
+
+    # The ASGI transport does not run the app's lifespan, which applies migrations
+    migrations.upgrade(engine)
+    counts = {name: getattr(args, name) for name in DEFAULTS}
+    if not args.no_seed:
+        with engine.begin() as conn:
+            generate(conn, counts, seed=args.random_seed, log=lambda line: print(f"  seeded {line}"))
+    with engine.connect() as conn:
+        ids = sample_ids(conn)
+
+    event.listen(engine, "before_cursor_execute", _count_statement)
+    selected = scenarios(ids)
+    if args.endpoints:
+        wanted = set(args.endpoints.split(","))
+        selected = {name: s for name, s in selected.items() if name in wanted or name.split(".")[0] in wanted}
+
+    async def main():
+        rng = random.Random(args.random_seed)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = {}
+            for name, (method, make_request) in selected.items():
+                # Untimed requests first, to warm caches and connections
+                for _ in range(min(args.warmup, args.requests)):
+                    path, params, body = make_request(rng)
+                    await client.request(method, path, params=params, json=body)
+                results[name] = await run_endpoint(
+                    client, method, make_request, args.requests, args.concurrency, rng
+                )
+                r = results[name]
+                print(
+                    f"{name:<22} p50 {r['p50_ms']:>8.2f}  p95 {r['p95_ms']:>8.2f}  p99 {r['p99_ms']:>8.2f} ms"
+                    f"  {r['requests_per_second']:>8.1f} req/s  {r['sql_per_request']:>5} sql/req"
+                    + (f"  {r['errors']} errors" if r["errors"] else "")
+                )
+            return results
+
+    endpoints = asyncio.run(main())
+    event.remove(engine, "before_cursor_execute", _count_statement)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "dialect": engine.dialect.name,
+            "concurrency": args.concurrency,
+            "requests_per_endpoint": args.requests,
+            "data": None if args.no_seed else {**DEFAULTS, **{k: v for k, v in counts.items() if v is not None}},
+        },
+        "endpoints": endpoints,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per endpoint")
+    parser.add_argument("--endpoints", help="comma separated endpoint or router names (default: all)")
+    parser.add_argument("--database-url", help="empty (or, with --no-seed, seeded) database to use")
+    parser.add_argument("--no-seed", action="store_true", help="reuse the data already in --database-url")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="allowed regression in percent (default 20)")
+    add_count_arguments(parser)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before the app (and its engine) is imported
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        results = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"Regressions over {args.threshold:g}%:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions over {args.threshold:g}% against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# benchmarks/overload.py
+"""
+Clinical-write latency during an overload, with and without admission control.
+
+Run from the backend folder:
+
+    python -m benchmarks.overload --background 200 --clinical 5 --seconds 15
+
+The app is driven in-process (httpx ASGITransport) against a throwaway SQLite
+file seeded by benchmarks.datagen (or --database-url, seeded when empty).
+--background workers loop on list, report and export requests as fast as they
+can, far more than the DB pool can serve, while --clinical workers keep
+creating medical records. The same run is repeated with admission control off
+and on. Each run reports clinical p50 / p95 / p99 and errors, plus how many
+background requests were served and how many were shed with 503.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.datagen import DEFAULTS, add_count_arguments, generate, sample_ids
+from benchmarks.load import percentile
+
+BACKGROUND = [
+    ("/patients/", {"limit": 1000}),
+    ("/billing/", {"limit": 1000}),
+    ("/billing/export", {}),
+    ("/reports/revenue", {}),
+    ("/stats/summary", {}),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--background", type=int, default=200, help="concurrent list / report / export workers")
+    parser.add_argument("--clinical", type=int, default=5, help="concurrent clinical-write workers")
+    parser.add_argument("--seconds", type=float, default=15.0, help="length of each run")
+    parser.add_argument("--database-url")
+    add_count_arguments(parser)
+    return parser.parse_args()
+
+
+async def run(client, ids, args):
+    rng = random.Random(1)
+    deadline = time.perf_counter() + args.seconds
+    clinical, background = [], {"ok": 0, "shed": 0, "error": 0}
+    clinical_errors = {}
+
+    async def background_worker():
+        while time.perf_counter() < deadline:
+            path, params = rng.choice(BACKGROUND)
+            r = await client.get(path, params=params)
+            key = "ok" if r.status_code < 400 else "shed" if r.status_code == 503 else "error"
+            background[key] += 1
+            if r.status_code == 503:
+                await asyncio.sleep(0.05)
+
+    async def clinical_worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            r = await client.post("/records/", json={
+                "patient_id": rng.choice(ids["patients"]), "doctor_id": rng.choice(ids["doctors"]),
+                "diagnosis": "Overload check", "prescription": None,
+            })
+            if r.status_code >= 400:
+                clinical_errors[r.status_code] = clinical_errors.get(r.status_code, 0) + 1
+            else:
+                clinical.append(time.perf_counter() - start)
+            await asyncio.sleep(0.02)
+
+    await asyncio.gather(
+        *(background_worker() for _ in range(args.background)),
+        *(clinical_worker() for _ in range(args.clinical)),
+    )
+    clinical.sort()
+    return {
+        "clinical": {
+            "ok": len(clinical),
+            "errors": clinical_errors,
+            **{f"p{p}_ms": round(percentile(clinical, p) * 1000, 1) if clinical else None for p in (50, 95, 99)},
+        },
+        "background": background,
+    }
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("DATABASE_URL", args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        import httpx
+        from sqlalchemy import func, select
+        import admission
+        from database import engine
+        from main import app
+        import migrations
+        import models
+
+        migrations.upgrade(engine)  # the ASGI transport skips the lifespan
+        with engine.begin() as conn:
+            if not conn.execute(select(func.count()).select_from(models.Patient)).scalar():
+                generate(conn, {name: getattr(args, name) for name in DEFAULTS},
+                         seed=args.random_seed, log=lambda line: None)
+        with engine.connect() as conn:
+            ids = sample_ids(conn)
+
+        async def both():
+            results = {}
+            # Pool timeouts become 500s instead of being raised into the client
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                for enabled in (False, True):
+                    admission.ADMISSION_CONTROL = enabled
+                    results["admission_on" if enabled else "admission_off"] = await run(client, ids, args)
+            return results
+
+        results = asyncio.run(both())
+        results["admission"] = admission.controller.stats()
+        engine.dispose()
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
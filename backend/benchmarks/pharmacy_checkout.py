@@ -0,0 +1,135 @@
+# benchmarks/pharmacy_checkout.py
+"""
+Concurrency stress test for pharmacy sales on a single hot SKU.
+
+Run from the backend folder:
+
+    python -m benchmarks.pharmacy_checkout --buyers 50 --stock 500 --attempts 1000
+
+Many concurrent buyers try to purchase one unit each of the same medicine,
+more times than there is stock. It is run twice: once against the previous
+read-check-write implementation of POST /pharmacy/sell (mounted here as
+/legacy/sell for comparison) and once against the atomic POST
+/pharmacy/checkout. For each run it reports the 200 responses, the valid
+sales among them, valid sales/sec, the final stock and whether stock was
+oversold. A sale is valid when its unit really left the stock: sales beyond
+starting stock - final stock (lost updates) or below zero stock are
+oversold, and throughput counts valid sales only.
+
+Uses a throwaway SQLite file unless --database-url points at MySQL. SQLite
+runs one writer at a time, so valid sales/sec there is far below what MySQL
+sustains with row locks; compare implementations within one database only.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=50, help="concurrent clients")
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--attempts", type=int, default=1000, help="total purchase attempts")
+    parser.add_argument("--database-url")
+    return parser.parse_args()
+
+
+def build_app():
+    from fastapi import Depends, HTTPException
+    from sqlalchemy.orm import Session
+
+    from database import engine
+    from main import app
+    from routers.pharmacy import get_db
+    import migrations
+    import models
+    import schemas
+
+    # The ASGI transport does not run the app's lifespan, which applies migrations
+    migrations.upgrade(engine)
+
+    # The pre-checkout implementation of POST /pharmacy/sell, kept for comparison.
+    @app.post("/legacy/sell", response_model=schemas.PharmacySaleOut)
+    def legacy_sell(payload: schemas.PharmacySaleCreate, db: Session = Depends(get_db)):
+        med = db.get(models.PharmacyMedicine, payload.medicine_id)
+        if not med:
+            raise HTTPException(404, "Medicine not found")
+        if med.stock < payload.quantity:
+            raise HTTPException(400, "Not enough stock")
+        total = float(med.price) * payload.quantity
+        sale = models.PharmacySale(
+            patient_id=payload.patient_id,
+            medicine_id=payload.medicine_id,
+            quantity=payload.quantity,
+            total_amount=total,
+        )
+        med.stock -= payload.quantity
+        db.add(sale)
+        db.commit()
+        db.refresh(sale)
+        return sale
+
+    return app
+
+
+async def run(client, label, path, body_for, args):
+    r = await client.post("/pharmacy/medicines", json={
+        "name": f"Hot SKU ({label})", "batch_no": None, "stock": args.stock, "price": 9.99, "expiry_date": None,
+    })
+    medicine_id = r.json()["id"]
+    body = body_for(medicine_id)
+
+    remaining = iter(range(args.attempts))
+    counts = {"sold": 0, "rejected": 0, "errors": 0}
+
+    async def buyer():
+        for _ in remaining:
+            r = await client.post(path, json=body)
+            if r.status_code == 200:
+                counts["sold"] += 1
+            elif r.status_code == 400:
+                counts["rejected"] += 1
+            else:
+                counts["errors"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(buyer() for _ in range(args.buyers)))
+    elapsed = time.perf_counter() - start
+
+    final_stock = (await client.get(f"/pharmacy/medicines/{medicine_id}")).json()["stock"]
+    valid = max(0, min(counts["sold"], args.stock - max(final_stock, 0)))
+    oversold = final_stock < 0 or counts["sold"] + final_stock != args.stock
+    print(
+        f"{label:>8}: sold={counts['sold']} valid={valid} oversold_units={counts['sold'] - valid} "
+        f"rejected={counts['rejected']} errors={counts['errors']} final_stock={final_stock} "
+        f"oversold={'YES' if oversold else 'no'} valid_sales/sec={valid / elapsed:.1f}"
+    )
+    return oversold
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("DATABASE_URL", args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        import httpx
+
+        app = build_app()
+
+        async def go():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                legacy = await run(client, "legacy", "/legacy/sell",
+                                   lambda m: {"patient_id": None, "medicine_id": m, "quantity": 1}, args)
+                atomic = await run(client, "checkout", "/pharmacy/checkout",
+                                   lambda m: {"items": [{"medicine_id": m, "quantity": 1}]}, args)
+            return legacy, atomic
+
+        _, atomic_oversold = asyncio.run(go())
+    return 1 if atomic_oversold else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
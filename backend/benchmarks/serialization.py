@@ -0,0 +1,121 @@
+# benchmarks/serialization.py
+"""
+Rows/sec of list responses: the response_model path vs the fast path.
+
+Run from the backend folder:
+
+    python -m benchmarks.serialization --rows 20000 --limit 1000 --rounds 20
+
+Seeds bills into a throwaway SQLite file (or --database-url), then pages
+through GET /billing/ with FAST_JSON off and on, checking that both paths
+return identical bytes. A second section times the encoding step alone on
+the same rows (ORM entities + Pydantic + json vs column tuples + orjson).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=1000, help="page size")
+    parser.add_argument("--rounds", type=int, default=20, help="pages fetched per mode")
+    parser.add_argument("--database-url")
+    return parser.parse_args()
+
+
+def seed(rows):
+    from sqlalchemy import insert
+    from database import SessionLocal
+    import models
+
+    db = SessionLocal()
+    patient = models.Patient(name="Benchmark patient")
+    db.add(patient)
+    db.commit()
+    db.execute(insert(models.Billing.__table__), [
+        {"id": models.gen_uuid(), "patient_id": patient.id, "description": f"Visit {i}",
+         "total_amount": round(random.uniform(5, 500), 2), "status": random.choice(["pending", "paid"])}
+        for i in range(rows)
+    ])
+    db.commit()
+    db.close()
+
+
+def time_endpoint(client, router, fast, args):
+    router.FAST_JSON = fast
+    bodies = []
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        r = client.get("/billing/", params={"limit": args.limit})
+        r.raise_for_status()
+        bodies.append(r.content)
+    elapsed = time.perf_counter() - start
+    return args.rounds * args.limit / elapsed, bodies[0]
+
+
+def time_encoding(args):
+    from database import SessionLocal
+    from serialization import dumps, row_encoder
+    import models
+    import schemas
+
+    db = SessionLocal()
+    encoder = row_encoder(models.Billing, schemas.BillingOut)
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        bills = db.query(models.Billing).limit(args.limit).all()
+        # What FastAPI does for response_model=list[BillingOut]
+        content = [schemas.BillingOut.model_validate(b, from_attributes=True).model_dump(mode="json") for b in bills]
+        json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+        db.expunge_all()
+    slow = args.rounds * args.limit / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        rows = db.query(*encoder.columns).limit(args.limit).all()
+        dumps(encoder.to_dicts(rows))
+    fast = args.rounds * args.limit / (time.perf_counter() - start)
+    db.close()
+    return slow, fast
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("DATABASE_URL", args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        from fastapi.testclient import TestClient
+        from main import app
+        from database import engine
+        from routers import billing
+        import migrations
+
+        migrations.upgrade(engine)  # TestClient outside `with` skips the lifespan
+
+        seed(args.rows)
+        client = TestClient(app)
+        time_endpoint(client, billing, False, args)  # warm up
+
+        slow, slow_body = time_endpoint(client, billing, False, args)
+        fast, fast_body = time_endpoint(client, billing, True, args)
+        enc_slow, enc_fast = time_encoding(args)
+
+    print(json.dumps({
+        "rows_per_page": args.limit,
+        "endpoint_rows_per_second": {"response_model": round(slow), "fast": round(fast)},
+        "endpoint_speedup": round(fast / slow, 2),
+        "identical_bytes": slow_body == fast_body,
+        "encode_rows_per_second": {"response_model": round(enc_slow), "fast": round(enc_fast)},
+        "encode_speedup": round(enc_fast / enc_slow, 2),
+    }, indent=2))
+    return 0 if slow_body == fast_body else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
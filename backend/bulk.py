@@ -0,0 +1,191 @@
+# bulk.py
+# Batched bulk inserts with a per-row result report.
+#
+# Rows are validated one by one with the resource's `*Create` schema, checked
+# for unique-key collisions in one query per batch, and written with a single
+# multi-row INSERT per batch inside its own transaction. If the database
+# still rejects a batch (e.g. a concurrent duplicate or a foreign key
+# violation), that batch is replayed row by row under savepoints so every
+# failing row is reported individually.
+import codecs
+import csv
+import io
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from cache import mark_changed
+from models import gen_uuid
+import matching
+from search import index_rows
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 5000
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+
+
+def _error(index, message):
+    return {"index": index, "status": "error", "id": None, "error": message}
+
+
+def _created(index, id):
+    return {"index": index, "status": "created", "id": id, "error": None}
+
+
+class BulkLoader:
+    """Accumulates per-row results while inserting rows of one model in batches."""
+
+    def __init__(self, db, model, schema, unique_fields=(), batch_size=DEFAULT_BATCH_SIZE):
+        self.db = db
+        self.model = model
+        self.schema = schema
+        self.unique_fields = unique_fields
+        self.batch_size = batch_size
+        self.results = []
+
+    # ------------ VALIDATION ------------
+    def _validate(self, indexed_rows):
+        valid = []
+        for index, raw in indexed_rows:
+            try:
+                values = self.schema(**raw).dict()
+            except ValidationError as e:
+                self.results.append(_error(index, _validation_message(e)))
+                continue
+            values["id"] = gen_uuid()
+            valid.append((index, values))
+        return valid
+
+    def _drop_duplicates(self, batch):
+        for field in self.unique_fields:
+            column = getattr(self.model, field)
+            wanted = {values[field] for _, values in batch if values.get(field) is not None}
+            if not wanted:
+                continue
+            taken = set(self.db.execute(select(column).where(column.in_(wanted))).scalars())
+
+            kept = []
+            for index, values in batch:
+                value = values.get(field)
+                if value is not None and value in taken:
+                    self.results.append(_error(index, f"Duplicate {field}: {value}"))
+                    continue
+                if value is not None:
+                    taken.add(value)
+                kept.append((index, values))
+            batch = kept
+        return batch
+
+    # ------------ INSERT ------------
+    def _insert_batch(self, batch):
+        batch = self._drop_duplicates(batch)
+        if not batch:
+            self.db.rollback()
+            return
+
+        table = self.model.__table__
+        try:
+            self.db.execute(insert(table), [values for _, values in batch])
+            index_rows(self.db, self.model, [values for _, values in batch])
+            matching.index_rows(self.db, self.model, [values for _, values in batch])
+            mark_changed(self.db, table.name)
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            self._insert_rows_individually(batch)
+            return
+
+        self.results.extend(_created(index, values["id"]) for index, values in batch)
+
+    def _insert_rows_individually(self, batch):
+        table = self.model.__table__
+        for index, values in batch:
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(insert(table), values)
+                    index_rows(self.db, self.model, [values])
+                    matching.index_rows(self.db, self.model, [values])
+            except IntegrityError as e:
+                self.results.append(_error(index, str(e.orig)))
+                continue
+            self.results.append(_created(index, values["id"]))
+        mark_changed(self.db, table.name)
+        self.db.commit()
+
+    def load(self, indexed_rows):
+        """Validate and insert `(index, row)` pairs, `batch_size` at a time."""
+        valid = self._validate(indexed_rows)
+        for start in range(0, len(valid), self.batch_size):
+            self._insert_batch(valid[start:start + self.batch_size])
+
+    def report(self):
+        results = sorted(self.results, key=lambda r: r["index"])
+        created = sum(1 for r in results if r["status"] == "created")
+        return {"created": created, "failed": len(results) - created, "results": results}
+
+
+def bulk_create(db, model, schema, rows, unique_fields=(), batch_size=DEFAULT_BATCH_SIZE):
+    """Insert a list of JSON rows and return the per-row report."""
+    loader = BulkLoader(db, model, schema, unique_fields, batch_size)
+    loader.load(list(enumerate(rows)))
+    return loader.report()
+
+
+# ------------ CSV UPLOAD ------------
+def _split_complete_records(text):
+    """Split `text` after the last newline that is not inside a quoted field."""
+    in_quotes = False
+    cut = 0
+    for i, ch in enumerate(text):
+        if ch == '"':
+            in_quotes = not in_quotes
+        elif ch == "\n" and not in_quotes:
+            cut = i + 1
+    return text[:cut], text[cut:]
+
+
+async def bulk_create_csv(request: Request, db, model, schema, unique_fields=(), batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Insert rows from a CSV request body (first line is the header).
+
+    The body is consumed as it arrives and handed to the loader one batch at a
+    time, so large uploads never have to be held in memory as a whole.
+    Empty cells are treated as missing values.
+    """
+    loader = BulkLoader(db, model, schema, unique_fields, batch_size)
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    header = None
+    pending = ""
+    batch = []
+    index = 0
+
+    def parse(text):
+        nonlocal header, index
+        for record in csv.reader(io.StringIO(text)):
+            if not record:
+                continue
+            if header is None:
+                header = [name.strip() for name in record]
+                continue
+            batch.append((index, {k: (v if v != "" else None) for k, v in zip(header, record)}))
+            index += 1
+
+    async for chunk in request.stream():
+        complete, pending = _split_complete_records(pending + decoder.decode(chunk))
+        parse(complete)
+        if len(batch) >= batch_size:
+            await run_in_threadpool(loader.load, batch[:])
+            batch.clear()
+
+    parse(pending + decoder.decode(b"", final=True))
+    if batch:
+        await run_in_threadpool(loader.load, batch)
+    return loader.report()
@@ -0,0 +1,305 @@
+# cache.py
+# Small in-process caches that are invalidated when the tables they depend
+# on are written through the ORM.
+#
+# CACHE_BACKEND=shared keeps the entries of named caches in a SQLite file on
+# local disk instead, so every worker on the host shares them and a write in
+# one worker invalidates the cache for all of them.
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+import models
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(tempfile.gettempdir(), "hms_cache.sqlite3"))
+
+log = logging.getLogger("hms.cache")
+
+_MISSING = object()
+_registry = {}
+
+
+class TTLCache:
+    """
+    Thread-safe key/value cache whose entries expire after `ttl` seconds.
+
+    With `maxsize` set, the least recently used entry is evicted once the
+    cache is full. Named caches are listed by `cache_stats()`.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = None, name: str = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._generation = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        if name:
+            _registry[name] = self
+
+    # ------------ STORAGE ------------
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while self.maxsize and len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def _clear(self, key=None):
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def _current_generation(self):
+        return self._generation
+
+    def _bump_generation(self):
+        self._generation += 1
+
+    def _size(self):
+        return len(self._data)
+
+    # ------------ PUBLIC API ------------
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            generation = self._current_generation()
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            with self._lock:
+                # Skip the store if a write invalidated the cache while loading,
+                # otherwise the pre-write value would be served until it expires.
+                if self._current_generation() == generation:
+                    self._store(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            self._bump_generation()
+            self._clear(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "backend": "local",
+                "size": self._size(),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+class SharedTTLCache(TTLCache):
+    """
+    TTLCache backed by a SQLite file shared by every worker on the host.
+
+    Values are pickled; hit/miss counters stay per process.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = None, name: str = None, path: str = CACHE_PATH):
+        super().__init__(ttl, maxsize, name)
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " cache TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+                " expires_at REAL NOT NULL, used_at REAL NOT NULL,"
+                " PRIMARY KEY (cache, key))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_generations (cache TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _lookup(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE cache = ? AND key = ?", (self.name, repr(key))
+        ).fetchone()
+        if row is None:
+            return _MISSING
+        if row[1] < now:
+            conn.execute("DELETE FROM cache_entries WHERE cache = ? AND key = ?", (self.name, repr(key)))
+            return _MISSING
+        conn.execute("UPDATE cache_entries SET used_at = ? WHERE cache = ? AND key = ?", (now, self.name, repr(key)))
+        return pickle.loads(row[0])
+
+    def _store(self, key, value):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?)",
+            (self.name, repr(key), pickle.dumps(value), now + self.ttl, now),
+        )
+        if self.maxsize:
+            evicted = conn.execute(
+                "DELETE FROM cache_entries WHERE cache = ? AND key IN ("
+                " SELECT key FROM cache_entries WHERE cache = ? ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.name, self.name, self.maxsize),
+            ).rowcount
+            self.evictions += max(evicted, 0)
+
+    def _clear(self, key=None):
+        if key is None:
+            self._connect().execute("DELETE FROM cache_entries WHERE cache = ?", (self.name,))
+        else:
+            self._connect().execute("DELETE FROM cache_entries WHERE cache = ? AND key = ?", (self.name, repr(key)))
+
+    def _current_generation(self):
+        row = self._connect().execute(
+            "SELECT generation FROM cache_generations WHERE cache = ?", (self.name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _bump_generation(self):
+        self._connect().execute(
+            "INSERT INTO cache_generations VALUES (?, 1)"
+            " ON CONFLICT(cache) DO UPDATE SET generation = generation + 1",
+            (self.name,),
+        )
+
+    def _size(self):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE cache = ?", (self.name,)
+        ).fetchone()[0]
+
+    def stats(self) -> dict:
+        return {**super().stats(), "backend": "shared"}
+
+
+def make_cache(name: str, ttl: float, maxsize: int = None) -> TTLCache:
+    """Named cache on the backend selected by CACHE_BACKEND."""
+    if CACHE_BACKEND == "shared":
+        return SharedTTLCache(ttl, maxsize, name)
+    return TTLCache(ttl, maxsize, name)
+
+
+def cache_stats() -> list:
+    return [cache.stats() for cache in _registry.values()]
+
+
+# ------------ WRITE INVALIDATION ------------
+_dependents = defaultdict(list)
+
+
+def depends_on(cache, *tables):
+    """Clear `cache` whenever a transaction writing to any of `tables` commits."""
+    for table in tables:
+        _dependents[table].append(cache)
+    return cache
+
+
+def mark_changed(session, *tables):
+    """Record tables written outside the unit of work (e.g. bulk UPDATE)."""
+    session.info.setdefault("changed_tables", set()).update(tables)
+
+
+def mark_versioned(session, *tables):
+    """
+    Bump the version counters of `tables` on commit without clearing the
+    caches that depend on them, for writes to columns those caches never
+    hold (e.g. stock, see reference_cache.py).
+    """
+    session.info.setdefault("versioned_tables", set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_tables(session, flush_context):
+    changed = {obj.__table__.name for obj in (*session.new, *session.dirty, *session.deleted)}
+    mark_changed(session, *changed)
+
+
+# ------------ TABLE VERSIONS ------------
+def bump_table_versions(conn, tables):
+    """Increment the change counter of every table in `tables` (see conditional.py)."""
+    TableVersion = models.TableVersion
+    tables = sorted(tables)
+    now = models.now()
+    # One statement for all tables; sorted, so concurrent bumps lock counter
+    # rows in the same order
+    result = conn.execute(
+        update(TableVersion)
+        .where(TableVersion.table_name.in_(tables))
+        .values(version=TableVersion.version + 1, changed_at=now)
+    )
+    if result.rowcount < len(tables):
+        existing = set(conn.execute(select(TableVersion.table_name).where(TableVersion.table_name.in_(tables))).scalars())
+        missing = [{"table_name": t, "version": 1, "changed_at": now} for t in tables if t not in existing]
+        conn.execute(insert(TableVersion), missing)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_dependents(session):
+    # Versions are bumped in their own short transaction once the write has
+    # committed, so writers never hold the shared counter rows while they work
+    # and the write itself carries no extra statements. A reader between the
+    # two steps gets the new data under the old tag, which only means one
+    # more full response once the bump lands.
+    changed = session.info.pop("changed_tables", set())
+    versioned = session.info.pop("versioned_tables", set())
+    if changed or versioned:
+        try:
+            with session.get_bind().engine.begin() as conn:
+                bump_table_versions(conn, changed | versioned)
+        except Exception:
+            log.exception("Could not bump table versions for %s", sorted(changed | versioned))
+    for table in changed:
+        for cache in _dependents.get(table, ()):
+            cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_tables(session):
+    session.info.pop("changed_tables", None)
+    session.info.pop("versioned_tables", None)
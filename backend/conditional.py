@@ -0,0 +1,64 @@
+# conditional.py
+# Conditional GET (ETag / If-None-Match) for read endpoints.
+#
+# Every committed write bumps a counter row per table in `table_versions`
+# right after it commits (see cache.py). A GET endpoint declares the tables its response is built
+# from; the ETag is a hash of the request URL and those counters, read with
+# one primary-key lookup before the handler runs. When the client already
+# holds that ETag the request is answered with 304 before the list query or
+# any serialization happens.
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import get_read_db
+import models
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def versioned(*tables, vary=None):
+    """
+    Dependency adding ETag / Last-Modified headers computed from `tables`.
+
+    `vary()` returns extra text to fold into the ETag for responses that also
+    change with time (e.g. free slots disappearing as the day goes on).
+    The versions are read on the handler's own read session, before the
+    handler's query, so a tag never claims data newer than the body.
+    """
+    def check(request: Request, response: Response, db: Session = Depends(get_read_db)):
+        TableVersion = models.TableVersion
+        rows = db.execute(
+            select(TableVersion.table_name, TableVersion.version, TableVersion.changed_at)
+            .where(TableVersion.table_name.in_(tables))
+        ).all()
+        if len(rows) != len(tables):
+            # Not every table has a counter yet; serve without validators.
+            return
+
+        digest = hashlib.sha1(str(request.url.path).encode())
+        digest.update(request.url.query.encode())
+        for name, version, _ in sorted(rows):
+            digest.update(f"|{name}:{version}".encode())
+        if vary:
+            digest.update(f"|{vary()}".encode())
+
+        # changed_at is naive local time, like every timestamp from models.now()
+        last_modified = max(changed_at for _, _, changed_at in rows).astimezone(timezone.utc)
+        headers = {
+            "ETag": f'"{digest.hexdigest()}"',
+            "Last-Modified": format_datetime(last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+        if _matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+            raise HTTPException(304, headers=headers)
+        response.headers.update(headers)
+
+    return Depends(check)
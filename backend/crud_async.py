@@ -0,0 +1,196 @@
+# crud_async.py
+# Async (AsyncSession) versions of the standard CRUD handlers.
+#
+# Each router declares its resources as `AsyncCRUD` objects. When a router is
+# listed in ASYNC_ROUTERS, `install()` swaps its create/list/get/update/delete
+# routes for the async handlers in place, keeping route order (so fixed paths
+# like `/export` still win over `/{id}`) and leaving every other endpoint on
+# the sync stack. This lets routers move over one at a time.
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import create_model
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from conditional import versioned
+from database import get_async_db
+from pagination import PageParams, paginate_async, equals, date_range
+from prefer import return_minimal, minimal_response
+
+
+class AsyncCRUD:
+    def __init__(
+        self,
+        model,
+        create_schema,
+        out_schema,
+        label: str,
+        path: str = "/",
+        filters=(),
+        date_field: Optional[str] = None,
+        sort_fields: Optional[dict] = None,
+        default_sort: str = "id",
+        references: Optional[dict] = None,
+        validate=None,
+        conflict_detail: Optional[str] = None,
+        archive_model=None,
+        duplicate_check=None,
+    ):
+        """
+        `label` is used in "<label> not found" errors, `filters` are equality
+        filter fields for the list endpoint, `date_field` enables date_from /
+        date_to, and `references` maps payload fields to (model, label) pairs
+        that must exist before a create. `validate(db, payload)` is awaited
+        before creates and updates, and `conflict_detail` turns an
+        IntegrityError on commit into a 409 with that message. With an
+        `archive_model`, get-by-id accepts `include_archive` (see archive.py).
+        With a `duplicate_check(db, payload)`, create accepts `check_duplicates`
+        and awaits it first when that is set.
+        """
+        self.model = model
+        self.create_schema = create_schema
+        self.out_schema = out_schema
+        self.label = label
+        self.collection_path = path
+        self.item_path = path.rstrip("/") + "/{id}"
+        self.filters = filters
+        self.date_field = date_field
+        self.sort_fields = sort_fields or {"id": model.id}
+        self.default_sort = default_sort
+        self.references = references or {}
+        self.validate = validate
+        self.conflict_detail = conflict_detail
+        self.archive_model = archive_model
+        self.duplicate_check = duplicate_check
+
+    async def _get_or_404(self, db: AsyncSession, id: str, include_archive: bool = False):
+        obj = await db.get(self.model, id)
+        if not obj and include_archive:
+            obj = await db.get(self.archive_model, id)
+        if not obj:
+            raise HTTPException(404, f"{self.label} not found")
+        return obj
+
+    async def _check_references(self, db: AsyncSession, payload):
+        for field, (ref_model, ref_label) in self.references.items():
+            if not await db.get(ref_model, getattr(payload, field)):
+                raise HTTPException(404, f"{ref_label} not found")
+
+    async def _commit(self, db: AsyncSession):
+        try:
+            await db.commit()
+        except IntegrityError:
+            if self.conflict_detail is None:
+                raise
+            await db.rollback()
+            raise HTTPException(409, self.conflict_detail)
+
+    def build_router(self, prefix: str) -> APIRouter:
+        router = APIRouter(prefix=prefix)
+        crud = self
+        model = self.model
+        CreateSchema = self.create_schema
+
+        filter_fields = {name: (Optional[str], None) for name in self.filters}
+        if self.date_field:
+            filter_fields.update(date_from=(Optional[date], None), date_to=(Optional[date], None))
+        Filters = create_model(f"{model.__name__}Filters", **filter_fields)
+
+        async def _create(db: AsyncSession, payload, minimal: bool):
+            await crud._check_references(db, payload)
+            if crud.validate:
+                await crud.validate(db, payload)
+            obj = model(**payload.dict())
+            db.add(obj)
+            await crud._commit(db)
+            return minimal_response(obj) if minimal else obj
+
+        if self.duplicate_check is None:
+            @router.post(self.collection_path, response_model=self.out_schema)
+            async def create(
+                payload: CreateSchema,
+                db: AsyncSession = Depends(get_async_db),
+                minimal: bool = Depends(return_minimal),
+            ):
+                return await _create(db, payload, minimal)
+        else:
+            @router.post(self.collection_path, response_model=self.out_schema)
+            async def create(
+                payload: CreateSchema,
+                check_duplicates: bool = False,
+                db: AsyncSession = Depends(get_async_db),
+                minimal: bool = Depends(return_minimal),
+            ):
+                if check_duplicates:
+                    await crud.duplicate_check(db, payload)
+                return await _create(db, payload, minimal)
+
+        table_version = versioned(model.__tablename__)
+
+        @router.get(self.collection_path, response_model=list[self.out_schema], dependencies=[table_version])
+        async def list_all(
+            response: Response,
+            filters: Filters = Depends(),
+            page: PageParams = Depends(),
+            db: AsyncSession = Depends(get_async_db),
+        ):
+            stmt = select(model).where(
+                *equals(*((getattr(model, name), getattr(filters, name)) for name in crud.filters))
+            )
+            if crud.date_field:
+                column = getattr(model, crud.date_field)
+                stmt = stmt.where(*date_range(column, filters.date_from, filters.date_to))
+            return await paginate_async(
+                db, stmt, model, page, response, crud.sort_fields, crud.default_sort
+            )
+
+        if self.archive_model is None:
+            @router.get(self.item_path, response_model=self.out_schema, dependencies=[table_version])
+            async def get_one(id: str, db: AsyncSession = Depends(get_async_db)):
+                return await crud._get_or_404(db, id)
+        else:
+            @router.get(self.item_path, response_model=self.out_schema, dependencies=[table_version])
+            async def get_one(id: str, include_archive: bool = False, db: AsyncSession = Depends(get_async_db)):
+                return await crud._get_or_404(db, id, include_archive)
+
+        @router.put(self.item_path, response_model=self.out_schema)
+        async def update(
+            id: str,
+            payload: CreateSchema,
+            db: AsyncSession = Depends(get_async_db),
+            minimal: bool = Depends(return_minimal),
+        ):
+            obj = await crud._get_or_404(db, id)
+            if crud.validate:
+                await crud.validate(db, payload)
+            for key, value in payload.dict().items():
+                setattr(obj, key, value)
+            await crud._commit(db)
+            return minimal_response(obj) if minimal else obj
+
+        @router.delete(self.item_path)
+        async def delete(id: str, db: AsyncSession = Depends(get_async_db)):
+            obj = await crud._get_or_404(db, id)
+            await db.delete(obj)
+            await db.commit()
+            return {"message": f"{crud.label} deleted successfully"}
+
+        return router
+
+    def install(self, router: APIRouter):
+        """Replace the matching sync routes of `router` with the async handlers."""
+        async_routes = {
+            (route.path, method): route
+            for route in self.build_router(router.prefix).routes
+            for method in route.methods
+        }
+        for i, route in enumerate(router.routes):
+            for method in getattr(route, "methods", ()):
+                replacement = async_routes.get((route.path, method))
+                if replacement is not None:
+                    replacement.tags = route.tags
+                    replacement.name = route.name
+                    router.routes[i] = replacement
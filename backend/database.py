@@ -1,27 +1,297 @@
 # database.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import logging
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 
-# 🔥 Hardcoded MySQL credentials (NO PyMySQL)
-DB_USER = "root"
-DB_PASSWORD = ""
-DB_HOST = "localhost"
-DB_PORT = "3306"
-DB_NAME = "hms_db"
+import metrics
 
-DATABASE_URL = f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,
-    future=True
+# MySQL connection settings, overridable from the environment / .env
+DB_USER = os.getenv("DB_USER", "root")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "")
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = os.getenv("DB_PORT", "3306")
+DB_NAME = os.getenv("DB_NAME", "hms_db")
+
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+# Comma separated read replica URLs; list/get handlers are routed to these
+REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+# Async stack (aiomysql in production, aiosqlite for local testing)
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
+# Routers whose CRUD handlers run on the async stack, e.g. "patients,doctors" or "all"
+ASYNC_ROUTERS = {name.strip() for name in os.getenv("ASYNC_ROUTERS", "").split(",") if name.strip()}
+
+# ------------ POOL SETTINGS ------------
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") not in ("0", "false", "False")
+
+# Seconds reads stay on the primary after a write (replica lag protection)
+READ_STICKY_SECONDS = float(os.getenv("DB_READ_STICKY_SECONDS", "2"))
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how often and how long checkouts had to wait."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self.stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self.stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+def _pool_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+# ------------ QUERY INSTRUMENTATION ------------
+# Every statement on every engine (primary, replicas and the async stack,
+# each passed through instrument_engine) is timed and counted against the
+# current request. Slow statements are logged with their parameters;
+# requests over the query budget, or repeating one statement many times (an
+# N+1 loop), are logged when they finish.
+SLOW_QUERY_SECONDS = float(os.getenv("DB_SLOW_QUERY_MS", "200")) / 1000
+QUERY_BUDGET = int(os.getenv("DB_QUERY_BUDGET", "50"))
+REPEATED_QUERY_LIMIT = int(os.getenv("DB_REPEATED_QUERY_LIMIT", "10"))
+
+slow_query_log = logging.getLogger("hms.sql.slow")
+query_budget_log = logging.getLogger("hms.sql.budget")
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = {}
+
+
+_query_stats: ContextVar = ContextVar("query_stats", default=None)
+
+def track_queries() -> QueryStats:
+    """Start counting this request's statements (see metrics.MetricsMiddleware)."""
+    stats = QueryStats()
+    _query_stats.set(stats)
+    return stats
+
+def check_query_budget(stats: QueryStats, request: str) -> list:
+    """Log and return the budget rules ("budget", "repeated") the request broke."""
+    broken = []
+    if stats.count > QUERY_BUDGET:
+        broken.append("budget")
+        query_budget_log.warning("%s ran %d statements (budget %d)", request, stats.count, QUERY_BUDGET)
+    if stats.count > REPEATED_QUERY_LIMIT:
+        statement, times = max(stats.statements.items(), key=lambda item: item[1])
+        if times > REPEATED_QUERY_LIMIT:
+            broken.append("repeated")
+            query_budget_log.warning("%s ran one statement %d times (possible N+1): %s", request, times, statement)
+    return broken
+
+
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    metrics.QUERY_SECONDS.observe((), elapsed)
+
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+    if elapsed >= SLOW_QUERY_SECONDS:
+        metrics.SLOW_QUERIES.inc()
+        slow_query_log.warning("%.1f ms: %s | params: %.500r", elapsed * 1000, statement, parameters)
+
+
+def instrument_engine(eng):
+    """Time and count every statement run on `eng` (a sync Engine)."""
+    event.listen(eng, "before_cursor_execute", _start_query_timer)
+    event.listen(eng, "after_cursor_execute", _record_query)
+    return eng
+
+
+def make_engine(url: str):
+    options = _pool_options(url)
+    if options:
+        options["poolclass"] = InstrumentedQueuePool
+    return instrument_engine(create_engine(url, echo=False, future=True, **options))
+
+
+engine = make_engine(DATABASE_URL)
+replica_engines = [make_engine(url) for url in REPLICA_URLS]
+
+
+# ------------ READ / WRITE ROUTING ------------
+# Set per request: by main.py when the client wrote recently (cookie), and
+# after a commit for the rest of the writing request. Never shared between
+# clients, so other clients' reads keep going to the replicas.
+_force_primary: ContextVar[bool] = ContextVar("force_primary", default=False)
+
+def pin_reads_to_primary(pinned: bool = True):
+    return _force_primary.set(pinned)
+
+def reads_pinned_to_primary() -> bool:
+    return _force_primary.get()
+
+
+class RoutingSession(Session):
+    """
+    Sends sessions opened with info={"read_only": True} to a replica and
+    everything else (and anything flushed) to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if not replica_engines or not self.info.get("read_only") or self._flushing:
+            return engine
+        if "replica" not in self.info:
+            self.info["replica"] = engine if reads_pinned_to_primary() else random.choice(replica_engines)
+        return self.info["replica"]
+
+
+# Sessions live for one request, so objects keep their loaded state after
+# commit instead of being re-read when the response is serialized.
 SessionLocal = sessionmaker(
     bind=engine,
+    class_=RoutingSession,
     autoflush=False,
     autocommit=False,
+    expire_on_commit=False,
     future=True
 )
 
 Base = declarative_base()
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_write(session):
+    # Scoped to the current request's context only
+    if replica_engines and not session.info.get("read_only"):
+        pin_reads_to_primary(True)
+
+
+def get_read_db():
+    """Session for read-only handlers; routed to a replica when one is configured."""
+    db = SessionLocal(info={"read_only": True})
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def pool_capacity(eng=None) -> int:
+    """Connections the pool can have open at once (size + overflow); 0 if unbounded."""
+    pool = (eng or engine).pool
+    if isinstance(pool, QueuePool) and pool._max_overflow >= 0:
+        return pool.size() + pool._max_overflow
+    return 0
+
+
+def pool_stats() -> dict:
+    def describe(name, eng):
+        pool = eng.pool
+        stats = {"name": name, "status": pool.status()}
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+            )
+        if isinstance(pool, InstrumentedQueuePool):
+            with pool.stats_lock:
+                stats.update(
+                    checkouts=pool.checkouts,
+                    timeouts=pool.timeouts,
+                    wait_seconds_total=round(pool.wait_total, 6),
+                    wait_seconds_max=round(pool.wait_max, 6),
+                )
+        return stats
+
+    return {
+        "primary": describe("primary", engine),
+        "replicas": [describe(f"replica-{i}", eng) for i, eng in enumerate(replica_engines)],
+    }
+
+
+# ------------ ASYNC ENGINE ------------
+# Created on first use so the sync-only setup does not need an async driver.
+_async_session_factory = None
+
+def get_async_session_factory():
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False, **_pool_options(ASYNC_DATABASE_URL))
+        instrument_engine(async_engine.sync_engine)
+        _async_session_factory = async_sessionmaker(
+            bind=async_engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return _async_session_factory
+
+def uses_async(router_name: str) -> bool:
+    return "all" in ASYNC_ROUTERS or router_name in ASYNC_ROUTERS
+
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
@@ -0,0 +1,236 @@
+# ids.py
+# Row identifiers: how new ids are generated and how they are stored.
+#
+#   ID_FORMAT=uuid4    random ids (default)
+#   ID_FORMAT=uuid7    time-ordered ids: a millisecond timestamp, then a
+#                      per-process sequence and random bits. New rows land at
+#                      the right-hand edge of every primary key index instead
+#                      of on a random page, so inserts stop splitting pages
+#                      all over the B-tree
+#
+#   ID_STORAGE=string  CHAR(36) text (default)
+#   ID_STORAGE=binary  the 16 raw bytes (BINARY(16)), less than half the key
+#                      size in every primary key, foreign key and index
+#
+# The API and the Python code only ever see the canonical 36-character
+# string: `BinaryId` converts on the way in and out, so schemas, filters,
+# cursors and lookups keep working with strings. Switching an existing
+# database to binary storage is done by `python -m migrations upgrade` (see
+# `convert_storage`) once ID_STORAGE=binary is set.
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy import BINARY, Column, MetaData, String, Table, inspect, literal_column, select, update
+from sqlalchemy.types import TypeDecorator
+
+ID_FORMAT = os.getenv("ID_FORMAT", "uuid4")
+ID_STORAGE = os.getenv("ID_STORAGE", "string")
+
+NIL = bytes(16)
+
+
+# ------------ GENERATION ------------
+class _UUID7:
+    """RFC 9562 UUIDv7, with a 12-bit sequence keeping ids from one process ordered within a millisecond."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._sequence = 0
+
+    def __call__(self) -> str:
+        with self._lock:
+            ms = time.time_ns() // 1_000_000
+            if ms > self._last_ms:
+                self._last_ms = ms
+                self._sequence = int.from_bytes(os.urandom(2), "big") & 0x7FF
+            else:
+                # Same millisecond (or the clock stepped back): keep counting
+                self._sequence += 1
+                if self._sequence > 0xFFF:
+                    self._last_ms += 1
+                    self._sequence = 0
+            ms, sequence = self._last_ms, self._sequence
+        rand = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+        value = (ms & ((1 << 48) - 1)) << 80 | 0x7 << 76 | sequence << 64 | 0b10 << 62 | rand
+        return str(uuid.UUID(int=value))
+
+
+uuid7 = _UUID7()
+
+
+def uuid4() -> str:
+    return str(uuid.uuid4())
+
+
+GENERATORS = {"uuid4": uuid4, "uuid7": uuid7}
+
+
+def new_id() -> str:
+    return GENERATORS[ID_FORMAT]()
+
+
+# ------------ STORAGE ------------
+def to_bytes(value) -> bytes:
+    """
+    16-byte form of an id. Strings that are not UUIDs (and "", the rollups'
+    "no key" marker) become the nil UUID, which no row has, so a lookup by a
+    malformed id still just finds nothing.
+    """
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, uuid.UUID):
+        return value.bytes
+    try:
+        return uuid.UUID(value).bytes
+    except (TypeError, ValueError, AttributeError):
+        return NIL
+
+
+def to_str(value) -> str:
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    if value.strip(b"\0") == b"":
+        return ""
+    return str(uuid.UUID(bytes=value))
+
+
+class BinaryId(TypeDecorator):
+    """Id strings in Python, 16 bytes in the database."""
+
+    impl = BINARY(16)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_bytes(value)
+
+    def literal_processor(self, dialect):
+        # BINARY's own literal processor decodes the bytes as text; a hex
+        # literal is understood by both SQLite and MySQL
+        return lambda value: f"X'{to_bytes(value).hex()}'"
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else to_str(value)
+
+
+def Id():
+    """Column type of primary keys and of every column holding an id."""
+    return BinaryId() if ID_STORAGE == "binary" else String(36)
+
+
+# ------------ CONVERSION ------------
+# The storage an existing database uses is recorded in schema_settings
+# (created by migration 0008).
+schema_settings = Table(
+    "schema_settings", MetaData(),
+    Column("name", String(64), primary_key=True),
+    Column("value", String(200), nullable=False),
+)
+
+CONVERT_BATCH_SIZE = 1000
+
+
+def stored_as(conn) -> str:
+    if not inspect(conn).has_table("schema_settings"):
+        return "string"
+    value = conn.execute(
+        select(schema_settings.c.value).where(schema_settings.c.name == "id_storage")
+    ).scalar()
+    return value or "string"
+
+
+def check_storage(conn):
+    """Raise if the database stores ids differently from ID_STORAGE."""
+    stored = stored_as(conn)
+    if stored != ID_STORAGE:
+        raise RuntimeError(
+            f"Ids are stored as {stored} but ID_STORAGE={ID_STORAGE}; run `python -m migrations upgrade`"
+        )
+
+
+def id_columns(conn):
+    """{table: [id column names]} for every existing table with binary id columns in the models."""
+    import models
+
+    existing = set(inspect(conn).get_table_names())
+    found = {}
+    for table in models.Base.metadata.sorted_tables:
+        names = [c.name for c in table.columns if isinstance(c.type, BinaryId)]
+        if names and table.name in existing:
+            found[table.name] = (table, names)
+    return found
+
+
+def convert_storage(conn, log=print):
+    """Rewrite every id column from CHAR(36) text to BINARY(16), if ID_STORAGE asks for it."""
+    stored = stored_as(conn)
+    if stored == ID_STORAGE:
+        return
+    if ID_STORAGE != "binary":
+        raise RuntimeError(f"Converting ids from {stored} back to {ID_STORAGE} storage is not supported")
+
+    columns = id_columns(conn)
+    log(f"Converting ids to binary in {len(columns)} tables")
+    if conn.dialect.name == "sqlite":
+        _convert_sqlite(conn, columns)
+    elif conn.dialect.name == "mysql":
+        _convert_mysql(conn, columns)
+    else:
+        raise RuntimeError(f"Binary id conversion is not implemented for {conn.dialect.name}")
+    conn.execute(update(schema_settings).where(schema_settings.c.name == "id_storage").values(value="binary"))
+
+
+def _convert_sqlite(conn, columns):
+    # SQLite columns take any type of value: rewrite the values in place,
+    # keyed by rowid (foreign keys are not enforced on these connections).
+    from migrations.ops import reflect
+
+    for name, (_, names) in columns.items():
+        table = reflect(conn, name)
+        rowid = literal_column("rowid")
+        last = -1
+        while True:
+            rows = conn.execute(
+                select(rowid, *(table.c[n] for n in names)).where(rowid > last).order_by(rowid).limit(CONVERT_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            for row in rows:
+                values = {n: to_bytes(v) for n, v in zip(names, row[1:]) if v is not None}
+                if values:
+                    conn.execute(table.update().where(rowid == row[0]).values(values))
+            last = rows[-1][0]
+
+
+def _convert_mysql(conn, columns):
+    # Foreign keys pin their columns' types: drop them, convert every column
+    # (text -> VARBINARY keeps the bytes, UNHEX packs them, then BINARY(16)),
+    # and put them back.
+    inspector = inspect(conn)
+    foreign_keys = {name: inspector.get_foreign_keys(name) for name in columns}
+    for name, fks in foreign_keys.items():
+        for fk in fks:
+            conn.exec_driver_sql(f"ALTER TABLE `{name}` DROP FOREIGN KEY `{fk['name']}`")
+
+    for name, (table, names) in columns.items():
+        def modify(type_):
+            return ", ".join(
+                f"MODIFY `{n}` {type_}{'' if table.c[n].nullable else ' NOT NULL'}" for n in names
+            )
+
+        conn.exec_driver_sql(f"ALTER TABLE `{name}` {modify('VARBINARY(36)')}")
+        assignments = ", ".join(f"`{n}` = UNHEX(REPLACE(`{n}`, '-', ''))" for n in names)
+        conn.exec_driver_sql(f"UPDATE `{name}` SET {assignments}")
+        conn.exec_driver_sql(f"ALTER TABLE `{name}` {modify('BINARY(16)')}")
+
+    for name, fks in foreign_keys.items():
+        for fk in fks:
+            local = ", ".join(f"`{c}`" for c in fk["constrained_columns"])
+            remote = ", ".join(f"`{c}`" for c in fk["referred_columns"])
+            conn.exec_driver_sql(
+                f"ALTER TABLE `{name}` ADD CONSTRAINT `{fk['name']}` FOREIGN KEY ({local})"
+                f" REFERENCES `{fk['referred_table']}` ({remote})"
+            )
@@ -0,0 +1,324 @@
+# live.py
+# Push feed for the appointment queue, served as Server-Sent Events at
+# GET /appointments/stream.
+#
+# Appointment writes are collected while the session flushes and published
+# when the transaction commits (never on rollback), so a screen only sees
+# changes that are really in the database. Set-based status changes bypass
+# the flush; transitions.py records them with `record_status_changes`.
+#
+# Fan-out goes through a `Broker` with a pluggable backend:
+#
+#   LIVE_BACKEND=local   events reach subscribers of this worker only
+#   LIVE_BACKEND=shared  events are also appended to a SQLite file on local
+#                        disk (LIVE_PATH) that every worker on the host tails,
+#                        so a write in one worker reaches all of their screens
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+import metrics
+import models
+import schemas
+from serialization import dumps, row_encoder
+
+LIVE_BACKEND = os.getenv("LIVE_BACKEND", "local")
+LIVE_PATH = os.getenv("LIVE_PATH", os.path.join(tempfile.gettempdir(), "hms_live.sqlite3"))
+LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "0.25"))
+# Events buffered per screen; a screen that falls further behind is sent `reset`
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "1000"))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+# Shared-backend events older than this are pruned from the file
+LIVE_RETENTION_SECONDS = 60.0
+
+log = logging.getLogger("hms.live")
+
+SUBSCRIBERS = metrics.Gauge("hms_live_subscribers", "Open live queue streams.")
+EVENTS = metrics.Counter("hms_live_events_total", "Appointment events published by this worker.", ("type",))
+RESETS = metrics.Counter("hms_live_resets_total", "Streams reset because the screen fell behind.")
+
+_encoder = row_encoder(models.Appointment, schemas.AppointmentOut)
+# Columns an event carries; bulk transitions select these for the rows they move
+APPOINTMENT_FIELDS = tuple(_encoder.names)
+
+
+# ------------ EVENTS ------------
+def _key(doctor_id, day):
+    return [doctor_id, day.isoformat() if day is not None else None]
+
+
+def make_event(type: str, row: dict, previous=None) -> dict:
+    """
+    Wire form of one change: the event `type`, its JSON `data` (the
+    appointment as AppointmentOut renders it) and the (doctor_id, date) queue
+    `keys` it belongs to, current first, then the one it moved out of.
+    """
+    keys = [_key(row["doctor_id"], row["appointment_date"])]
+    if previous is not None and previous != keys[0]:
+        keys.append(previous)
+    return {"type": type, "data": dumps(_encoder.to_dicts([[row[name] for name in APPOINTMENT_FIELDS]])[0]).decode(),
+            "keys": keys}
+
+
+def _row(obj) -> dict:
+    return {name: getattr(obj, name) for name in APPOINTMENT_FIELDS}
+
+
+def _previous_key(obj):
+    state = inspect(obj)
+    before = []
+    for name in ("doctor_id", "appointment_date"):
+        history = state.attrs[name].history
+        before.append(history.deleted[0] if history.deleted else getattr(obj, name))
+    return _key(*before)
+
+
+def record(session, *events):
+    """Queue events for publishing when `session` commits."""
+    session.info.setdefault("live_events", []).extend(events)
+
+
+def record_status_changes(session, rows, status):
+    """Events for rows moved to `status` by an UPDATE outside the unit of work."""
+    record(session, *(make_event("status", {**row, "status": status}) for row in rows))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_appointment_events(session, flush_context):
+    events = []
+    for obj in session.new:
+        if isinstance(obj, models.Appointment):
+            events.append(make_event("created", _row(obj)))
+    for obj in session.dirty:
+        if isinstance(obj, models.Appointment) and session.is_modified(obj, include_collections=False):
+            changed = {attr.key for attr in inspect(obj).attrs if attr.history.has_changes()}
+            type = "status" if changed <= {"status", "slot_taken"} else "updated"
+            events.append(make_event(type, _row(obj), _previous_key(obj)))
+    for obj in session.deleted:
+        if isinstance(obj, models.Appointment):
+            events.append(make_event("deleted", _row(obj)))
+    if events:
+        record(session, *events)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_appointment_events(session):
+    for live_event in session.info.pop("live_events", ()):
+        broker.publish(live_event)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_appointment_events(session):
+    session.info.pop("live_events", None)
+
+
+# ------------ BACKENDS ------------
+class LocalBackend:
+    """Events stay in this worker."""
+
+    name = "local"
+
+    def publish(self, live_event: dict):
+        pass
+
+    def start(self, deliver):
+        pass
+
+
+class SharedBackend:
+    """
+    Events are appended to a SQLite file shared by every worker on the host.
+
+    A daemon thread per worker tails the file and delivers events written by
+    the other workers; its own events are delivered directly.
+    """
+
+    name = "shared"
+
+    def __init__(self, path: str = LIVE_PATH):
+        self.path = path
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._started = False
+        self._lock = threading.Lock()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS live_events ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL,"
+            " message TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def publish(self, live_event: dict):
+        self._connect().execute(
+            "INSERT INTO live_events (origin, message, created_at) VALUES (?, ?, ?)",
+            (self.origin, json.dumps(live_event), time.time()),
+        )
+
+    def start(self, deliver):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._tail, args=(deliver,), name="live-events", daemon=True).start()
+
+    def _tail(self, deliver):
+        conn = self._connect()
+        last = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM live_events").fetchone()[0]
+        polls = 0
+        while True:
+            time.sleep(LIVE_POLL_SECONDS)
+            try:
+                rows = conn.execute(
+                    "SELECT seq, origin, message FROM live_events WHERE seq > ? ORDER BY seq", (last,)
+                ).fetchall()
+                for seq, origin, message in rows:
+                    last = seq
+                    if origin != self.origin:
+                        deliver(json.loads(message))
+                polls += 1
+                if polls % 240 == 0:
+                    conn.execute("DELETE FROM live_events WHERE created_at < ?", (time.time() - LIVE_RETENTION_SECONDS,))
+            except sqlite3.Error:
+                log.exception("Live event tail failed; retrying")
+
+
+def make_backend():
+    if LIVE_BACKEND == "shared":
+        return SharedBackend()
+    return LocalBackend()
+
+
+# ------------ BROKER ------------
+class Subscription:
+    """One open stream: the queue it watches and its event buffer on the stream's event loop."""
+
+    def __init__(self, doctor_id, day):
+        self.doctor_id = doctor_id
+        self.day = day.isoformat()
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(LIVE_QUEUE_SIZE)
+
+    def type_for(self, live_event: dict):
+        """Event type this screen should see, or None if the change is not in its queue."""
+        for i, (doctor_id, day) in enumerate(live_event["keys"]):
+            if day == self.day and (self.doctor_id is None or doctor_id == self.doctor_id):
+                # Moved to another doctor or day: gone from this queue
+                return live_event["type"] if i == 0 else "removed"
+        return None
+
+    def put(self, type: str, data: str):
+        try:
+            self.queue.put_nowait((type, data))
+        except asyncio.QueueFull:
+            # Behind by LIVE_QUEUE_SIZE events: drop them and tell the screen to reload
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(("reset", "{}"))
+            RESETS.inc()
+
+
+class Broker:
+    """Fans committed appointment events out to the open streams."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, doctor_id, day) -> Subscription:
+        self.backend.start(self.deliver)
+        subscription = Subscription(doctor_id, day)
+        with self._lock:
+            self._subscribers.add(subscription)
+        SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription not in self._subscribers:
+                return
+            self._subscribers.discard(subscription)
+        SUBSCRIBERS.dec()
+
+    def publish(self, live_event: dict):
+        """Called after commit, from a threadpool worker or the event loop."""
+        EVENTS.inc((live_event["type"],))
+        try:
+            self.backend.publish(live_event)
+        except Exception:  # local screens still get the event
+            log.exception("Live event publish failed")
+        self.deliver(live_event)
+
+    def deliver(self, live_event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            type = subscription.type_for(live_event)
+            if type is None:
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, type, live_event["data"])
+            except RuntimeError:  # its event loop has closed
+                self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": self.backend.name, "subscribers": len(self._subscribers)}
+
+
+broker = Broker(make_backend())
+
+
+# ------------ STREAM ------------
+def snapshot(db, doctor_id, day) -> bytes:
+    """The queue a new stream starts from, in appointment time order."""
+    A = models.Appointment
+    rows = (
+        db.query(*(getattr(A, name) for name in APPOINTMENT_FIELDS))
+        .filter(A.appointment_date == day, *([A.doctor_id == doctor_id] if doctor_id else []))
+        .order_by(A.appointment_time, A.created_at, A.id)
+    )
+    return dumps({"date": day, "doctor_id": doctor_id, "appointments": _encoder.to_dicts(rows)})
+
+
+def _sse(type: str, data: str) -> str:
+    return f"event: {type}\ndata: {data}\n\n"
+
+
+async def stream(subscription: Subscription, snapshot):
+    """
+    SSE body: the `snapshot` (loaded after subscribing, so no change is
+    missed; a change may arrive both ways, and events are full rows, so
+    clients upsert by id) followed by the subscription's events.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        yield _sse("snapshot", (await snapshot()).decode())
+        while True:
+            try:
+                type, data = await asyncio.wait_for(subscription.queue.get(), LIVE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment line: keeps proxies from closing an idle stream
+                yield ": heartbeat\n\n"
+                continue
+            yield _sse(type, data)
+            if type == "reset":
+                return
+    finally:
+        broker.unsubscribe(subscription)
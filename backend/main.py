@@ -1,7 +1,13 @@
 # main.py
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
+import admission
+import metrics
+import startup
+from database import uses_async, replica_engines, pin_reads_to_primary, READ_STICKY_SECONDS
 
 # Import routers
 from routers import (
@@ -11,18 +17,40 @@ from routers import (
     medical_records,
     billing,
     pharmacy,
-    lab
+    lab,
+    stats,
+    reports
 )
 
-# Create tables (for development)
-Base.metadata.create_all(bind=engine)
+# ------------ STARTUP ------------
+# Importing the app never touches the database: migrations (dev mode only)
+# and the connection / cache warm-up run here, see startup.py
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warming = await startup.start()
+    yield
+    if warming is not None and not warming.done():
+        warming.cancel()
+        try:
+            await warming
+        except asyncio.CancelledError:
+            pass
+
 
 app = FastAPI(
     title="Hospital Management System (MySQL + UUID)",
     version="1.0.0",
-    description="Complete CRUD-based Hospital Management System backend"
+    description="Complete CRUD-based Hospital Management System backend",
+    lifespan=lifespan,
 )
 
+# ------------ ADMISSION CONTROL ------------
+# Per-group concurrency limits sized to the DB pool, with bounded priority
+# queues; over capacity, requests get 503 + Retry-After (see admission.py).
+# Added first, so it runs inside CORS and metrics: shed responses still carry
+# CORS headers and are counted.
+app.add_middleware(admission.AdmissionMiddleware)
+
 # ------------ CORS ------------
 app.add_middleware(
     CORSMiddleware,
@@ -30,9 +58,67 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
+# ------------ METRICS ------------
+# Per-route latency, status codes, in-flight requests and SQL per request,
+# scraped from /metrics (see metrics.py and the engine hooks in database.py)
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# ------------ HEALTH ------------
+# Liveness only says the process answers; readiness is 503 until warm-up is done
+@app.get("/health/live", include_in_schema=False)
+def health_live():
+    return startup.liveness()
+
+@app.get("/health/ready", include_in_schema=False)
+def health_ready():
+    return startup.readiness()
+
+# ------------ READ-YOUR-WRITES ------------
+# With read replicas configured, a client that just wrote keeps reading from
+# the primary for READ_STICKY_SECONDS, across workers, via a short-lived cookie.
+STICKY_COOKIE = "hms_primary_until"
+
+if replica_engines:
+    @app.middleware("http")
+    async def stick_to_primary_after_write(request: Request, call_next):
+        try:
+            pinned = float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        pin_reads_to_primary(pinned)
+
+        response = await call_next(request)
+        if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time.time() + READ_STICKY_SECONDS),
+                max_age=max(1, int(READ_STICKY_SECONDS)),
+                httponly=True,
+            )
+        return response
+
 # ------------ ROUTES ------------
+# Routers listed in ASYNC_ROUTERS serve their CRUD handlers from the async stack
+for name, module in {
+    "patients": patients,
+    "doctors": doctors,
+    "appointments": appointments,
+    "medical_records": medical_records,
+    "billing": billing,
+    "pharmacy": pharmacy,
+    "lab": lab,
+}.items():
+    if uses_async(name):
+        for handler in module.async_handlers:
+            handler.install(module.router)
+
 app.include_router(patients.router)
 app.include_router(doctors.router)
 app.include_router(appointments.router)
@@ -40,6 +126,8 @@ app.include_router(medical_records.router)
 app.include_router(billing.router)
 app.include_router(pharmacy.router)
 app.include_router(lab.router)
+app.include_router(stats.router)
+app.include_router(reports.router)
 
 # ------------ ROOT ENDPOINT ------------
 @app.get("/")
@@ -0,0 +1,384 @@
+# matching.py
+"""
+Duplicate-patient candidates: the same person registered twice under a
+slightly different spelling, a changed phone number or a mistyped birth date.
+
+Every patient gets a few blocking keys in `patient_match_keys`, kept in sync
+on flush and by the bulk loader, like the search terms:
+
+    p:<phone digits>              same phone number
+    d:<dob>:<soundex>             same birth date and a name word (or the whole
+                                  name, spaces removed) that sounds alike
+    y:<year>:<soundex>:<soundex>  same birth year, first and last name sound alike
+    n:<soundex>:<soundex>         first and last name sound alike
+
+A new registration is only compared with the patients sharing one of its
+keys, so a match costs one index lookup per key and a handful of
+comparisons, not a scan of the table. Blocks larger than MAX_BLOCK_SIZE
+(a very common name, looked up without a birth date) say nothing useful and
+are skipped.
+
+Candidates are scored from 0 to 1 on name similarity, birth date, phone and
+gender; those at MATCH_THRESHOLD or above are likely the same person.
+
+The batch mode clusters a whole dataset through the same blocks, so it runs
+in near-linear time:
+
+    python -m matching dedupe [--csv patients.csv] [--threshold 0.8] [--output clusters.csv]
+
+Recompute every patient's keys (e.g. after changing how they are built) with:
+
+    python -m matching rebuild
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+from collections import defaultdict
+from datetime import date
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import Session
+
+import models
+from search import words
+
+MATCH_THRESHOLD = float(os.getenv("MATCH_THRESHOLD", "0.8"))
+MAX_BLOCK_SIZE = int(os.getenv("MATCH_MAX_BLOCK_SIZE", "200"))
+DEFAULT_MATCH_LIMIT = 10
+MAX_MATCH_LIMIT = 50
+
+KEY_LENGTH = 40
+# Phones are compared on their last digits, so "+1 555 0100" matches "5550100"
+PHONE_DIGITS = 10
+
+FIELDS = ("id", "name", "dob", "gender", "phone")
+
+# Share of the score each field carries when both sides have it
+WEIGHTS = {"name": 0.5, "dob": 0.35, "phone": 0.15}
+# Same name, nothing else to compare: likely, but not certain
+NAME_ONLY_FACTOR = 0.8
+GENDER_MISMATCH_FACTOR = 0.7
+
+
+# ------------ KEYS ------------
+_SOUNDEX = {ch: str(code) for code, letters in enumerate(("bfpv", "cgjkqsxz", "dt", "l", "mn", "r"), start=1)
+            for ch in letters}
+
+
+def soundex(word: str) -> str:
+    """American Soundex: "Smith" and "Smyth" are both S530."""
+    letters = [ch for ch in word if "a" <= ch <= "z"]
+    if not letters:
+        return ""
+    code, last = letters[0].upper(), _SOUNDEX.get(letters[0], "")
+    for ch in letters[1:]:
+        digit = _SOUNDEX.get(ch, "")
+        if digit and digit != last:
+            code += digit
+        if ch not in "hw":
+            last = digit
+    return (code + "000")[:4]
+
+
+def normalize_phone(phone) -> str:
+    return re.sub(r"\D", "", phone or "")[-PHONE_DIGITS:]
+
+
+def _name_codes(name) -> list:
+    # Initials carry too little to block on
+    return [soundex(word) for word in words(name) if len(word) > 1 and soundex(word)]
+
+
+def _joined_code(name) -> str:
+    # Same for "Mary Ann" and "Maryann", whose words share no code
+    return soundex("".join(words(name)))
+
+
+def _as_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def blocking_keys(values) -> set:
+    """Blocking keys of a patient (a dict with name, dob and phone)."""
+    keys = set()
+    phone = normalize_phone(values.get("phone"))
+    if phone:
+        keys.add(f"p:{phone}")
+    codes = _name_codes(values.get("name"))
+    dob = _as_date(values.get("dob"))
+    if dob:
+        keys.update(f"d:{dob.isoformat()}:{code}" for code in {*codes, _joined_code(values.get("name"))} if code)
+    if len(codes) >= 2:
+        first_last = ":".join(sorted((codes[0], codes[-1])))
+        keys.add(f"n:{first_last}")
+        if dob:
+            keys.add(f"y:{dob.year}:{first_last}")
+    return {key[:KEY_LENGTH] for key in keys}
+
+
+def key_rows(rows):
+    return [
+        {"key": key, "patient_id": values["id"]}
+        for values in rows
+        for key in blocking_keys(values)
+    ]
+
+
+def index_rows(conn, model, rows):
+    """(Re)write the blocking keys of `rows` (dicts with the columns) if `model` is Patient."""
+    if model is not models.Patient or not rows:
+        return
+    MatchKey = models.PatientMatchKey
+    conn.execute(delete(MatchKey).where(MatchKey.patient_id.in_([values["id"] for values in rows])))
+    new_keys = key_rows(rows)
+    if new_keys:
+        conn.execute(insert(MatchKey), new_keys)
+
+
+def unindex_rows(conn, model, ids):
+    if model is models.Patient and ids:
+        conn.execute(delete(models.PatientMatchKey).where(models.PatientMatchKey.patient_id.in_(ids)))
+
+
+def rebuild(conn, batch_size: int = 5000):
+    """Recompute the blocking keys of every patient from scratch."""
+    conn.execute(delete(models.PatientMatchKey))
+    P = models.Patient
+    stmt = select(*(getattr(P, field) for field in FIELDS)).order_by(P.id).limit(batch_size)
+    last_id = None
+    while True:
+        chunk = conn.execute(stmt if last_id is None else stmt.where(P.id > last_id)).mappings().all()
+        if not chunk:
+            return
+        rows = key_rows(chunk)
+        if rows:
+            conn.execute(insert(models.PatientMatchKey), rows)
+        last_id = chunk[-1]["id"]
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_match_keys(session, flush_context):
+    changed = [obj for obj in (*session.new, *session.dirty) if isinstance(obj, models.Patient)]
+    removed = [obj.id for obj in session.deleted if isinstance(obj, models.Patient)]
+    if not changed and not removed:
+        return
+    conn = session.connection()
+    index_rows(conn, models.Patient, [{field: getattr(obj, field) for field in FIELDS} for obj in changed])
+    unindex_rows(conn, models.Patient, removed)
+
+
+# ------------ SCORING ------------
+class Profile:
+    """A patient (dict with name, dob, gender, phone) in the form scoring compares."""
+
+    __slots__ = ("values", "name", "sorted_name", "dob", "phone", "gender")
+
+    def __init__(self, values):
+        self.values = values
+        name_words = words(values.get("name"))
+        self.name = " ".join(name_words)
+        self.sorted_name = " ".join(sorted(name_words))
+        self.dob = _as_date(values.get("dob"))
+        self.phone = normalize_phone(values.get("phone"))
+        self.gender = (values.get("gender") or "").casefold()
+
+
+def _name_similarity(a: Profile, b: Profile) -> float:
+    if not a.name or not b.name:
+        return 0.0
+    similarity = SequenceMatcher(None, a.name, b.name).ratio()
+    # Also compare with the words sorted, for "Smith John" vs "John Smith"
+    if a.sorted_name != a.name or b.sorted_name != b.name:
+        similarity = max(similarity, SequenceMatcher(None, a.sorted_name, b.sorted_name).ratio())
+    return similarity
+
+
+def _dob_similarity(a: date, b: date) -> float:
+    if a == b:
+        return 1.0
+    # One mistyped digit, or day and month swapped
+    typo = sum(x != y for x, y in zip(a.isoformat(), b.isoformat())) == 1
+    if typo or (a.year == b.year and a.month == b.day and a.day == b.month):
+        return 0.6
+    return 0.0
+
+
+def _score(a: Profile, b: Profile, floor: float = 0.0):
+    parts, reasons = {}, []
+    if a.dob and b.dob:
+        parts["dob"] = _dob_similarity(a.dob, b.dob)
+        reasons.append("same birth date" if parts["dob"] == 1 else
+                       "similar birth date" if parts["dob"] else "different birth date")
+    # A different phone is weak evidence (numbers change); only a match counts
+    if a.phone and a.phone == b.phone:
+        parts["phone"] = 1.0
+        reasons.append("same phone")
+
+    factor = 1.0 if parts else NAME_ONLY_FACTOR
+    if a.gender and b.gender and a.gender != b.gender:
+        factor *= GENDER_MISMATCH_FACTOR
+        reasons.append("different gender")
+    weight = WEIGHTS["name"] + sum(WEIGHTS[field] for field in parts)
+    known = sum(WEIGHTS[field] * value for field, value in parts.items())
+    # Not even an identical name would reach `floor`: skip the string comparison
+    if (WEIGHTS["name"] + known) / weight * factor < floor:
+        return 0.0, []
+
+    name = _name_similarity(a, b)
+    return round((WEIGHTS["name"] * name + known) / weight * factor, 3), [f"name {name:.2f}", *reasons]
+
+
+def score(a, b):
+    """(score from 0 to 1, reasons) for two patients given as dicts."""
+    return _score(Profile(a), Profile(b))
+
+
+# ------------ CANDIDATES ------------
+def candidate_ids(db, keys, exclude_id=None) -> set:
+    """Patients sharing a key with `keys`; one bounded index lookup per key."""
+    MatchKey = models.PatientMatchKey
+    found = set()
+    for key in sorted(keys):
+        ids = db.execute(
+            select(MatchKey.patient_id).where(MatchKey.key == key).limit(MAX_BLOCK_SIZE + 1)
+        ).scalars().all()
+        if len(ids) <= MAX_BLOCK_SIZE:
+            found.update(ids)
+    found.discard(exclude_id)
+    return found
+
+
+def find_matches(db, values, threshold: float = MATCH_THRESHOLD, limit: int = DEFAULT_MATCH_LIMIT,
+                 exclude_id=None) -> list:
+    """Existing patients likely to be the person described by `values`, best first."""
+    ids = candidate_ids(db, blocking_keys(values), exclude_id)
+    if not ids:
+        return []
+    query, matches = Profile(values), []
+    for patient in db.execute(select(models.Patient).where(models.Patient.id.in_(list(ids)))).scalars():
+        value, reasons = _score(query, Profile({field: getattr(patient, field) for field in FIELDS}), threshold)
+        if value >= threshold:
+            matches.append({"patient": patient, "score": value, "reasons": reasons})
+    matches.sort(key=lambda match: (-match["score"], match["patient"].id))
+    return matches[:limit]
+
+
+# ------------ BATCH ------------
+def find_duplicates(rows, threshold: float = MATCH_THRESHOLD) -> list:
+    """
+    Clusters of rows (dicts with id, name, dob, gender, phone) that are likely
+    the same person. Only rows sharing a blocking key are compared, and
+    blocks are capped at MAX_BLOCK_SIZE, so the work grows with the number
+    of rows, not its square.
+    """
+    profiles = [Profile(values) for values in rows]
+    blocks = defaultdict(list)
+    for i, values in enumerate(rows):
+        for key in blocking_keys(values):
+            blocks[key].append(i)
+
+    parent = list(range(len(rows)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    compared, links = set(), {}
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+        for i, j in combinations(members, 2):
+            if (i, j) in compared:
+                continue
+            compared.add((i, j))
+            value, _ = _score(profiles[i], profiles[j], threshold)
+            if value >= threshold:
+                links[(i, j)] = value
+                parent[find(i)] = find(j)
+
+    clusters = defaultdict(list)
+    best = defaultdict(float)
+    for (i, j), value in links.items():
+        best[i] = max(best[i], value)
+        best[j] = max(best[j], value)
+    for i in best:
+        clusters[find(i)].append(i)
+    return sorted(
+        ([{**rows[i], "score": best[i]} for i in sorted(members, key=lambda i: rows[i]["id"])]
+         for members in clusters.values()),
+        key=lambda cluster: cluster[0]["id"],
+    )
+
+
+def _database_rows(batch_size: int = 5000):
+    from database import SessionLocal
+
+    P = models.Patient
+    with SessionLocal() as db:
+        stmt = select(*(getattr(P, field) for field in FIELDS)).order_by(P.id).limit(batch_size)
+        last_id = None
+        while True:
+            chunk = db.execute(stmt if last_id is None else stmt.where(P.id > last_id)).mappings().all()
+            if not chunk:
+                return
+            yield from (dict(row) for row in chunk)
+            last_id = chunk[-1]["id"]
+
+
+def _csv_rows(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for i, row in enumerate(csv.DictReader(f), start=1):
+            # Rows not yet imported are named by their line in the file
+            yield {field: row.get(field) or None for field in FIELDS} | {"id": row.get("id") or f"row-{i}"}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m matching", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    dedupe = commands.add_parser("dedupe", help="cluster likely duplicate patients")
+    dedupe.add_argument("--csv", help="patients file to check before importing (default: the database)")
+    dedupe.add_argument("--threshold", type=float, default=MATCH_THRESHOLD)
+    dedupe.add_argument("--output", help="CSV of cluster, id, score, name, dob, gender, phone (default: stdout)")
+    commands.add_parser("rebuild", help="recompute every patient's blocking keys")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        from database import engine
+
+        with engine.begin() as conn:
+            rebuild(conn)
+        print("Rebuilt patient_match_keys", file=sys.stderr)
+        return 0
+
+    rows = list(_csv_rows(args.csv) if args.csv else _database_rows())
+    clusters = find_duplicates(rows, args.threshold)
+
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(["cluster", "id", "score", *FIELDS[1:]])
+        for number, cluster in enumerate(clusters, start=1):
+            for values in cluster:
+                writer.writerow([number, values["id"], values["score"], *(values[field] for field in FIELDS[1:])])
+    finally:
+        if args.output:
+            out.close()
+    duplicates = sum(len(cluster) - 1 for cluster in clusters)
+    print(f"{len(rows)} patients, {len(clusters)} clusters, {duplicates} likely duplicates", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
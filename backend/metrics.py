@@ -0,0 +1,228 @@
+# metrics.py
+# In-process request and SQL metrics, rendered in the Prometheus text format
+# at /metrics.
+#
+# Series are plain dicts keyed by label values and guarded by one lock per
+# metric, so recording costs a dict lookup and a few additions. Routes are
+# labelled by their template ("/patients/{id}"), never the raw path, to keep
+# the number of series bounded. Each worker process keeps its own numbers;
+# scrape every worker (or sum them) behind a load balancer.
+import threading
+import time
+from bisect import bisect_left
+
+# Request latency buckets in seconds (the Prometheus client defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.series = {}
+        REGISTRY.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self):
+        with self.lock:
+            items = list(self.series.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # [per-bucket counts..., +Inf count, sum]
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        with self.lock:
+            items = [(k, list(v)) for k, v in self.series.items()]
+        lines = self.header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="%s"' % _number(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [le])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+REGISTRY = []
+
+# ------------ REQUEST METRICS ------------
+REQUEST_SECONDS = Histogram(
+    "hms_http_request_duration_seconds", "Request latency by route template.", ("method", "route")
+)
+REQUESTS = Counter("hms_http_requests_total", "Responses by route template and status code.", ("method", "route", "status"))
+IN_FLIGHT = Gauge("hms_http_requests_in_flight", "Requests currently being served.")
+
+# ------------ SQL METRICS ------------
+QUERY_SECONDS = Histogram("hms_db_query_duration_seconds", "SQL statement execution time.", buckets=QUERY_BUCKETS)
+SLOW_QUERIES = Counter("hms_db_slow_queries_total", "Statements slower than DB_SLOW_QUERY_MS.")
+REQUEST_STATEMENTS = Histogram(
+    "hms_http_request_db_statements", "SQL statements executed per request.", ("method", "route"), STATEMENT_BUCKETS
+)
+REQUEST_DB_SECONDS = Counter("hms_http_request_db_seconds_total", "Time spent in SQL by route template.", ("method", "route"))
+BUDGET_EXCEEDED = Counter(
+    "hms_http_query_budget_exceeded_total",
+    "Requests over DB_QUERY_BUDGET statements or repeating one statement DB_REPEATED_QUERY_LIMIT times (N+1).",
+    ("method", "route", "reason"),
+)
+
+
+# ------------ SCRAPE-TIME GAUGES ------------
+def _pool_lines():
+    from database import pool_stats
+
+    stats = pool_stats()
+    pools = [stats["primary"], *stats["replicas"]]
+    lines = []
+    for key, help in (("checked_out", "Connections in use."), ("overflow", "Connections beyond the pool size."),
+                      ("timeouts", "Checkouts that timed out."), ("wait_seconds_total", "Time spent waiting for a connection.")):
+        values = [(pool["name"], pool[key]) for pool in pools if key in pool]
+        if values:
+            name = f"hms_db_pool_{key}"
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+            lines += [f'{name}{{pool="{pool}"}} {_number(value)}' for pool, value in values]
+    return lines
+
+
+def _cache_lines():
+    from cache import cache_stats
+
+    caches = cache_stats()
+    lines = []
+    for key in ("hits", "misses", "evictions"):
+        name = f"hms_cache_{key}_total"
+        lines += [f"# HELP {name} Cache {key}.", f"# TYPE {name} counter"]
+        lines += [f'{name}{{cache="{_escape(cache["name"])}"}} {cache[key]}' for cache in caches]
+    return lines
+
+
+def _startup_lines():
+    from startup import state
+
+    lines = ["# HELP hms_ready Whether the worker has finished warming up.", "# TYPE hms_ready gauge",
+             f"hms_ready {int(state.ready)}"]
+    for key, value, help in (("ready_after_seconds", state.ready_after, "Seconds from process start to ready."),
+                             ("first_request_after_seconds", state.first_request_after,
+                              "Seconds from process start to the first request.")):
+        if value is not None:
+            lines += [f"# HELP hms_startup_{key} {help}", f"# TYPE hms_startup_{key} gauge",
+                      f"hms_startup_{key} {_number(value)}"]
+    return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    lines += _pool_lines()
+    lines += _cache_lines()
+    lines += _startup_lines()
+    return "\n".join(lines) + "\n"
+
+
+# ------------ MIDDLEWARE ------------
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request and the SQL it ran.
+
+    Statement counts come from the engine hooks in database.py, collected in
+    a per-request `QueryStats` that the sync handler's threadpool worker
+    shares through contextvars.
+    """
+
+    def __init__(self, app):
+        from database import track_queries, check_query_budget
+        from startup import state
+
+        self.app = app
+        self.startup = state
+        self.track_queries = track_queries
+        self.check_query_budget = check_query_budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.startup.note_request()
+        queries = self.track_queries()
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+            REQUEST_SECONDS.observe(labels, elapsed)
+            REQUESTS.inc(labels + (str(status),))
+            REQUEST_STATEMENTS.observe(labels, queries.count)
+            if queries.count:
+                REQUEST_DB_SECONDS.inc(labels, queries.seconds)
+            for reason in self.check_query_budget(queries, " ".join(labels)):
+                BUDGET_EXCEEDED.inc(labels + (reason,))
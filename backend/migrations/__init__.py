@@ -0,0 +1,81 @@
+# migrations/__init__.py
+# Minimal versioned schema migrations.
+#
+# Each module in migrations/versions/ is named "<NNNN>_<description>.py" and
+# defines `upgrade(conn)`. Applied versions are recorded in the
+# `schema_migrations` table; `upgrade()` runs the missing ones in order, each
+# in its own transaction, then converts the id columns if ID_STORAGE asks for
+# a different storage than the database has (see ids.py).
+#
+# Migrations never import application modules, whose code moves on while a
+# migration must keep doing what it did when it was written. A migration
+# creating a table derived from others (search terms, rollups, match keys)
+# creates it empty and lists in `REBUILDS` the modules whose `rebuild(conn)`
+# fills it. Those run with the current code once every migration is in,
+# each in its own transaction; `python -m <module> rebuild` runs one by hand.
+import importlib
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+
+import ids
+from migrations import versions
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String(32), primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def discover():
+    """All migrations as (version, name, module), in version order."""
+    found = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        version, _, name = info.name.partition("_")
+        if not version.isdigit():
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{info.name}")
+        found.append((version, name, module))
+    return sorted(found, key=lambda m: m[0])
+
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending(engine):
+    done = applied_versions(engine)
+    return [m for m in discover() if m[0] not in done]
+
+
+def upgrade(engine, target=None, log=print):
+    """Apply pending migrations up to and including `target` (default: all)."""
+    rebuilds = []
+    for version, name, module in pending(engine):
+        if target is not None and version > target:
+            break
+        log(f"Applying migration {version}_{name}")
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version, name=name, applied_at=datetime.now()
+            ))
+        rebuilds += [rebuild for rebuild in getattr(module, "REBUILDS", ()) if rebuild not in rebuilds]
+    if target is not None:
+        # The application code may need tables from later migrations
+        for rebuild in rebuilds:
+            log(f"Run `python -m {rebuild} rebuild` once upgraded to the latest version")
+        return
+    with engine.begin() as conn:
+        ids.convert_storage(conn, log)
+    for rebuild in rebuilds:
+        log(f"Rebuilding {rebuild}")
+        with engine.begin() as conn:
+            importlib.import_module(rebuild).rebuild(conn)
@@ -0,0 +1,29 @@
+# migrations/__main__.py
+"""
+Usage (from the backend folder):
+
+    python -m migrations upgrade [VERSION]
+    python -m migrations status
+"""
+import sys
+
+from database import engine
+import migrations
+
+
+def main(argv):
+    command = argv[0] if argv else "status"
+    if command == "upgrade":
+        migrations.upgrade(engine, target=argv[1] if len(argv) > 1 else None)
+    elif command == "status":
+        done = migrations.applied_versions(engine)
+        for version, name, _ in migrations.discover():
+            print(f"[{'x' if version in done else ' '}] {version}_{name}")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
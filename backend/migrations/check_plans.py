@@ -0,0 +1,111 @@
+# migrations/check_plans.py
+"""
+Assert that the hot queries are served by the indexes from 0002 onwards.
+
+Usage (from the backend folder, against a migrated database):
+
+    python -m migrations.check_plans
+
+Runs EXPLAIN (MySQL) or EXPLAIN QUERY PLAN (SQLite) for each query and exits
+with status 1 if any of them does not use its expected index. On MySQL,
+run it against a database with realistic data (e.g. seeded by the
+benchmarks), since the optimizer may prefer a full scan on tiny tables.
+"""
+import sys
+from datetime import date
+
+from sqlalchemy import select
+
+from database import engine
+import models
+
+SAMPLE_ID = "00000000-0000-0000-0000-000000000000"
+TODAY = date(2025, 1, 1)
+
+CHECKS = [
+    (
+        "doctor's day schedule",
+        select(models.Appointment)
+        .where(models.Appointment.doctor_id == SAMPLE_ID, models.Appointment.appointment_date == TODAY)
+        .order_by(models.Appointment.appointment_time),
+        # the slot lock from 0003 has the same leading columns
+        ("ix_appointments_doctor_date_time", "ux_appointments_doctor_slot"),
+    ),
+    (
+        "patient's appointments",
+        select(models.Appointment)
+        .where(models.Appointment.patient_id == SAMPLE_ID)
+        .order_by(models.Appointment.appointment_date),
+        "ix_appointments_patient_date",
+    ),
+    (
+        "patient's medical history",
+        select(models.MedicalRecord)
+        .where(models.MedicalRecord.patient_id == SAMPLE_ID)
+        .order_by(models.MedicalRecord.visit_date.desc()),
+        "ix_medical_records_patient_visit",
+    ),
+    (
+        "pending bills, oldest first",
+        select(models.Billing)
+        .where(models.Billing.status == "pending")
+        .order_by(models.Billing.created_at),
+        "ix_billing_status_created",
+    ),
+    (
+        "patient's bills",
+        select(models.Billing).where(models.Billing.patient_id == SAMPLE_ID),
+        "ix_billing_patient_created",
+    ),
+    (
+        "patient's pharmacy sales",
+        select(models.PharmacySale).where(models.PharmacySale.patient_id == SAMPLE_ID),
+        "ix_pharmacy_sales_patient_date",
+    ),
+    (
+        "patient's lab reports",
+        select(models.LabReport).where(models.LabReport.patient_id == SAMPLE_ID),
+        "ix_lab_reports_patient_date",
+    ),
+    (
+        "pending lab reports",
+        select(models.LabReport)
+        .where(models.LabReport.status == "pending")
+        .order_by(models.LabReport.test_date),
+        "ix_lab_reports_status_date",
+    ),
+    (
+        "patient typeahead",
+        select(models.SearchTerm.ref_id)
+        .where(models.SearchTerm.kind == "patient", models.SearchTerm.term >= "smi", models.SearchTerm.term < "smj")
+        .order_by(models.SearchTerm.term),
+        "ix_search_terms_term",
+    ),
+]
+
+
+def used_indexes(conn, stmt):
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").mappings()
+        return {word for row in rows for word in row["detail"].split() if word.startswith(("ix_", "ux_"))}
+    rows = conn.exec_driver_sql(f"EXPLAIN {sql}").mappings()
+    return {row["key"] for row in rows if row["key"]}
+
+
+def main():
+    failures = 0
+    with engine.connect() as conn:
+        for label, stmt, expected in CHECKS:
+            found = used_indexes(conn, stmt)
+            if isinstance(expected, str):
+                expected = (expected,)
+            ok = any(name in found for name in expected)
+            expected = " or ".join(expected)
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {label}: expected {expected}, plan uses {sorted(found) or 'no index'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
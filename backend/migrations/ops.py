@@ -0,0 +1,42 @@
+# migrations/ops.py
+# Idempotent schema helpers for migrations, so a migration can be applied to
+# databases that were created with the old `Base.metadata.create_all`.
+from sqlalchemy import Index, MetaData, Table, inspect
+from sqlalchemy.schema import CreateColumn
+
+
+def reflect(conn, name):
+    return Table(name, MetaData(), autoload_with=conn)
+
+
+def create_table(conn, table):
+    table.create(conn, checkfirst=True)
+
+
+def create_index(conn, table_name, index_name, *columns, unique=False):
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(table_name)}
+    if index_name in existing:
+        return
+    table = reflect(conn, table_name)
+    Index(index_name, *(table.c[c] for c in columns), unique=unique).create(conn)
+
+
+def add_column(conn, table_name, column, check=None):
+    """`check` is an optional (name, condition) CHECK constraint added with the column."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    if column.name not in existing:
+        ddl = str(CreateColumn(column).compile(dialect=conn.dialect))
+        if check and conn.dialect.name == "sqlite":
+            # SQLite cannot add a table constraint later, but a column CHECK
+            # there may refer to other columns
+            ddl += " CONSTRAINT {} CHECK ({})".format(*check)
+        conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN {ddl}")
+    if check and conn.dialect.name != "sqlite":
+        add_check(conn, table_name, *check)
+
+
+def add_check(conn, table_name, name, condition):
+    existing = {c["name"] for c in inspect(conn).get_check_constraints(table_name)}
+    if name in existing:
+        return
+    conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD CONSTRAINT {name} CHECK ({condition})")
@@ -0,0 +1,108 @@
+# migrations/versions/0001_initial.py
+# Baseline schema, as previously created by Base.metadata.create_all.
+# Tables are defined here (not imported from models) so later model changes
+# do not alter what this migration creates.
+from sqlalchemy import (
+    Column, Date, DateTime, ForeignKey, Integer, MetaData, Numeric, String, Table, Text, Time
+)
+from sqlalchemy.sql import func
+
+from migrations.ops import create_table
+
+metadata = MetaData()
+
+patients = Table(
+    "patients", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("dob", Date),
+    Column("age", Integer),
+    Column("gender", String(10)),
+    Column("address", Text),
+    Column("phone", String(20), unique=True),
+    Column("created_at", DateTime, server_default=func.now()),
+)
+
+doctors = Table(
+    "doctors", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("specialization", String(100), nullable=False),
+    Column("phone", String(20), unique=True),
+    Column("room_no", String(10)),
+)
+
+appointments = Table(
+    "appointments", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("patient_id", String(36), ForeignKey("patients.id"), nullable=False),
+    Column("doctor_id", String(36), ForeignKey("doctors.id")),
+    Column("appointment_date", Date, nullable=False),
+    Column("appointment_time", Time),
+    Column("status", String(20)),
+    Column("created_at", DateTime, server_default=func.now()),
+)
+
+medical_records = Table(
+    "medical_records", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("patient_id", String(36), ForeignKey("patients.id"), nullable=False),
+    Column("doctor_id", String(36), ForeignKey("doctors.id")),
+    Column("diagnosis", Text),
+    Column("prescription", Text),
+    Column("visit_date", DateTime, server_default=func.now()),
+)
+
+billing = Table(
+    "billing", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("patient_id", String(36), ForeignKey("patients.id"), nullable=False),
+    Column("description", Text),
+    Column("total_amount", Numeric(12, 2), nullable=False),
+    Column("status", String(20)),
+    Column("created_at", DateTime, server_default=func.now()),
+)
+
+pharmacy_medicines = Table(
+    "pharmacy_medicines", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("batch_no", String(50)),
+    Column("stock", Integer, nullable=False),
+    Column("price", Numeric(10, 2), nullable=False),
+    Column("expiry_date", Date),
+)
+
+pharmacy_sales = Table(
+    "pharmacy_sales", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("patient_id", String(36), ForeignKey("patients.id")),
+    Column("medicine_id", String(36), ForeignKey("pharmacy_medicines.id"), nullable=False),
+    Column("quantity", Integer, nullable=False),
+    Column("total_amount", Numeric(12, 2), nullable=False),
+    Column("sale_date", DateTime, server_default=func.now()),
+)
+
+lab_tests = Table(
+    "lab_tests", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("test_name", String(100), nullable=False),
+    Column("description", Text),
+    Column("charges", Numeric(10, 2), nullable=False),
+)
+
+lab_reports = Table(
+    "lab_reports", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("patient_id", String(36), ForeignKey("patients.id"), nullable=False),
+    Column("doctor_id", String(36), ForeignKey("doctors.id")),
+    Column("test_id", String(36), ForeignKey("lab_tests.id"), nullable=False),
+    Column("result", Text),
+    Column("test_date", DateTime, server_default=func.now()),
+    Column("status", String(20)),
+)
+
+
+def upgrade(conn):
+    for table in metadata.sorted_tables:
+        create_table(conn, table)
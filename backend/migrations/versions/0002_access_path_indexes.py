@@ -0,0 +1,37 @@
+# migrations/versions/0002_access_path_indexes.py
+# Secondary indexes for the foreign-key, status and date columns used by the
+# list filters, keyset pagination, per-patient history and per-day queries.
+from migrations.ops import create_index
+
+INDEXES = [
+    ("patients", "ix_patients_created_at", ("created_at",)),
+    ("patients", "ix_patients_name", ("name",)),
+    ("doctors", "ix_doctors_name", ("name",)),
+    ("doctors", "ix_doctors_specialization_name", ("specialization", "name")),
+    ("appointments", "ix_appointments_doctor_date_time", ("doctor_id", "appointment_date", "appointment_time")),
+    ("appointments", "ix_appointments_patient_date", ("patient_id", "appointment_date")),
+    ("appointments", "ix_appointments_status_date", ("status", "appointment_date")),
+    ("appointments", "ix_appointments_date", ("appointment_date",)),
+    ("appointments", "ix_appointments_created_at", ("created_at",)),
+    ("medical_records", "ix_medical_records_patient_visit", ("patient_id", "visit_date")),
+    ("medical_records", "ix_medical_records_doctor_visit", ("doctor_id", "visit_date")),
+    ("medical_records", "ix_medical_records_visit_date", ("visit_date",)),
+    ("billing", "ix_billing_status_created", ("status", "created_at")),
+    ("billing", "ix_billing_patient_created", ("patient_id", "created_at")),
+    ("billing", "ix_billing_created_at", ("created_at",)),
+    ("pharmacy_medicines", "ix_pharmacy_medicines_name", ("name",)),
+    ("pharmacy_sales", "ix_pharmacy_sales_patient_date", ("patient_id", "sale_date")),
+    ("pharmacy_sales", "ix_pharmacy_sales_medicine_date", ("medicine_id", "sale_date")),
+    ("pharmacy_sales", "ix_pharmacy_sales_sale_date", ("sale_date",)),
+    ("lab_tests", "ix_lab_tests_test_name", ("test_name",)),
+    ("lab_reports", "ix_lab_reports_patient_date", ("patient_id", "test_date")),
+    ("lab_reports", "ix_lab_reports_test_date", ("test_id", "test_date")),
+    ("lab_reports", "ix_lab_reports_doctor_date", ("doctor_id", "test_date")),
+    ("lab_reports", "ix_lab_reports_status_date", ("status", "test_date")),
+    ("lab_reports", "ix_lab_reports_date", ("test_date",)),
+]
+
+
+def upgrade(conn):
+    for table, name, columns in INDEXES:
+        create_index(conn, table, name, *columns)
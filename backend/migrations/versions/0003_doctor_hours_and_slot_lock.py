@@ -0,0 +1,38 @@
+# migrations/versions/0003_doctor_hours_and_slot_lock.py
+# Doctor working hours for availability, and a unique slot lock on
+# appointments so a doctor cannot be double-booked. Slots must be at least a
+# minute long and the working day must end after it starts.
+from sqlalchemy import Column, Integer, Time, text
+
+from migrations.ops import add_column, create_index
+
+
+def upgrade(conn):
+    add_column(conn, "doctors", Column("work_start", Time, nullable=False, server_default="09:00:00"))
+    add_column(conn, "doctors", Column("work_end", Time, nullable=False, server_default="17:00:00"))
+    add_column(
+        conn, "doctors", Column("slot_minutes", Integer, nullable=False, server_default="15"),
+        check=("ck_doctors_hours", "slot_minutes > 0 AND work_end > work_start"),
+    )
+
+    add_column(conn, "appointments", Column("slot_taken", Integer))
+    conn.exec_driver_sql("UPDATE appointments SET slot_taken = 1 WHERE status IS NULL OR status <> 'cancelled'")
+
+    # Existing double bookings keep their rows; only the earliest keeps the slot lock.
+    rows = conn.exec_driver_sql(
+        "SELECT id, doctor_id, appointment_date, appointment_time FROM appointments "
+        "WHERE slot_taken = 1 AND doctor_id IS NOT NULL AND appointment_time IS NOT NULL "
+        "ORDER BY doctor_id, appointment_date, appointment_time, created_at, id"
+    ).fetchall()
+    seen = set()
+    for id, *slot in rows:
+        key = tuple(slot)
+        if key in seen:
+            conn.execute(text("UPDATE appointments SET slot_taken = NULL WHERE id = :id"), {"id": id})
+        seen.add(key)
+
+    create_index(
+        conn, "appointments", "ux_appointments_doctor_slot",
+        "doctor_id", "appointment_date", "appointment_time", "slot_taken", unique=True,
+    )
+
@@ -0,0 +1,28 @@
+# migrations/versions/0004_table_versions.py
+# Per-table change counters behind the ETag / Last-Modified headers.
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+
+from migrations.ops import create_table
+
+TABLES = (
+    "patients", "doctors", "appointments", "medical_records", "billing",
+    "pharmacy_medicines", "pharmacy_sales", "lab_tests", "lab_reports",
+)
+
+table_versions = Table(
+    "table_versions", MetaData(),
+    Column("table_name", String(64), primary_key=True),
+    Column("version", Integer, nullable=False, default=0),
+    Column("changed_at", DateTime, nullable=False),
+)
+
+
+def upgrade(conn):
+    create_table(conn, table_versions)
+    existing = set(conn.execute(select(table_versions.c.table_name)).scalars())
+    now = datetime.now().replace(microsecond=0)
+    rows = [{"table_name": t, "version": 1, "changed_at": now} for t in TABLES if t not in existing]
+    if rows:
+        conn.execute(table_versions.insert(), rows)
@@ -0,0 +1,28 @@
+# migrations/versions/0005_search_indexes.py
+# Typeahead terms for patients and medicines, filled by search.rebuild after
+# the upgrade, and full-text search over medical record text on MySQL.
+from sqlalchemy import Column, Index, MetaData, String, Table, inspect
+
+from migrations.ops import create_table
+
+REBUILDS = ("search",)
+
+search_terms = Table(
+    "search_terms", MetaData(),
+    Column("kind", String(20), primary_key=True),
+    Column("ref_id", String(36), primary_key=True),
+    Column("term", String(100), primary_key=True),
+    Index("ix_search_terms_term", "kind", "term", "ref_id"),
+)
+
+
+def upgrade(conn):
+    if "search_terms" not in inspect(conn).get_table_names():
+        create_table(conn, search_terms)
+
+    if conn.dialect.name == "mysql":
+        existing = {ix["name"] for ix in inspect(conn).get_indexes("medical_records")}
+        if "ft_medical_records_text" not in existing:
+            conn.exec_driver_sql(
+                "CREATE FULLTEXT INDEX ft_medical_records_text ON medical_records (diagnosis, prescription)"
+            )
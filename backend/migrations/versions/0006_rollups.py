@@ -0,0 +1,60 @@
+# migrations/versions/0006_rollups.py
+# Daily rollup tables for the reporting endpoints, filled from the raw tables
+# by rollups.rebuild after the upgrade and kept up to date by rollups.py.
+from datetime import datetime
+
+from sqlalchemy import Column, Date, Integer, MetaData, Numeric, String, Table, inspect, select
+
+from migrations.ops import create_table, reflect
+
+REBUILDS = ("rollups",)
+
+metadata = MetaData()
+
+Table(
+    "rollup_billing_daily", metadata,
+    Column("day", Date, primary_key=True),
+    Column("status", String(20), primary_key=True),
+    Column("bills", Integer, nullable=False, default=0),
+    Column("amount", Numeric(14, 2), nullable=False, default=0),
+)
+
+Table(
+    "rollup_pharmacy_daily", metadata,
+    Column("day", Date, primary_key=True),
+    Column("medicine_id", String(36), primary_key=True),
+    Column("sales", Integer, nullable=False, default=0),
+    Column("quantity", Integer, nullable=False, default=0),
+    Column("amount", Numeric(14, 2), nullable=False, default=0),
+)
+
+Table(
+    "rollup_lab_daily", metadata,
+    Column("day", Date, primary_key=True),
+    Column("test_id", String(36), primary_key=True),
+    Column("reports", Integer, nullable=False, default=0),
+)
+
+Table(
+    "rollup_appointments_daily", metadata,
+    Column("day", Date, primary_key=True),
+    Column("doctor_id", String(36), primary_key=True),
+    Column("status", String(20), primary_key=True),
+    Column("appointments", Integer, nullable=False, default=0),
+)
+
+
+def upgrade(conn):
+    existing = set(inspect(conn).get_table_names())
+    if all(name in existing for name in metadata.tables):
+        return
+    for table in metadata.tables.values():
+        create_table(conn, table)
+
+    # Version counters for the report ETags (see 0004_table_versions)
+    versions = reflect(conn, "table_versions")
+    seeded = set(conn.execute(select(versions.c.table_name)).scalars())
+    now = datetime.utcnow().replace(microsecond=0)
+    rows = [{"table_name": name, "version": 1, "changed_at": now} for name in metadata.tables if name not in seeded]
+    if rows:
+        conn.execute(versions.insert(), rows)
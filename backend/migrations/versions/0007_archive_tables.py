@@ -0,0 +1,39 @@
+# migrations/versions/0007_archive_tables.py
+# Cold-archive copies of the high-growth tables, filled by archive.py.
+# Each "<table>_archive" has the hot table's columns and foreign keys (read
+# from the database, so the copy matches what is deployed) and only the
+# (patient_id, date) and date indexes the archive read paths use.
+from sqlalchemy import Column, ForeignKey, Index, MetaData, Table
+
+from migrations.ops import create_table
+
+ARCHIVED = {
+    "appointments": "appointment_date",
+    "medical_records": "visit_date",
+    "billing": "created_at",
+    "pharmacy_sales": "sale_date",
+    "lab_reports": "test_date",
+}
+
+
+def archive_table(metadata, hot: Table, date_column: str) -> Table:
+    name = f"{hot.name}_archive"
+    columns = [
+        Column(c.name, c.type, *(ForeignKey(fk.target_fullname) for fk in c.foreign_keys),
+               primary_key=c.primary_key, nullable=c.nullable)
+        for c in hot.columns
+    ]
+    return Table(
+        name, metadata, *columns,
+        Index(f"ix_{name}_patient_date", "patient_id", date_column),
+        Index(f"ix_{name}_date", date_column),
+    )
+
+
+def upgrade(conn):
+    # One MetaData, so the referenced tables reflected with each hot table
+    # resolve the copied foreign keys
+    metadata = MetaData()
+    for name, date_column in ARCHIVED.items():
+        hot = Table(name, metadata, autoload_with=conn)
+        create_table(conn, archive_table(metadata, hot, date_column))
@@ -0,0 +1,19 @@
+# migrations/versions/0008_schema_settings.py
+# Name/value settings describing the database itself. Starts with
+# id_storage=string; ids.convert_storage rewrites the id columns and flips it
+# to "binary" when the app is configured with ID_STORAGE=binary.
+from sqlalchemy import Column, MetaData, String, Table, select
+
+from migrations.ops import create_table
+
+schema_settings = Table(
+    "schema_settings", MetaData(),
+    Column("name", String(64), primary_key=True),
+    Column("value", String(200), nullable=False),
+)
+
+
+def upgrade(conn):
+    create_table(conn, schema_settings)
+    if conn.execute(select(schema_settings.c.name).where(schema_settings.c.name == "id_storage")).first() is None:
+        conn.execute(schema_settings.insert().values(name="id_storage", value="string"))
@@ -0,0 +1,22 @@
+# migrations/versions/0009_patient_match_keys.py
+# Blocking keys for duplicate-patient matching, filled from the existing
+# patients by matching.rebuild after the upgrade.
+from sqlalchemy import Column, Index, MetaData, String, Table, inspect
+
+from migrations.ops import create_table, reflect
+
+REBUILDS = ("matching",)
+
+
+def upgrade(conn):
+    if "patient_match_keys" in inspect(conn).get_table_names():
+        return
+    patients = reflect(conn, "patients")
+    match_keys = Table(
+        "patient_match_keys", MetaData(),
+        Column("key", String(40), primary_key=True),
+        # Same type as patients.id, whether ids are stored as text or binary
+        Column("patient_id", patients.c.id.type, primary_key=True),
+        Index("ix_patient_match_keys_patient", "patient_id"),
+    )
+    create_table(conn, match_keys)
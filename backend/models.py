@@ -1,99 +1,289 @@
-import uuid
-from sqlalchemy import Column, String, Date, Integer, Text, Numeric, DateTime, Time, ForeignKey
+from datetime import datetime, time
+from sqlalchemy import Column, String, Date, Integer, Text, Numeric, DateTime, Time, ForeignKey, Index, Table, CheckConstraint
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from database import Base
+from ids import Id, new_id
 
+# Random (uuid4) or time-ordered (uuid7) ids, stored as text or 16 bytes; see ids.py
 def gen_uuid():
-    return str(uuid.uuid4())
+    return new_id()
+
+# Timestamps and other defaults are generated here rather than by the
+# database, so a new row is complete after its INSERT and never has to be
+# read back. The server defaults stay for rows written outside the ORM.
+def now():
+    return datetime.now().replace(microsecond=0)
+
+# SQLite stores server_default=func.now() as "YYYY-MM-DD HH:MM:SS"; bind
+# datetimes in the same format there so equality comparisons (keyset cursors)
+# match rows written by the database.
+DateTimeType = DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
+# Appointment statuses that free the doctor's slot for rebooking
+SLOT_RELEASING_STATUSES = {"cancelled"}
 
 # Patients
 class Patient(Base):
     __tablename__ = "patients"
-    id = Column(String(36), primary_key=True, default=gen_uuid)
+    id = Column(Id(), primary_key=True, default=gen_uuid)
     name = Column(String(100), nullable=False)
     dob = Column(Date)
     age = Column(Integer)
     gender = Column(String(10))
     address = Column(Text)
     phone = Column(String(20), unique=True)
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTimeType, default=now, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_patients_created_at", "created_at"),
+        Index("ix_patients_name", "name"),
+    )
 
 # Doctors
 class Doctor(Base):
     __tablename__ = "doctors"
-    id = Column(String(36), primary_key=True, default=gen_uuid)
+    id = Column(Id(), primary_key=True, default=gen_uuid)
     name = Column(String(100), nullable=False)
     specialization = Column(String(100), nullable=False)
     phone = Column(String(20), unique=True)
     room_no = Column(String(10))
+    work_start = Column(Time, nullable=False, default=time(9, 0), server_default="09:00:00")
+    work_end = Column(Time, nullable=False, default=time(17, 0), server_default="17:00:00")
+    slot_minutes = Column(Integer, nullable=False, default=15, server_default="15")
+
+    __table_args__ = (
+        Index("ix_doctors_name", "name"),
+        Index("ix_doctors_specialization_name", "specialization", "name"),
+        CheckConstraint("slot_minutes > 0 AND work_end > work_start", name="ck_doctors_hours"),
+    )
 
 # Appointments
 class Appointment(Base):
     __tablename__ = "appointments"
-    id = Column(String(36), primary_key=True, default=gen_uuid)
-    patient_id = Column(String(36), ForeignKey("patients.id"), nullable=False)
-    doctor_id = Column(String(36), ForeignKey("doctors.id"))
+    id = Column(Id(), primary_key=True, default=gen_uuid)
+    patient_id = Column(Id(), ForeignKey("patients.id"), nullable=False)
+    doctor_id = Column(Id(), ForeignKey("doctors.id"))
     appointment_date = Column(Date, nullable=False)
     appointment_time = Column(Time)
     status = Column(String(20), default="scheduled")
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTimeType, default=now, server_default=func.now())
+    # 1 while the appointment holds its doctor's slot, NULL once cancelled.
+    # NULLs are not compared by unique indexes, so cancelled slots can be rebooked.
+    slot_taken = Column(Integer, default=1)
+
+    __table_args__ = (
+        Index("ux_appointments_doctor_slot", "doctor_id", "appointment_date", "appointment_time", "slot_taken", unique=True),
+        Index("ix_appointments_doctor_date_time", "doctor_id", "appointment_date", "appointment_time"),
+        Index("ix_appointments_patient_date", "patient_id", "appointment_date"),
+        Index("ix_appointments_status_date", "status", "appointment_date"),
+        Index("ix_appointments_date", "appointment_date"),
+        Index("ix_appointments_created_at", "created_at"),
+    )
+
+    @validates("status")
+    def _release_slot_on_cancel(self, key, status):
+        self.slot_taken = None if status in SLOT_RELEASING_STATUSES else 1
+        return status
 
 # Medical Records
 class MedicalRecord(Base):
     __tablename__ = "medical_records"
-    id = Column(String(36), primary_key=True, default=gen_uuid)
-    patient_id = Column(String(36), ForeignKey("patients.id"), nullable=False)
-    doctor_id = Column(String(36), ForeignKey("doctors.id"))
+    id = Column(Id(), primary_key=True, default=gen_uuid)
+    patient_id = Column(Id(), ForeignKey("patients.id"), nullable=False)
+    doctor_id = Column(Id(), ForeignKey("doctors.id"))
     diagnosis = Column(Text)
     prescription = Column(Text)
-    visit_date = Column(DateTime, server_default=func.now())
+    visit_date = Column(DateTimeType, default=now, server_default=func.now())
+
+    # On MySQL, migration 0005 also adds FULLTEXT ft_medical_records_text
+    # over (diagnosis, prescription) for /records/search.
+    __table_args__ = (
+        Index("ix_medical_records_patient_visit", "patient_id", "visit_date"),
+        Index("ix_medical_records_doctor_visit", "doctor_id", "visit_date"),
+        Index("ix_medical_records_visit_date", "visit_date"),
+    )
 
 # Billing
 class Billing(Base):
     __tablename__ = "billing"
-    id = Column(String(36), primary_key=True, default=gen_uuid)
-    patient_id = Column(String(36), ForeignKey("patients.id"), nullable=False)
+    id = Column(Id(), primary_key=True, default=gen_uuid)
+    patient_id = Column(Id(), ForeignKey("patients.id"), nullable=False)
     description = Column(Text)
     total_amount = Column(Numeric(12,2), nullable=False)
     status = Column(String(20), default="pending")
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTimeType, default=now, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_billing_status_created", "status", "created_at"),
+        Index("ix_billing_patient_created", "patient_id", "created_at"),
+        Index("ix_billing_created_at", "created_at"),
+    )
 
 # Pharmacy Medicines
 class PharmacyMedicine(Base):
     __tablename__ = "pharmacy_medicines"
-    id = Column(String(36), primary_key=True, default=gen_uuid)
+    id = Column(Id(), primary_key=True, default=gen_uuid)
     name = Column(String(100), nullable=False)
     batch_no = Column(String(50))
     stock = Column(Integer, nullable=False, default=0)
     price = Column(Numeric(10,2), nullable=False)
     expiry_date = Column(Date)
 
+    __table_args__ = (
+        Index("ix_pharmacy_medicines_name", "name"),
+    )
+
 # Pharmacy Sales
 class PharmacySale(Base):
     __tablename__ = "pharmacy_sales"
-    id = Column(String(36), primary_key=True, default=gen_uuid)
-    patient_id = Column(String(36), ForeignKey("patients.id"))
-    medicine_id = Column(String(36), ForeignKey("pharmacy_medicines.id"), nullable=False)
+    id = Column(Id(), primary_key=True, default=gen_uuid)
+    patient_id = Column(Id(), ForeignKey("patients.id"))
+    medicine_id = Column(Id(), ForeignKey("pharmacy_medicines.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     total_amount = Column(Numeric(12,2), nullable=False)
-    sale_date = Column(DateTime, server_default=func.now())
+    sale_date = Column(DateTimeType, default=now, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_pharmacy_sales_patient_date", "patient_id", "sale_date"),
+        Index("ix_pharmacy_sales_medicine_date", "medicine_id", "sale_date"),
+        Index("ix_pharmacy_sales_sale_date", "sale_date"),
+    )
 
 # Lab Tests
 class LabTest(Base):
     __tablename__ = "lab_tests"
-    id = Column(String(36), primary_key=True, default=gen_uuid)
+    id = Column(Id(), primary_key=True, default=gen_uuid)
     test_name = Column(String(100), nullable=False)
     description = Column(Text)
     charges = Column(Numeric(10,2), nullable=False)
 
+    __table_args__ = (
+        Index("ix_lab_tests_test_name", "test_name"),
+    )
+
 # Lab Reports
 class LabReport(Base):
     __tablename__ = "lab_reports"
-    id = Column(String(36), primary_key=True, default=gen_uuid)
-    patient_id = Column(String(36), ForeignKey("patients.id"), nullable=False)
-    doctor_id = Column(String(36), ForeignKey("doctors.id"))
-    test_id = Column(String(36), ForeignKey("lab_tests.id"), nullable=False)
+    id = Column(Id(), primary_key=True, default=gen_uuid)
+    patient_id = Column(Id(), ForeignKey("patients.id"), nullable=False)
+    doctor_id = Column(Id(), ForeignKey("doctors.id"))
+    test_id = Column(Id(), ForeignKey("lab_tests.id"), nullable=False)
     result = Column(Text)
-    test_date = Column(DateTime, server_default=func.now())
+    test_date = Column(DateTimeType, default=now, server_default=func.now())
     status = Column(String(20), default="pending")
+
+    __table_args__ = (
+        Index("ix_lab_reports_patient_date", "patient_id", "test_date"),
+        Index("ix_lab_reports_test_date", "test_id", "test_date"),
+        Index("ix_lab_reports_doctor_date", "doctor_id", "test_date"),
+        Index("ix_lab_reports_status_date", "status", "test_date"),
+        Index("ix_lab_reports_date", "test_date"),
+    )
+
+# ------------ ARCHIVE ------------
+# Cold tier for the tables that only ever grow: archive.py moves closed rows
+# past the cutoff into "<table>_archive", keeping every column and the id.
+# Archived rows are read-only and indexed only for the archive read paths
+# (by id, patient history, date-range exports).
+def _archive_table(model, date_column: str) -> Table:
+    name = f"{model.__tablename__}_archive"
+    columns = [
+        Column(c.name, c.type, *(ForeignKey(fk.target_fullname) for fk in c.foreign_keys),
+               primary_key=c.primary_key, nullable=c.nullable)
+        for c in model.__table__.columns
+    ]
+    return Table(
+        name, Base.metadata, *columns,
+        Index(f"ix_{name}_patient_date", "patient_id", date_column),
+        Index(f"ix_{name}_date", date_column),
+    )
+
+class AppointmentArchive(Base):
+    __table__ = _archive_table(Appointment, "appointment_date")
+
+class MedicalRecordArchive(Base):
+    __table__ = _archive_table(MedicalRecord, "visit_date")
+
+class BillingArchive(Base):
+    __table__ = _archive_table(Billing, "created_at")
+
+class PharmacySaleArchive(Base):
+    __table__ = _archive_table(PharmacySale, "sale_date")
+
+class LabReportArchive(Base):
+    __table__ = _archive_table(LabReport, "test_date")
+
+ARCHIVE_MODELS = {
+    Appointment: AppointmentArchive,
+    MedicalRecord: MedicalRecordArchive,
+    Billing: BillingArchive,
+    PharmacySale: PharmacySaleArchive,
+    LabReport: LabReportArchive,
+}
+
+# ------------ ROLLUPS ------------
+# Daily aggregates kept up to date by rollups.py as rows are written.
+# Missing keys are stored as "" so they can be part of the primary key.
+class BillingDailyRollup(Base):
+    __tablename__ = "rollup_billing_daily"
+    day = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    bills = Column(Integer, nullable=False, default=0)
+    amount = Column(Numeric(14,2), nullable=False, default=0)
+
+class PharmacyDailyRollup(Base):
+    __tablename__ = "rollup_pharmacy_daily"
+    day = Column(Date, primary_key=True)
+    medicine_id = Column(Id(), primary_key=True)
+    sales = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    amount = Column(Numeric(14,2), nullable=False, default=0)
+
+class LabDailyRollup(Base):
+    __tablename__ = "rollup_lab_daily"
+    day = Column(Date, primary_key=True)
+    test_id = Column(Id(), primary_key=True)
+    reports = Column(Integer, nullable=False, default=0)
+
+class AppointmentDailyRollup(Base):
+    __tablename__ = "rollup_appointments_daily"
+    day = Column(Date, primary_key=True)
+    doctor_id = Column(Id(), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    appointments = Column(Integer, nullable=False, default=0)
+
+# Search terms (name words, phone digits) for patient and medicine typeahead,
+# maintained by search.py. Prefix lookups range-scan ix_search_terms_term.
+class SearchTerm(Base):
+    __tablename__ = "search_terms"
+    kind = Column(String(20), primary_key=True)
+    ref_id = Column(Id(), primary_key=True)
+    term = Column(String(100), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_search_terms_term", "kind", "term", "ref_id"),
+    )
+
+# Blocking keys (phone, birth date + name sound codes) for duplicate-patient
+# matching, maintained by matching.py. Lookups by key use the primary key.
+class PatientMatchKey(Base):
+    __tablename__ = "patient_match_keys"
+    key = Column(String(40), primary_key=True)
+    patient_id = Column(Id(), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_patient_match_keys_patient", "patient_id"),
+    )
+# Change counters, bumped right after every committed write to a table
+# Change counters, bumped in the same transaction as every write to a table
+# (see cache.py); used for ETags on GET endpoints.
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+    table_name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    changed_at = Column(DateTimeType, nullable=False)
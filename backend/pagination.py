@@ -0,0 +1,164 @@
+# pagination.py
+# Shared keyset (cursor) pagination, sorting and filtering for list endpoints.
+#
+# List routes keep returning a plain JSON array so existing clients work
+# unchanged. The cursor for the next page is sent back in the
+# `X-Next-Cursor` response header; pass it as `?cursor=` to continue.
+import base64
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Literal, Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Common query parameters accepted by every list endpoint."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+        cursor: Optional[str] = None,
+        sort: Optional[str] = None,
+        order: Literal["asc", "desc"] = "asc",
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.sort = sort
+        self.order = order
+
+
+# ------------ CURSOR ENCODING ------------
+def _dump_value(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load_value(column, value):
+    if value is None:
+        return None
+    if isinstance(value, (list, dict)):
+        raise ValueError("cursor value must be a scalar")
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is time:
+        return time.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(value)
+    return value
+
+
+def encode_cursor(sort: str, order: str, value, id: str) -> str:
+    raw = json.dumps([sort, order, _dump_value(value), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, column=None):
+    """
+    (sort, order, value, id) from a cursor; with `column` the value is parsed
+    to that column's type. Anything malformed is a 400, never a 500.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort, order, value, id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(id, str):
+            raise ValueError("cursor id must be a string")
+        if column is not None:
+            value = _load_value(column, value)
+    except (ValueError, TypeError, ArithmeticError):
+        raise HTTPException(400, "Invalid cursor")
+    return sort, order, value, id
+
+
+# ------------ FILTERS ------------
+def date_range(column, date_from: Optional[date], date_to: Optional[date]):
+    """Inclusive date range on a Date or DateTime column, as SQL conditions."""
+    conditions = []
+    is_datetime = column.type.python_type is datetime
+    if date_from is not None:
+        start = datetime.combine(date_from, time.min) if is_datetime else date_from
+        conditions.append(column >= start)
+    if date_to is not None:
+        if is_datetime:
+            conditions.append(column < datetime.combine(date_to + timedelta(days=1), time.min))
+        else:
+            conditions.append(column <= date_to)
+    return conditions
+
+
+def equals(*filters):
+    """Equality conditions for (column, value) pairs, skipping None values."""
+    return [column == value for column, value in filters if value is not None]
+
+
+def apply_filters(query, *filters):
+    """Apply equality filters given as (column, value) pairs, skipping None values."""
+    return query.filter(*equals(*filters))
+
+
+# ------------ PAGINATION ------------
+def _keyset(query, model, params: PageParams, sort_fields: dict, default_sort: str):
+    """Add keyset conditions, ordering and limit to a Query or Select."""
+    sort = params.sort or default_sort
+    if sort not in sort_fields:
+        raise HTTPException(400, f"Invalid sort field, expected one of: {', '.join(sort_fields)}")
+
+    column = sort_fields[sort]
+    pk = model.id
+    descending = params.order == "desc"
+
+    if params.cursor:
+        c_sort, c_order, value, c_id = decode_cursor(params.cursor, column)
+        if c_sort != sort or c_order != params.order:
+            raise HTTPException(400, "Cursor does not match sort order")
+        if descending:
+            query = query.filter(or_(column < value, and_(column == value, pk < c_id)))
+        else:
+            query = query.filter(or_(column > value, and_(column == value, pk > c_id)))
+
+    if descending:
+        query = query.order_by(column.desc(), pk.desc())
+    else:
+        query = query.order_by(column.asc(), pk.asc())
+
+    return query.limit(params.limit + 1), sort, column
+
+
+def _page(rows, params: PageParams, response: Response, sort: str, column):
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            sort, params.order, getattr(last, column.key), last.id
+        )
+    return rows
+
+
+def paginate(query, model, params: PageParams, response: Response, sort_fields: dict, default_sort: str):
+    """
+    Return one page of `query` ordered by (sort column, id).
+
+    `sort_fields` maps public sort names to model columns. The primary key is
+    always used as the tie-breaker so the ordering is stable across pages.
+    """
+    query, sort, column = _keyset(query, model, params, sort_fields, default_sort)
+    return _page(query.all(), params, response, sort, column)
+
+
+async def paginate_async(db, stmt, model, params: PageParams, response: Response, sort_fields: dict, default_sort: str):
+    """`paginate` for a `select(model)` statement executed on an AsyncSession."""
+    stmt, sort, column = _keyset(stmt, model, params, sort_fields, default_sort)
+    rows = (await db.execute(stmt)).scalars().all()
+    return _page(list(rows), params, response, sort, column)
@@ -0,0 +1,23 @@
+# prefer.py
+# Minimal write responses (RFC 7240 `Prefer: return=minimal`).
+#
+# Create, update and status endpoints return the full resource by default.
+# Clients that only need to know the write succeeded (imports, queues,
+# status boards) can send `Prefer: return=minimal` and get back just the id
+# (and new status), skipping serialization of the whole row.
+from fastapi import Request, Response
+
+from serialization import dumps
+
+
+def return_minimal(request: Request) -> bool:
+    """Dependency: True when the client asked for `Prefer: return=minimal`."""
+    prefer = request.headers.get("prefer", "")
+    return any(p.strip().lower() == "return=minimal" for p in prefer.split(","))
+
+
+def minimal_response(obj, *fields) -> Response:
+    body = {"id": obj.id, **{field: getattr(obj, field) for field in fields}}
+    return Response(
+        dumps(body), media_type="application/json", headers={"Preference-Applied": "return=minimal"}
+    )
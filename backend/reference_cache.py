@@ -0,0 +1,94 @@
+# reference_cache.py
+# Read-through caches for the reference data nearly every screen loads:
+# doctors, lab tests and the medicine catalog.
+#
+# Rows are cached as plain column dicts, both by id and per list page (filters
+# + page parameters), and every cache is cleared when a transaction writing
+# its table commits, so creates, updates, deletes and bulk loads are visible
+# on the next read.
+#
+# Columns that change too often to cache (`live`, e.g. medicine stock, which
+# every sale writes) are left out of the cached rows and read fresh with one
+# primary-key query per request, after the ETag's version read, so the body
+# is never older than its tag. Writes that only touch them use
+# cache.mark_versioned and leave the cache alone. Pages sorted on a live
+# column are not cached.
+import os
+
+from fastapi import HTTPException, Response
+from sqlalchemy import select
+
+from cache import depends_on, make_cache
+from pagination import NEXT_CURSOR_HEADER
+
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "300"))
+REFERENCE_CACHE_SIZE = int(os.getenv("REFERENCE_CACHE_SIZE", "1024"))
+
+doctors_cache = depends_on(make_cache("doctors", REFERENCE_CACHE_TTL, REFERENCE_CACHE_SIZE), "doctors")
+lab_tests_cache = depends_on(make_cache("lab_tests", REFERENCE_CACHE_TTL, REFERENCE_CACHE_SIZE), "lab_tests")
+medicines_cache = depends_on(
+    make_cache("pharmacy_medicines", REFERENCE_CACHE_TTL, REFERENCE_CACHE_SIZE), "pharmacy_medicines"
+)
+
+
+def _row(obj, live=()):
+    skip = {column.key for column in live}
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns if column.key not in skip}
+
+
+def _with_live(db, rows, live):
+    """`rows` with the `live` columns read fresh; rows deleted meanwhile are dropped."""
+    if not live or not rows:
+        return rows
+    model = live[0].class_
+    current = {
+        id: values
+        for id, *values in db.execute(select(model.id, *live).where(model.id.in_([row["id"] for row in rows])))
+    }
+    keys = [column.key for column in live]
+    return [{**row, **dict(zip(keys, current[row["id"]]))} for row in rows if row["id"] in current]
+
+
+def cached_get(cache, db, model, id: str, label: str, live=()):
+    """Row of `model` by primary key, or 404 "<label> not found"."""
+    def load():
+        obj = db.get(model, id)
+        return _row(obj, live) if obj else None
+
+    row = cache.get_or_load(("id", id), load)
+    rows = _with_live(db, [row], live) if row is not None else []
+    if not rows:
+        raise HTTPException(404, f"{label} not found")
+    return rows[0]
+
+
+def cached_page(cache, response: Response, page, filters: tuple, load, db=None, live=()):
+    """
+    One list page, where `load(response)` runs the usual `paginate` call.
+
+    The page is keyed on the filters and the page parameters, and the next
+    cursor header is cached along with the rows. With `live` columns, `db`
+    is the session they are read on.
+    """
+    if page.sort in {column.key for column in live}:
+        return load(response)
+
+    def fill():
+        scratch = Response()
+        rows = [_row(obj, live) for obj in load(scratch)]
+        return rows, scratch.headers.get(NEXT_CURSOR_HEADER)
+
+    key = ("list", *filters, page.limit, page.cursor, page.sort, page.order)
+    rows, next_cursor = cache.get_or_load(key, fill)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return _with_live(db, rows, live)
+
+
+def warm(cache, rows, live=()) -> int:
+    """Seed the by-id entries of `cache` from rows already loaded (e.g. a list page)."""
+    skip = {column.key for column in live}
+    for row in rows:
+        cached = {key: value for key, value in row.items() if key not in skip}
+        cache.get_or_load(("id", row["id"]), lambda cached=cached: cached)
+    return len(rows)
@@ -0,0 +1,224 @@
+# rollups.py
+"""
+Daily rollups of bills, pharmacy sales, lab reports and appointments.
+
+Every flush that inserts, updates or deletes a source row adds the row's new
+contribution to its rollup row and subtracts the old one, in the same
+transaction, so the rollups always match the raw tables. Reports read the
+rollups and only ever touch one row per day and key in the requested range.
+
+Rebuild the rollups from the raw tables (e.g. after a manual data fix):
+
+    python -m rollups rebuild
+"""
+import sys
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import delete, event, func, inspect, select, union_all
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from cache import mark_changed
+import models
+
+
+class Rollup:
+    """
+    How rows of `source` add up into `target`: grouped by the day of
+    `timestamp` plus `keys` ({target column: source attribute}), summing
+    `measures` ({target column: source attribute, or None to count rows}).
+    """
+
+    def __init__(self, source, target, timestamp: str, keys: dict, measures: dict):
+        self.source = source
+        self.target = target
+        self.timestamp = timestamp
+        self.keys = keys
+        self.measures = measures
+
+    def contribution(self, get):
+        """(key, measures) of one source row, read through `get(attribute)`."""
+        stamp = get(self.timestamp)
+        if stamp is None:
+            return None
+        day = stamp.date() if isinstance(stamp, datetime) else stamp
+        key = (day, *("" if get(attr) is None else get(attr) for attr in self.keys.values()))
+        measures = [1 if attr is None else _number(get(attr)) for attr in self.measures.values()]
+        return key, measures
+
+    def aggregate(self, source=None):
+        """SELECT computing every rollup row from the source table (or `source` columns with the same names)."""
+        source = self.source if source is None else source
+        stamp = getattr(source, self.timestamp)
+        columns = [func.date(stamp)]
+        columns += [func.coalesce(getattr(source, attr), "") for attr in self.keys.values()]
+        group_by = list(columns)
+        columns += [
+            func.count(source.id) if attr is None else func.coalesce(func.sum(getattr(source, attr)), 0)
+            for attr in self.measures.values()
+        ]
+        return select(*columns).where(stamp.isnot(None)).group_by(*group_by)
+
+    @property
+    def columns(self):
+        return ["day", *self.keys, *self.measures]
+
+
+ROLLUPS = [
+    Rollup(
+        models.Billing, models.BillingDailyRollup, "created_at",
+        keys={"status": "status"},
+        measures={"bills": None, "amount": "total_amount"},
+    ),
+    Rollup(
+        models.PharmacySale, models.PharmacyDailyRollup, "sale_date",
+        keys={"medicine_id": "medicine_id"},
+        measures={"sales": None, "quantity": "quantity", "amount": "total_amount"},
+    ),
+    Rollup(
+        models.LabReport, models.LabDailyRollup, "test_date",
+        keys={"test_id": "test_id"},
+        measures={"reports": None},
+    ),
+    Rollup(
+        models.Appointment, models.AppointmentDailyRollup, "appointment_date",
+        keys={"doctor_id": "doctor_id", "status": "status"},
+        measures={"appointments": None},
+    ),
+]
+
+BY_SOURCE = {rollup.source: rollup for rollup in ROLLUPS}
+ROLLUP_TABLES = tuple(rollup.target.__tablename__ for rollup in ROLLUPS)
+
+
+def _number(value):
+    if value is None:
+        return 0
+    if isinstance(value, float):
+        return Decimal(str(value))
+    return value
+
+
+# ------------ INCREMENTAL UPDATES ------------
+def _upsert(conn, target, rows):
+    """Add each row's measures to the existing rollup row, creating it if missing."""
+    table = target.__table__
+    keys = [column.name for column in table.primary_key]
+    measures = [column.name for column in table.columns if column.name not in keys]
+    dialect = conn.dialect.name
+
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        stmt = stmt.on_duplicate_key_update({m: table.c[m] + stmt.inserted[m] for m in measures})
+    elif dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys, set_={m: table.c[m] + stmt.excluded[m] for m in measures}
+        )
+    else:
+        for row in rows:
+            updated = conn.execute(
+                table.update()
+                .where(*(table.c[k] == row[k] for k in keys))
+                .values({m: table.c[m] + row[m] for m in measures})
+            )
+            if updated.rowcount == 0:
+                conn.execute(table.insert(), row)
+        return
+    conn.execute(stmt, rows)
+
+
+def apply_deltas(conn, deltas):
+    """
+    Apply {(rollup, key): [measure deltas]} to the rollup tables, in key
+    order so concurrent transactions lock rollup rows in the same order.
+    """
+    by_target = defaultdict(list)
+    for (rollup, key), values in sorted(deltas.items(), key=lambda item: (item[0][0].target.__tablename__, item[0][1])):
+        if any(values):
+            by_target[rollup].append(dict(zip(rollup.columns, (*key, *values))))
+    for rollup, rows in by_target.items():
+        _upsert(conn, rollup.target, rows)
+    return [rollup.target.__tablename__ for rollup in by_target]
+
+
+def add_contribution(deltas, rollup, get, sign=1):
+    contribution = rollup.contribution(get)
+    if contribution is None:
+        return
+    key, values = contribution
+    current = deltas.setdefault((rollup, key), [0] * len(values))
+    for i, value in enumerate(values):
+        current[i] += sign * value
+
+
+def _old_value(state):
+    def get(attr):
+        history = state.attrs[attr].history
+        if history.deleted:
+            return history.deleted[0]
+        if history.unchanged:
+            return history.unchanged[0]
+        return None
+    return get
+
+
+@event.listens_for(Session, "after_flush")
+def _update_rollups(session, flush_context):
+    deltas = {}
+    for obj in session.new:
+        rollup = BY_SOURCE.get(type(obj))
+        if rollup is not None:
+            add_contribution(deltas, rollup, lambda attr: getattr(obj, attr))
+    for obj in session.dirty:
+        rollup = BY_SOURCE.get(type(obj))
+        if rollup is not None and session.is_modified(obj):
+            add_contribution(deltas, rollup, _old_value(inspect(obj)), sign=-1)
+            add_contribution(deltas, rollup, lambda attr: getattr(obj, attr))
+    for obj in session.deleted:
+        rollup = BY_SOURCE.get(type(obj))
+        if rollup is not None:
+            add_contribution(deltas, rollup, _old_value(inspect(obj)), sign=-1)
+
+    if deltas:
+        mark_changed(session, *apply_deltas(session.connection(), deltas))
+
+
+# ------------ REBUILD ------------
+def rebuild(conn):
+    """Recompute every rollup table from its source table and archived rows."""
+    tables = set(inspect(conn).get_table_names())
+    for rollup in ROLLUPS:
+        table = rollup.target.__table__
+        conn.execute(delete(table))
+        conn.execute(table.insert().from_select(rollup.columns, rollup.aggregate(_with_archive(rollup, tables))))
+
+
+def _with_archive(rollup, tables):
+    # Archived rows still count: archive.py moves them without touching the rollups
+    archive = models.ARCHIVE_MODELS.get(rollup.source)
+    if archive is None or archive.__table__.name not in tables:
+        return None
+    names = sorted({"id", rollup.timestamp, *rollup.keys.values(), *(a for a in rollup.measures.values() if a)})
+    both = union_all(*(select(*(getattr(model, name) for name in names)) for model in (rollup.source, archive)))
+    return both.subquery().c
+
+
+def main(argv):
+    from database import engine
+
+    if argv[:1] != ["rebuild"]:
+        print(__doc__)
+        return 1
+    with Session(engine) as db:
+        rebuild(db.connection())
+        mark_changed(db, *ROLLUP_TABLES)
+        db.commit()
+    print(f"Rebuilt {', '.join(ROLLUP_TABLES)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,59 +1,151 @@
 # routers/appointments.py
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, get_read_db
 import schemas
 import models
+import live
+from crud_async import AsyncCRUD
+from pagination import PageParams, paginate, apply_filters, date_range, equals
+from availability import booking_error
+from conditional import versioned
+from prefer import return_minimal, minimal_response
+from transitions import bulk_transition, check_transition, APPOINTMENT_TRANSITIONS
+from archive import get_including_archive
+from serialization import fast_json_enabled, fast_paginate
 
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 
+# Serve list/export responses through the fast encoder (FAST_JSON_ROUTERS)
+FAST_JSON = fast_json_enabled("appointments")
+
 def get_db():
     db = SessionLocal()
     try: yield db
     finally: db.close()
 
+SLOT_CONFLICT = "Doctor is already booked for this slot"
+
+def check_booking(doctor, payload):
+    if payload.doctor_id is None:
+        return
+    if not doctor:
+        raise HTTPException(404, "Doctor not found")
+    error = booking_error(doctor, payload.appointment_time)
+    if error:
+        raise HTTPException(400, error)
+
+async def check_booking_async(db, payload):
+    doctor = await db.get(models.Doctor, payload.doctor_id) if payload.doctor_id else None
+    check_booking(doctor, payload)
+
+def commit_booking(db: Session):
+    # The unique slot index is the atomic conflict check: of two concurrent
+    # bookings for the same doctor/date/time only one commit can succeed.
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(409, SLOT_CONFLICT)
+
 @router.post("/", response_model=schemas.AppointmentOut)
-def create_appointment(payload: schemas.AppointmentCreate, db: Session = Depends(get_db)):
+def create_appointment(payload: schemas.AppointmentCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     if not db.get(models.Patient, payload.patient_id):
         raise HTTPException(404, "Patient not found")
 
+    doctor = db.get(models.Doctor, payload.doctor_id) if payload.doctor_id else None
+    check_booking(doctor, payload)
+
     appointment = models.Appointment(**payload.dict())
     db.add(appointment)
-    db.commit()
-    db.refresh(appointment)
-    return appointment
+    commit_booking(db)
+    return minimal_response(appointment) if minimal else appointment
 
-@router.get("/", response_model=list[schemas.AppointmentOut])
-def get_all_appointments(db: Session = Depends(get_db)):
-    return db.query(models.Appointment).all()
+@router.get("/", response_model=list[schemas.AppointmentOut], dependencies=[versioned("appointments")])
+def get_all_appointments(
+    response: Response,
+    patient_id: Optional[str] = None,
+    doctor_id: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    query = apply_filters(
+        db.query(models.Appointment),
+        (models.Appointment.patient_id, patient_id),
+        (models.Appointment.doctor_id, doctor_id),
+        (models.Appointment.status, status),
+    ).filter(*date_range(models.Appointment.appointment_date, date_from, date_to))
+    sort_fields = {
+        "created_at": models.Appointment.created_at,
+        "appointment_date": models.Appointment.appointment_date,
+    }
+    if FAST_JSON:
+        return fast_paginate(query, models.Appointment, schemas.AppointmentOut, page, response, sort_fields, "created_at")
+    return paginate(query, models.Appointment, page, response, sort_fields, "created_at")
 
-@router.get("/{id}", response_model=schemas.AppointmentOut)
-def get_appointment(id: str, db: Session = Depends(get_db)):
-    appt = db.get(models.Appointment, id)
+@router.get("/stream")
+async def stream_queue(doctor_id: Optional[str] = None, day: Optional[date] = Query(None, alias="date")):
+    # Server-Sent Events: a `snapshot` of the day's queue (today by default),
+    # then created / updated / status / removed / deleted events (see live.py)
+    day = day or date.today()
+    subscription = live.broker.subscribe(doctor_id, day)
+
+    def load_snapshot():
+        with SessionLocal() as db:
+            return live.snapshot(db, doctor_id, day)
+
+    return StreamingResponse(
+        live.stream(subscription, lambda: run_in_threadpool(load_snapshot)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/{id}", response_model=schemas.AppointmentOut, dependencies=[versioned("appointments")])
+def get_appointment(id: str, include_archive: bool = False, db: Session = Depends(get_read_db)):
+    appt = get_including_archive(db, models.Appointment, id, include_archive)
     if not appt:
         raise HTTPException(404, "Appointment not found")
     return appt
 
 @router.put("/{id}", response_model=schemas.AppointmentOut)
-def update_appointment(id: str, payload: schemas.AppointmentCreate, db: Session = Depends(get_db)):
+def update_appointment(id: str, payload: schemas.AppointmentCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     appt = db.get(models.Appointment, id)
     if not appt:
         raise HTTPException(404, "Appointment not found")
+    doctor = db.get(models.Doctor, payload.doctor_id) if payload.doctor_id else None
+    check_booking(doctor, payload)
     for key, value in payload.dict().items():
         setattr(appt, key, value)
-    db.commit()
-    db.refresh(appt)
-    return appt
+    commit_booking(db)
+    return minimal_response(appt) if minimal else appt
+
+@router.patch("/status", response_model=schemas.BulkStatusResult)
+def update_status_bulk(payload: schemas.AppointmentBulkStatus, db: Session = Depends(get_db)):
+    A = models.Appointment
+    conditions = equals(
+        (A.doctor_id, payload.doctor_id),
+        (A.patient_id, payload.patient_id),
+        (A.appointment_date, payload.appointment_date),
+    )
+    return bulk_transition(db, A, APPOINTMENT_TRANSITIONS, payload, conditions)
 
 @router.patch("/{id}/status")
 def update_status(id: str, status: str, db: Session = Depends(get_db)):
-    appt = db.get(models.Appointment, id)
+    appt = db.get(models.Appointment, id, with_for_update=True)
     if not appt:
         raise HTTPException(404, "Appointment not found")
-    appt.status = status
-    db.commit()
-    db.refresh(appt)
+    if check_transition(APPOINTMENT_TRANSITIONS, appt.status, status):
+        appt.status = status
+        commit_booking(db)
     return {"message": "Status updated", "status": appt.status}
 
 @router.delete("/{id}")
@@ -64,3 +156,21 @@ def delete_appointment(id: str, db: Session = Depends(get_db)):
     db.delete(appt)
     db.commit()
     return {"message": "Appointment deleted successfully"}
+
+# Async CRUD handlers, swapped in when "appointments" is listed in ASYNC_ROUTERS
+async_handlers = [
+    AsyncCRUD(
+        models.Appointment, schemas.AppointmentCreate, schemas.AppointmentOut, "Appointment",
+        filters=("patient_id", "doctor_id", "status"),
+        date_field="appointment_date",
+        sort_fields={
+            "created_at": models.Appointment.created_at,
+            "appointment_date": models.Appointment.appointment_date,
+        },
+        default_sort="created_at",
+        references={"patient_id": (models.Patient, "Patient")},
+        validate=check_booking_async,
+        conflict_detail=SLOT_CONFLICT,
+        archive_model=models.AppointmentArchive,
+    ),
+]
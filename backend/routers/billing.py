@@ -1,58 +1,108 @@
 # routers/billing.py
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, get_read_db
 import models
 import schemas
+from crud_async import AsyncCRUD
+from pagination import PageParams, paginate, apply_filters, date_range, equals
+from export import export_response
+from archive import get_including_archive
+from conditional import versioned
+from prefer import return_minimal, minimal_response
+from transitions import bulk_transition, check_transition, BILLING_TRANSITIONS
+from serialization import fast_json_enabled, fast_paginate
 
 router = APIRouter(prefix="/billing", tags=["billing"])
 
+# Serve list/export responses through the fast encoder (FAST_JSON_ROUTERS)
+FAST_JSON = fast_json_enabled("billing")
+
 def get_db():
     db = SessionLocal()
     try: yield db
     finally: db.close()
 
 @router.post("/", response_model=schemas.BillingOut)
-def create_bill(payload: schemas.BillingCreate, db: Session = Depends(get_db)):
+def create_bill(payload: schemas.BillingCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     if not db.get(models.Patient, payload.patient_id):
         raise HTTPException(404, "Patient not found")
 
     bill = models.Billing(**payload.dict())
     db.add(bill)
     db.commit()
-    db.refresh(bill)
-    return bill
+    return minimal_response(bill) if minimal else bill
 
-@router.get("/", response_model=list[schemas.BillingOut])
-def get_bills(db: Session = Depends(get_db)):
-    return db.query(models.Billing).all()
+@router.get("/", response_model=list[schemas.BillingOut], dependencies=[versioned("billing")])
+def get_bills(
+    response: Response,
+    patient_id: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    query = apply_filters(
+        db.query(models.Billing),
+        (models.Billing.patient_id, patient_id),
+        (models.Billing.status, status),
+    ).filter(*date_range(models.Billing.created_at, date_from, date_to))
+    sort_fields = {"created_at": models.Billing.created_at, "total_amount": models.Billing.total_amount}
+    if FAST_JSON:
+        return fast_paginate(query, models.Billing, schemas.BillingOut, page, response, sort_fields, "created_at")
+    return paginate(query, models.Billing, page, response, sort_fields, "created_at")
 
-@router.get("/{id}", response_model=schemas.BillingOut)
-def get_bill(id: str, db: Session = Depends(get_db)):
-    bill = db.get(models.Billing, id)
+@router.get("/export")
+def export_bills(
+    patient_id: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    include_archive: bool = False,
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+):
+    conditions = [
+        *equals((models.Billing.patient_id, patient_id), (models.Billing.status, status)),
+        *date_range(models.Billing.created_at, date_from, date_to),
+    ]
+    return export_response(models.Billing, conditions, fmt, "billing", fast=FAST_JSON, include_archive=include_archive)
+
+@router.get("/{id}", response_model=schemas.BillingOut, dependencies=[versioned("billing")])
+def get_bill(id: str, include_archive: bool = False, db: Session = Depends(get_read_db)):
+    bill = get_including_archive(db, models.Billing, id, include_archive)
     if not bill:
         raise HTTPException(404, "Bill not found")
     return bill
 
 @router.put("/{id}", response_model=schemas.BillingOut)
-def update_bill(id: str, payload: schemas.BillingCreate, db: Session = Depends(get_db)):
+def update_bill(id: str, payload: schemas.BillingCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     bill = db.get(models.Billing, id)
     if not bill:
         raise HTTPException(404, "Bill not found")
     for k, v in payload.dict().items():
         setattr(bill, k, v)
     db.commit()
-    db.refresh(bill)
-    return bill
+    return minimal_response(bill) if minimal else bill
+
+@router.patch("/status", response_model=schemas.BulkStatusResult)
+def update_bill_status_bulk(payload: schemas.BillingBulkStatus, db: Session = Depends(get_db)):
+    conditions = [
+        *equals((models.Billing.patient_id, payload.patient_id)),
+        *date_range(models.Billing.created_at, payload.date_from, payload.date_to),
+    ]
+    return bulk_transition(db, models.Billing, BILLING_TRANSITIONS, payload, conditions)
 
 @router.patch("/{id}/status")
 def update_bill_status(id: str, status: str, db: Session = Depends(get_db)):
-    bill = db.get(models.Billing, id)
+    bill = db.get(models.Billing, id, with_for_update=True)
     if not bill:
         raise HTTPException(404, "Bill not found")
-    bill.status = status
-    db.commit()
-    db.refresh(bill)
+    if check_transition(BILLING_TRANSITIONS, bill.status, status):
+        bill.status = status
+        db.commit()
     return {"message": "Status updated", "status": bill.status}
 
 @router.delete("/{id}")
@@ -63,3 +113,16 @@ def delete_bill(id: str, db: Session = Depends(get_db)):
     db.delete(bill)
     db.commit()
     return {"message": "Bill deleted successfully"}
+
+# Async CRUD handlers, swapped in when "billing" is listed in ASYNC_ROUTERS
+async_handlers = [
+    AsyncCRUD(
+        models.Billing, schemas.BillingCreate, schemas.BillingOut, "Bill",
+        filters=("patient_id", "status"),
+        date_field="created_at",
+        sort_fields={"created_at": models.Billing.created_at, "total_amount": models.Billing.total_amount},
+        default_sort="created_at",
+        references={"patient_id": (models.Patient, "Patient")},
+        archive_model=models.BillingArchive,
+    ),
+]
@@ -1,9 +1,19 @@
 # routers/doctors.py
-from fastapi import APIRouter, Depends, HTTPException
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, get_read_db
 import models
 import schemas
+from crud_async import AsyncCRUD
+from availability import free_slots
+from bulk import bulk_create, bulk_create_csv, DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE
+from pagination import PageParams, paginate, apply_filters
+from reference_cache import doctors_cache, cached_get, cached_page
+from conditional import versioned
+from prefer import return_minimal, minimal_response
 
 router = APIRouter(prefix="/doctors", tags=["doctors"])
 
@@ -13,34 +23,105 @@ def get_db():
     finally: db.close()
 
 @router.post("/", response_model=schemas.DoctorOut)
-def create_doctor(payload: schemas.DoctorCreate, db: Session = Depends(get_db)):
+def create_doctor(payload: schemas.DoctorCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     doctor = models.Doctor(**payload.dict())
     db.add(doctor)
     db.commit()
-    db.refresh(doctor)
-    return doctor
+    return minimal_response(doctor) if minimal else doctor
 
-@router.get("/", response_model=list[schemas.DoctorOut])
-def get_all_doctors(db: Session = Depends(get_db)):
-    return db.query(models.Doctor).all()
+@router.post("/bulk", response_model=schemas.BulkResult)
+def bulk_create_doctors(
+    rows: list[dict] = Body(...),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    db: Session = Depends(get_db),
+):
+    return bulk_create(db, models.Doctor, schemas.DoctorCreate, rows, unique_fields=("phone",), batch_size=batch_size)
 
-@router.get("/{id}", response_model=schemas.DoctorOut)
-def get_doctor(id: str, db: Session = Depends(get_db)):
+@router.post("/bulk/csv", response_model=schemas.BulkResult)
+async def bulk_create_doctors_csv(
+    request: Request,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    db: Session = Depends(get_db),
+):
+    return await bulk_create_csv(request, db, models.Doctor, schemas.DoctorCreate, unique_fields=("phone",), batch_size=batch_size)
+
+@router.get("/", response_model=list[schemas.DoctorOut], dependencies=[versioned("doctors")])
+def get_all_doctors(
+    response: Response,
+    specialization: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    query = apply_filters(db.query(models.Doctor), (models.Doctor.specialization, specialization))
+    return cached_page(doctors_cache, response, page, (specialization,), lambda response: paginate(
+        query, models.Doctor, page, response,
+        sort_fields={"name": models.Doctor.name, "specialization": models.Doctor.specialization},
+        default_sort="name",
+    ))
+
+def _current_minute():
+    # Today's past slots drop out of availability as time passes
+    return datetime.now().strftime("%Y-%m-%d %H:%M")
+
+def _availability(db: Session, doctors, day: date):
+    # One query over (doctor_id, appointment_date, ...) for every doctor asked for
+    booked = defaultdict(list)
+    if doctors:
+        rows = db.query(models.Appointment.doctor_id, models.Appointment.appointment_time).filter(
+            models.Appointment.doctor_id.in_([d.id for d in doctors]),
+            models.Appointment.appointment_date == day,
+            models.Appointment.slot_taken == 1,
+        )
+        for doctor_id, appointment_time in rows:
+            booked[doctor_id].append(appointment_time)
+
+    return [
+        {
+            "doctor_id": d.id,
+            "doctor_name": d.name,
+            "specialization": d.specialization,
+            "date": day,
+            "slot_minutes": d.slot_minutes,
+            "free_slots": free_slots(d.work_start, d.work_end, d.slot_minutes, booked[d.id], day),
+        }
+        for d in doctors
+    ]
+
+@router.get(
+    "/availability", response_model=list[schemas.DoctorAvailability],
+    dependencies=[versioned("doctors", "appointments", vary=_current_minute)],
+)
+def get_availability(
+    day: date = Query(..., alias="date"),
+    specialization: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    doctors = apply_filters(db.query(models.Doctor), (models.Doctor.specialization, specialization))
+    return _availability(db, doctors.order_by(models.Doctor.name).all(), day)
+
+@router.get(
+    "/{id}/availability", response_model=schemas.DoctorAvailability,
+    dependencies=[versioned("doctors", "appointments", vary=_current_minute)],
+)
+def get_doctor_availability(id: str, day: date = Query(..., alias="date"), db: Session = Depends(get_read_db)):
     doctor = db.get(models.Doctor, id)
     if not doctor:
         raise HTTPException(404, "Doctor not found")
-    return doctor
+    return _availability(db, [doctor], day)[0]
+
+@router.get("/{id}", response_model=schemas.DoctorOut, dependencies=[versioned("doctors")])
+def get_doctor(id: str, db: Session = Depends(get_read_db)):
+    return cached_get(doctors_cache, db, models.Doctor, id, "Doctor")
 
 @router.put("/{id}", response_model=schemas.DoctorOut)
-def update_doctor(id: str, payload: schemas.DoctorCreate, db: Session = Depends(get_db)):
+def update_doctor(id: str, payload: schemas.DoctorCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     doctor = db.get(models.Doctor, id)
     if not doctor:
         raise HTTPException(404, "Doctor not found")
     for key, value in payload.dict().items():
         setattr(doctor, key, value)
     db.commit()
-    db.refresh(doctor)
-    return doctor
+    return minimal_response(doctor) if minimal else doctor
 
 @router.delete("/{id}")
 def delete_doctor(id: str, db: Session = Depends(get_db)):
@@ -50,3 +131,13 @@ def delete_doctor(id: str, db: Session = Depends(get_db)):
     db.delete(doctor)
     db.commit()
     return {"message": "Doctor deleted successfully"}
+
+# Async CRUD handlers, swapped in when "doctors" is listed in ASYNC_ROUTERS
+async_handlers = [
+    AsyncCRUD(
+        models.Doctor, schemas.DoctorCreate, schemas.DoctorOut, "Doctor",
+        filters=("specialization",),
+        sort_fields={"name": models.Doctor.name, "specialization": models.Doctor.specialization},
+        default_sort="name",
+    ),
+]
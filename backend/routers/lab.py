@@ -1,12 +1,26 @@
 # routers/lab.py
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, get_read_db
 import models
 import schemas
+from crud_async import AsyncCRUD
+from pagination import PageParams, paginate, apply_filters, date_range, equals
+from export import export_response
+from archive import get_including_archive
+from reference_cache import lab_tests_cache, cached_get, cached_page
+from conditional import versioned
+from prefer import return_minimal, minimal_response
+from transitions import bulk_transition, check_transition, LAB_REPORT_TRANSITIONS
+from serialization import fast_json_enabled, fast_paginate
 
 router = APIRouter(prefix="/lab", tags=["lab"])
 
+# Serve list/export responses through the fast encoder (FAST_JSON_ROUTERS)
+FAST_JSON = fast_json_enabled("lab")
+
 def get_db():
     db = SessionLocal()
     try:
@@ -20,21 +34,29 @@ def get_db():
 # ======================================================
 
 @router.post("/tests", response_model=schemas.LabTestOut)
-def create_test(payload: schemas.LabTestCreate, db: Session = Depends(get_db)):
+def create_test(payload: schemas.LabTestCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     test = models.LabTest(**payload.dict())
     db.add(test)
     db.commit()
-    db.refresh(test)
-    return test
+    return minimal_response(test) if minimal else test
+
 
+@router.get("/tests", response_model=list[schemas.LabTestOut], dependencies=[versioned("lab_tests")])
+def list_tests(response: Response, page: PageParams = Depends(), db: Session = Depends(get_read_db)):
+    return cached_page(lab_tests_cache, response, page, (), lambda response: paginate(
+        db.query(models.LabTest), models.LabTest, page, response,
+        sort_fields={"test_name": models.LabTest.test_name},
+        default_sort="test_name",
+    ))
 
-@router.get("/tests", response_model=list[schemas.LabTestOut])
-def list_tests(db: Session = Depends(get_db)):
-    return db.query(models.LabTest).all()
+
+@router.get("/tests/{id}", response_model=schemas.LabTestOut, dependencies=[versioned("lab_tests")])
+def get_test(id: str, db: Session = Depends(get_read_db)):
+    return cached_get(lab_tests_cache, db, models.LabTest, id, "Test")
 
 
 @router.put("/tests/{id}", response_model=schemas.LabTestOut)
-def update_test(id: str, payload: schemas.LabTestCreate, db: Session = Depends(get_db)):
+def update_test(id: str, payload: schemas.LabTestCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     test = db.get(models.LabTest, id)
     if not test:
         raise HTTPException(404, "Test not found")
@@ -43,8 +65,7 @@ def update_test(id: str, payload: schemas.LabTestCreate, db: Session = Depends(g
         setattr(test, k, v)
 
     db.commit()
-    db.refresh(test)
-    return test
+    return minimal_response(test) if minimal else test
 
 
 @router.delete("/tests/{id}")
@@ -63,7 +84,7 @@ def delete_test(id: str, db: Session = Depends(get_db)):
 # ======================================================
 
 @router.post("/reports", response_model=schemas.LabReportOut)
-def create_report(payload: schemas.LabReportCreate, db: Session = Depends(get_db)):
+def create_report(payload: schemas.LabReportCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     if not db.get(models.Patient, payload.patient_id):
         raise HTTPException(404, "Patient not found")
     if not db.get(models.LabTest, payload.test_id):
@@ -72,25 +93,65 @@ def create_report(payload: schemas.LabReportCreate, db: Session = Depends(get_db
     report = models.LabReport(**payload.dict())
     db.add(report)
     db.commit()
-    db.refresh(report)
-    return report
-
-
-@router.get("/reports", response_model=list[schemas.LabReportOut])
-def list_reports(db: Session = Depends(get_db)):
-    return db.query(models.LabReport).all()
-
-
-@router.get("/reports/{id}", response_model=schemas.LabReportOut)
-def get_report(id: str, db: Session = Depends(get_db)):
-    report = db.get(models.LabReport, id)
+    return minimal_response(report) if minimal else report
+
+
+@router.get("/reports", response_model=list[schemas.LabReportOut], dependencies=[versioned("lab_reports")])
+def list_reports(
+    response: Response,
+    patient_id: Optional[str] = None,
+    doctor_id: Optional[str] = None,
+    test_id: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    query = apply_filters(
+        db.query(models.LabReport),
+        (models.LabReport.patient_id, patient_id),
+        (models.LabReport.doctor_id, doctor_id),
+        (models.LabReport.test_id, test_id),
+        (models.LabReport.status, status),
+    ).filter(*date_range(models.LabReport.test_date, date_from, date_to))
+    sort_fields = {"test_date": models.LabReport.test_date}
+    if FAST_JSON:
+        return fast_paginate(query, models.LabReport, schemas.LabReportOut, page, response, sort_fields, "test_date")
+    return paginate(query, models.LabReport, page, response, sort_fields, "test_date")
+
+
+@router.get("/reports/export")
+def export_reports(
+    patient_id: Optional[str] = None,
+    test_id: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    include_archive: bool = False,
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+):
+    conditions = [
+        *equals(
+            (models.LabReport.patient_id, patient_id),
+            (models.LabReport.test_id, test_id),
+            (models.LabReport.status, status),
+        ),
+        *date_range(models.LabReport.test_date, date_from, date_to),
+    ]
+    return export_response(models.LabReport, conditions, fmt, "lab_reports", fast=FAST_JSON, include_archive=include_archive)
+
+
+@router.get("/reports/{id}", response_model=schemas.LabReportOut, dependencies=[versioned("lab_reports")])
+def get_report(id: str, include_archive: bool = False, db: Session = Depends(get_read_db)):
+    report = get_including_archive(db, models.LabReport, id, include_archive)
     if not report:
         raise HTTPException(404, "Report not found")
     return report
 
 
 @router.put("/reports/{id}", response_model=schemas.LabReportOut)
-def update_report(id: str, payload: schemas.LabReportCreate, db: Session = Depends(get_db)):
+def update_report(id: str, payload: schemas.LabReportCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     report = db.get(models.LabReport, id)
     if not report:
         raise HTTPException(404, "Report not found")
@@ -99,21 +160,30 @@ def update_report(id: str, payload: schemas.LabReportCreate, db: Session = Depen
         setattr(report, k, v)
 
     db.commit()
-    db.refresh(report)
-    return report
+    return minimal_response(report) if minimal else report
 
 
 # ---------- FIXED PATCH ENDPOINTS (JSON BODY REQUIRED!) ----------
 
+@router.patch("/reports/status", response_model=schemas.BulkStatusResult)
+def update_report_status_bulk(payload: schemas.LabReportBulkStatus, db: Session = Depends(get_db)):
+    L = models.LabReport
+    conditions = [
+        *equals((L.patient_id, payload.patient_id), (L.doctor_id, payload.doctor_id), (L.test_id, payload.test_id)),
+        *date_range(L.test_date, payload.date_from, payload.date_to),
+    ]
+    return bulk_transition(db, L, LAB_REPORT_TRANSITIONS, payload, conditions)
+
+
 @router.patch("/reports/{id}/status")
 def update_report_status(id: str, payload: schemas.StatusUpdate, db: Session = Depends(get_db)):
-    report = db.get(models.LabReport, id)
+    report = db.get(models.LabReport, id, with_for_update=True)
     if not report:
         raise HTTPException(404, "Report not found")
 
-    report.status = payload.status
-    db.commit()
-    db.refresh(report)
+    if check_transition(LAB_REPORT_TRANSITIONS, report.status, payload.status):
+        report.status = payload.status
+        db.commit()
     return {"message": "Status updated", "status": report.status}
 
 
@@ -125,7 +195,6 @@ def update_report_result(id: str, payload: schemas.ResultUpdate, db: Session = D
 
     report.result = payload.result
     db.commit()
-    db.refresh(report)
     return {"message": "Result updated"}
 
 
@@ -140,3 +209,24 @@ def delete_report(id: str, db: Session = Depends(get_db)):
     db.delete(report)
     db.commit()
     return {"message": "Report deleted successfully"}
+
+
+# Async CRUD handlers, swapped in when "lab" is listed in ASYNC_ROUTERS
+async_handlers = [
+    AsyncCRUD(
+        models.LabTest, schemas.LabTestCreate, schemas.LabTestOut, "Test",
+        path="/tests",
+        sort_fields={"test_name": models.LabTest.test_name},
+        default_sort="test_name",
+    ),
+    AsyncCRUD(
+        models.LabReport, schemas.LabReportCreate, schemas.LabReportOut, "Report",
+        path="/reports",
+        filters=("patient_id", "doctor_id", "test_id", "status"),
+        date_field="test_date",
+        sort_fields={"test_date": models.LabReport.test_date},
+        default_sort="test_date",
+        references={"patient_id": (models.Patient, "Patient"), "test_id": (models.LabTest, "Lab test")},
+        archive_model=models.LabReportArchive,
+    ),
+]
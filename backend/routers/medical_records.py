@@ -1,49 +1,100 @@
 # routers/medical_records.py
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, get_read_db
 import schemas
 import models
+from crud_async import AsyncCRUD
+from pagination import PageParams, paginate, apply_filters, date_range, equals
+from export import export_response
+from archive import get_including_archive
+from conditional import versioned
+from prefer import return_minimal, minimal_response
+from search import search_records, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from serialization import fast_json_enabled, fast_paginate
 
 router = APIRouter(prefix="/records", tags=["medical_records"])
 
+# Serve list/export responses through the fast encoder (FAST_JSON_ROUTERS)
+FAST_JSON = fast_json_enabled("medical_records")
+
 def get_db():
     db = SessionLocal()
     try: yield db
     finally: db.close()
 
 @router.post("/", response_model=schemas.MedicalRecordOut)
-def create_record(payload: schemas.MedicalRecordCreate, db: Session = Depends(get_db)):
+def create_record(payload: schemas.MedicalRecordCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     if not db.get(models.Patient, payload.patient_id):
         raise HTTPException(404, "Patient not found")
 
     record = models.MedicalRecord(**payload.dict())
     db.add(record)
     db.commit()
-    db.refresh(record)
-    return record
+    return minimal_response(record) if minimal else record
 
-@router.get("/", response_model=list[schemas.MedicalRecordOut])
-def get_all_records(db: Session = Depends(get_db)):
-    return db.query(models.MedicalRecord).all()
+@router.get("/", response_model=list[schemas.MedicalRecordOut], dependencies=[versioned("medical_records")])
+def get_all_records(
+    response: Response,
+    patient_id: Optional[str] = None,
+    doctor_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    query = apply_filters(
+        db.query(models.MedicalRecord),
+        (models.MedicalRecord.patient_id, patient_id),
+        (models.MedicalRecord.doctor_id, doctor_id),
+    ).filter(*date_range(models.MedicalRecord.visit_date, date_from, date_to))
+    sort_fields = {"visit_date": models.MedicalRecord.visit_date}
+    if FAST_JSON:
+        return fast_paginate(query, models.MedicalRecord, schemas.MedicalRecordOut, page, response, sort_fields, "visit_date")
+    return paginate(query, models.MedicalRecord, page, response, sort_fields, "visit_date")
 
-@router.get("/{id}", response_model=schemas.MedicalRecordOut)
-def get_record(id: str, db: Session = Depends(get_db)):
-    record = db.get(models.MedicalRecord, id)
+@router.get("/export")
+def export_records(
+    patient_id: Optional[str] = None,
+    doctor_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    include_archive: bool = False,
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+):
+    conditions = [
+        *equals((models.MedicalRecord.patient_id, patient_id), (models.MedicalRecord.doctor_id, doctor_id)),
+        *date_range(models.MedicalRecord.visit_date, date_from, date_to),
+    ]
+    return export_response(models.MedicalRecord, conditions, fmt, "medical_records", fast=FAST_JSON, include_archive=include_archive)
+
+@router.get("/search", response_model=list[schemas.MedicalRecordOut], dependencies=[versioned("medical_records")])
+def search_records_text(
+    q: str = Query(..., min_length=1, max_length=200),
+    patient_id: Optional[str] = None,
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    db: Session = Depends(get_read_db),
+):
+    return search_records(db, q, limit, patient_id)
+
+@router.get("/{id}", response_model=schemas.MedicalRecordOut, dependencies=[versioned("medical_records")])
+def get_record(id: str, include_archive: bool = False, db: Session = Depends(get_read_db)):
+    record = get_including_archive(db, models.MedicalRecord, id, include_archive)
     if not record:
         raise HTTPException(404, "Record not found")
     return record
 
 @router.put("/{id}", response_model=schemas.MedicalRecordOut)
-def update_record(id: str, payload: schemas.MedicalRecordCreate, db: Session = Depends(get_db)):
+def update_record(id: str, payload: schemas.MedicalRecordCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     record = db.get(models.MedicalRecord, id)
     if not record:
         raise HTTPException(404, "Record not found")
     for key, value in payload.dict().items():
         setattr(record, key, value)
     db.commit()
-    db.refresh(record)
-    return record
+    return minimal_response(record) if minimal else record
 
 @router.delete("/{id}")
 def delete_record(id: str, db: Session = Depends(get_db)):
@@ -53,3 +104,16 @@ def delete_record(id: str, db: Session = Depends(get_db)):
     db.delete(record)
     db.commit()
     return {"message": "Record deleted successfully"}
+
+# Async CRUD handlers, swapped in when "medical_records" is listed in ASYNC_ROUTERS
+async_handlers = [
+    AsyncCRUD(
+        models.MedicalRecord, schemas.MedicalRecordCreate, schemas.MedicalRecordOut, "Record",
+        filters=("patient_id", "doctor_id"),
+        date_field="visit_date",
+        sort_fields={"visit_date": models.MedicalRecord.visit_date},
+        default_sort="visit_date",
+        references={"patient_id": (models.Patient, "Patient")},
+        archive_model=models.MedicalRecordArchive,
+    ),
+]
@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
 # ✅ FIX: Use absolute imports instead of relative imports
-from database import SessionLocal
+from database import SessionLocal, get_read_db
 import models
 import schemas
+from crud_async import AsyncCRUD
+from bulk import bulk_create, bulk_create_csv, DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE
+from pagination import PageParams, paginate, apply_filters, DEFAULT_LIMIT, MAX_LIMIT, NEXT_CURSOR_HEADER
+from timeline import patient_timeline, TIMELINE_TYPES, TIMELINE_TABLES
+from conditional import versioned
+from prefer import return_minimal, minimal_response
+from search import search_terms, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from matching import find_matches, DEFAULT_MATCH_LIMIT, MAX_MATCH_LIMIT
+from serialization import fast_json_enabled, fast_paginate
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
+# Serve list/export responses through the fast encoder (FAST_JSON_ROUTERS)
+FAST_JSON = fast_json_enabled("patients")
+
 def get_db():
     db = SessionLocal()
     try:
@@ -16,30 +30,122 @@ def get_db():
         db.close()
 
 
+def duplicate_conflict(matches) -> HTTPException:
+    return HTTPException(409, {
+        "message": "Possible duplicate patient",
+        "matches": jsonable_encoder([schemas.PatientMatch.model_validate(m, from_attributes=True) for m in matches]),
+    })
+
+
 @router.post("/", response_model=schemas.PatientOut)
-def create_patient(payload: schemas.PatientCreate, db: Session = Depends(get_db)):
+def create_patient(
+    payload: schemas.PatientCreate,
+    check_duplicates: bool = False,
+    db: Session = Depends(get_db),
+    minimal: bool = Depends(return_minimal),
+):
+    """With `check_duplicates`, likely existing charts for the same person are returned as a 409 instead."""
+    if check_duplicates:
+        matches = find_matches(db, payload.dict())
+        if matches:
+            raise duplicate_conflict(matches)
     patient = models.Patient(**payload.dict())
     db.add(patient)
     db.commit()
-    db.refresh(patient)
+    return minimal_response(patient) if minimal else patient
+
+
+@router.post("/bulk", response_model=schemas.BulkResult)
+def bulk_create_patients(
+    rows: list[dict] = Body(...),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    db: Session = Depends(get_db),
+):
+    return bulk_create(db, models.Patient, schemas.PatientCreate, rows, unique_fields=("phone",), batch_size=batch_size)
+
+
+@router.post("/bulk/csv", response_model=schemas.BulkResult)
+async def bulk_create_patients_csv(
+    request: Request,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    db: Session = Depends(get_db),
+):
+    return await bulk_create_csv(request, db, models.Patient, schemas.PatientCreate, unique_fields=("phone",), batch_size=batch_size)
+
+
+@router.get("/", response_model=list[schemas.PatientOut], dependencies=[versioned("patients")])
+def get_all_patients(
+    response: Response,
+    gender: Optional[str] = None,
+    phone: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    query = apply_filters(
+        db.query(models.Patient),
+        (models.Patient.gender, gender),
+        (models.Patient.phone, phone),
+    )
+    sort_fields = {"created_at": models.Patient.created_at, "name": models.Patient.name}
+    if FAST_JSON:
+        return fast_paginate(query, models.Patient, schemas.PatientOut, page, response, sort_fields, "created_at")
+    return paginate(query, models.Patient, page, response, sort_fields, "created_at")
+
+
+@router.get("/search", response_model=list[schemas.PatientOut], dependencies=[versioned("patients")])
+def search_patients(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    db: Session = Depends(get_read_db),
+):
+    """Typeahead by name words or phone digits (leading or trailing), best match first."""
+    return search_terms(db, models.Patient, q, limit)
+
+
+@router.post("/match", response_model=list[schemas.PatientMatch])
+def match_patient(
+    payload: schemas.PatientCreate,
+    limit: int = Query(DEFAULT_MATCH_LIMIT, ge=1, le=MAX_MATCH_LIMIT),
+    db: Session = Depends(get_read_db),
+):
+    """Existing patients likely to be the person in `payload` (spelling variants, same birth date or phone), best first."""
+    return find_matches(db, payload.dict(), limit=limit)
+
+
+@router.get("/{id}", response_model=schemas.PatientOut, dependencies=[versioned("patients")])
+def get_patient(id: str, db: Session = Depends(get_read_db)):
+    patient = db.get(models.Patient, id)
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
     return patient
 
 
-@router.get("/", response_model=list[schemas.PatientOut])
-def get_all_patients(db: Session = Depends(get_db)):
-    return db.query(models.Patient).all()
+@router.get("/{id}/timeline", response_model=list[schemas.TimelineEntry], dependencies=[versioned(*TIMELINE_TABLES)])
+def get_patient_timeline(
+    id: str,
+    response: Response,
+    types: Optional[list[str]] = Query(None, alias="type"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    include_archive: bool = False,
+    db: Session = Depends(get_read_db),
+):
+    if not db.get(models.Patient, id):
+        raise HTTPException(status_code=404, detail="Patient not found")
 
+    types = types or list(TIMELINE_TYPES)
+    unknown = set(types) - set(TIMELINE_TYPES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown timeline type: {', '.join(sorted(unknown))}")
 
-@router.get("/{id}", response_model=schemas.PatientOut)
-def get_patient(id: str, db: Session = Depends(get_db)):
-    patient = db.get(models.Patient, id)
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
-    return patient
+    entries, next_cursor = patient_timeline(db, id, types, limit, cursor, include_archive)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return entries
 
 
 @router.put("/{id}", response_model=schemas.PatientOut)
-def update_patient(id: str, payload: schemas.PatientCreate, db: Session = Depends(get_db)):
+def update_patient(id: str, payload: schemas.PatientCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     patient = db.get(models.Patient, id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
@@ -48,8 +154,7 @@ def update_patient(id: str, payload: schemas.PatientCreate, db: Session = Depend
         setattr(patient, key, value)
 
     db.commit()
-    db.refresh(patient)
-    return patient
+    return minimal_response(patient) if minimal else patient
 
 
 @router.delete("/{id}")
@@ -61,3 +166,21 @@ def delete_patient(id: str, db: Session = Depends(get_db)):
     db.delete(patient)
     db.commit()
     return {"message": "Patient deleted successfully"}
+
+
+async def check_duplicates_async(db, payload):
+    matches = await db.run_sync(find_matches, payload.dict())
+    if matches:
+        raise duplicate_conflict(matches)
+
+
+# Async CRUD handlers, swapped in when "patients" is listed in ASYNC_ROUTERS
+async_handlers = [
+    AsyncCRUD(
+        models.Patient, schemas.PatientCreate, schemas.PatientOut, "Patient",
+        filters=("gender", "phone"),
+        sort_fields={"created_at": models.Patient.created_at, "name": models.Patient.name},
+        default_sort="created_at",
+        duplicate_check=check_duplicates_async,
+    ),
+]
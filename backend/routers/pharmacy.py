@@ -1,12 +1,32 @@
 # routers/pharmacy.py
-from fastapi import APIRouter, Depends, HTTPException
+from collections import defaultdict
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, get_read_db
 import models
 import schemas
+from crud_async import AsyncCRUD
+from cache import mark_versioned
+from bulk import bulk_create, bulk_create_csv, DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE
+from pagination import PageParams, paginate, apply_filters, date_range, equals
+from export import export_response
+from reference_cache import medicines_cache, cached_get, cached_page
+from conditional import versioned
+from prefer import return_minimal, minimal_response
+from search import search_terms, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from serialization import fast_json_enabled, fast_paginate
 
 router = APIRouter(prefix="/pharmacy", tags=["pharmacy"])
 
+# Serve list/export responses through the fast encoder (FAST_JSON_ROUTERS)
+FAST_JSON = fast_json_enabled("pharmacy")
+
+# Written by every sale, so kept out of the cached catalog (see reference_cache.py)
+LIVE_COLUMNS = (models.PharmacyMedicine.stock,)
+
 def get_db():
     db = SessionLocal()
     try: yield db
@@ -14,34 +34,68 @@ def get_db():
 
 # ---------- MEDICINES ----------
 @router.post("/medicines", response_model=schemas.MedicineOut)
-def create_medicine(payload: schemas.MedicineCreate, db: Session = Depends(get_db)):
+def create_medicine(payload: schemas.MedicineCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     med = models.PharmacyMedicine(**payload.dict())
     db.add(med)
     db.commit()
-    db.refresh(med)
-    return med
+    return minimal_response(med) if minimal else med
 
-@router.get("/medicines", response_model=list[schemas.MedicineOut])
-def list_medicines(db: Session = Depends(get_db)):
-    return db.query(models.PharmacyMedicine).all()
+@router.post("/medicines/bulk", response_model=schemas.BulkResult)
+def bulk_create_medicines(
+    rows: list[dict] = Body(...),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    db: Session = Depends(get_db),
+):
+    return bulk_create(db, models.PharmacyMedicine, schemas.MedicineCreate, rows, batch_size=batch_size)
 
-@router.get("/medicines/{id}", response_model=schemas.MedicineOut)
-def get_medicine(id: str, db: Session = Depends(get_db)):
-    med = db.get(models.PharmacyMedicine, id)
-    if not med:
-        raise HTTPException(404, "Medicine not found")
-    return med
+@router.post("/medicines/bulk/csv", response_model=schemas.BulkResult)
+async def bulk_create_medicines_csv(
+    request: Request,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    db: Session = Depends(get_db),
+):
+    return await bulk_create_csv(request, db, models.PharmacyMedicine, schemas.MedicineCreate, batch_size=batch_size)
+
+@router.get("/medicines", response_model=list[schemas.MedicineOut], dependencies=[versioned("pharmacy_medicines")])
+def list_medicines(
+    response: Response,
+    name: Optional[str] = None,
+    batch_no: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    query = apply_filters(
+        db.query(models.PharmacyMedicine),
+        (models.PharmacyMedicine.name, name),
+        (models.PharmacyMedicine.batch_no, batch_no),
+    )
+    return cached_page(medicines_cache, response, page, (name, batch_no), lambda response: paginate(
+        query, models.PharmacyMedicine, page, response,
+        sort_fields={"name": models.PharmacyMedicine.name, "stock": models.PharmacyMedicine.stock},
+        default_sort="name",
+    ), db=db, live=LIVE_COLUMNS)
+
+@router.get("/medicines/search", response_model=list[schemas.MedicineOut], dependencies=[versioned("pharmacy_medicines")])
+def search_medicines(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    db: Session = Depends(get_read_db),
+):
+    return search_terms(db, models.PharmacyMedicine, q, limit)
+
+@router.get("/medicines/{id}", response_model=schemas.MedicineOut, dependencies=[versioned("pharmacy_medicines")])
+def get_medicine(id: str, db: Session = Depends(get_read_db)):
+    return cached_get(medicines_cache, db, models.PharmacyMedicine, id, "Medicine", live=LIVE_COLUMNS)
 
 @router.put("/medicines/{id}", response_model=schemas.MedicineOut)
-def update_medicine(id: str, payload: schemas.MedicineCreate, db: Session = Depends(get_db)):
+def update_medicine(id: str, payload: schemas.MedicineCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
     med = db.get(models.PharmacyMedicine, id)
     if not med:
         raise HTTPException(404, "Medicine not found")
     for k,v in payload.dict().items():
         setattr(med, k, v)
     db.commit()
-    db.refresh(med)
-    return med
+    return minimal_response(med) if minimal else med
 
 @router.delete("/medicines/{id}")
 def delete_medicine(id: str, db: Session = Depends(get_db)):
@@ -53,32 +107,109 @@ def delete_medicine(id: str, db: Session = Depends(get_db)):
     return {"message": "Medicine deleted successfully"}
 
 # ---------- SALES ----------
-@router.post("/sell", response_model=schemas.PharmacySaleOut)
-def sell_medicine(payload: schemas.PharmacySaleCreate, db: Session = Depends(get_db)):
-    med = db.get(models.PharmacyMedicine, payload.medicine_id)
-    if not med:
-        raise HTTPException(404, "Medicine not found")
+def _checkout(db: Session, patient_id, items):
+    """
+    Sell every (medicine_id, quantity) line in one transaction.
 
-    if med.stock < payload.quantity:
-        raise HTTPException(400, "Not enough stock")
+    Stock is decremented with a conditional UPDATE ... WHERE stock >= qty, so
+    concurrent buyers can never oversell; lines are applied in medicine id
+    order so concurrent carts lock rows in the same order.
+    """
+    quantities = defaultdict(int)
+    for item in items:
+        if item.quantity <= 0:
+            raise HTTPException(400, "Quantity must be positive")
+        quantities[item.medicine_id] += item.quantity
+    if not quantities:
+        raise HTTPException(400, "Cart is empty")
 
-    total = float(med.price) * payload.quantity
+    if patient_id and not db.get(models.Patient, patient_id):
+        raise HTTPException(404, "Patient not found")
 
-    sale = models.PharmacySale(
-        patient_id=payload.patient_id,
-        medicine_id=payload.medicine_id,
-        quantity=payload.quantity,
-        total_amount=total
-    )
+    Medicine = models.PharmacyMedicine
+    prices = dict(db.query(Medicine.id, Medicine.price).filter(Medicine.id.in_(quantities)))
+    if len(prices) != len(quantities):
+        raise HTTPException(404, "Medicine not found")
 
-    med.stock -= payload.quantity
+    sales = []
+    for medicine_id in sorted(quantities):
+        quantity = quantities[medicine_id]
+        result = db.execute(
+            update(Medicine)
+            .where(Medicine.id == medicine_id, Medicine.stock >= quantity)
+            .values(stock=Medicine.stock - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.rollback()
+            raise HTTPException(400, "Not enough stock")
+        sales.append(models.PharmacySale(
+            patient_id=patient_id,
+            medicine_id=medicine_id,
+            quantity=quantity,
+            total_amount=prices[medicine_id] * quantity,
+        ))
 
-    db.add(sale)
+    # Stock only: bumps the ETag without clearing the cached catalog
+    mark_versioned(db, Medicine.__tablename__)
+    db.add_all(sales)
     db.commit()
-    db.refresh(sale)
+    return sales
+
+@router.post("/sell", response_model=schemas.PharmacySaleOut)
+def sell_medicine(payload: schemas.PharmacySaleCreate, db: Session = Depends(get_db), minimal: bool = Depends(return_minimal)):
+    sale = _checkout(db, payload.patient_id, [payload])[0]
+    return minimal_response(sale) if minimal else sale
+
+@router.post("/checkout", response_model=schemas.CheckoutOut)
+def checkout(payload: schemas.CheckoutCreate, db: Session = Depends(get_db)):
+    sales = _checkout(db, payload.patient_id, payload.items)
+    return {"sales": sales, "total_amount": sum(sale.total_amount for sale in sales)}
+
+@router.get("/sales", response_model=list[schemas.PharmacySaleOut], dependencies=[versioned("pharmacy_sales")])
+def list_sales(
+    response: Response,
+    patient_id: Optional[str] = None,
+    medicine_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    query = apply_filters(
+        db.query(models.PharmacySale),
+        (models.PharmacySale.patient_id, patient_id),
+        (models.PharmacySale.medicine_id, medicine_id),
+    ).filter(*date_range(models.PharmacySale.sale_date, date_from, date_to))
+    sort_fields = {"sale_date": models.PharmacySale.sale_date}
+    if FAST_JSON:
+        return fast_paginate(query, models.PharmacySale, schemas.PharmacySaleOut, page, response, sort_fields, "sale_date")
+    return paginate(query, models.PharmacySale, page, response, sort_fields, "sale_date")
+
+@router.get("/sales/export")
+def export_sales(
+    patient_id: Optional[str] = None,
+    medicine_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    include_archive: bool = False,
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+):
+    conditions = [
+        *equals((models.PharmacySale.patient_id, patient_id), (models.PharmacySale.medicine_id, medicine_id)),
+        *date_range(models.PharmacySale.sale_date, date_from, date_to),
+    ]
+    return export_response(models.PharmacySale, conditions, fmt, "pharmacy_sales", fast=FAST_JSON, include_archive=include_archive)
 
-    return sale
 
-@router.get("/sales", response_model=list[schemas.PharmacySaleOut])
-def list_sales(db: Session = Depends(get_db)):
-    return db.query(models.PharmacySale).all()
+# Async CRUD handlers, swapped in when "pharmacy" is listed in ASYNC_ROUTERS.
+# Sales stay on the sync stack.
+async_handlers = [
+    AsyncCRUD(
+        models.PharmacyMedicine, schemas.MedicineCreate, schemas.MedicineOut, "Medicine",
+        path="/medicines",
+        filters=("name", "batch_no"),
+        sort_fields={"name": models.PharmacyMedicine.name, "stock": models.PharmacyMedicine.stock},
+        default_sort="name",
+    ),
+]
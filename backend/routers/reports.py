@@ -0,0 +1,133 @@
+# routers/reports.py
+# Management reports, served from the daily rollup tables (see rollups.py) so
+# their cost depends on the date range asked for, not on the size of history.
+from collections import defaultdict
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import get_read_db
+import models
+import schemas
+from conditional import versioned
+from pagination import date_range, equals
+import rollups  # noqa: F401 -- keeps the rollup tables updated on every write
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+def _period(day: date, granularity: str) -> str:
+    return day.isoformat() if granularity == "day" else day.strftime("%Y-%m")
+
+@router.get(
+    "/revenue", response_model=list[schemas.RevenuePoint],
+    dependencies=[versioned("rollup_billing_daily", "rollup_pharmacy_daily")],
+)
+def get_revenue(
+    granularity: Literal["day", "month"] = "day",
+    billing_status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_read_db),
+):
+    """Billing and pharmacy revenue per day or month (bills optionally limited to one status)."""
+    B, P = models.BillingDailyRollup, models.PharmacyDailyRollup
+    points = defaultdict(lambda: {"billing_count": 0, "billing_amount": 0.0, "pharmacy_count": 0, "pharmacy_amount": 0.0})
+
+    bills = (
+        db.query(B.day, func.sum(B.bills), func.sum(B.amount))
+        .filter(*equals((B.status, billing_status)), *date_range(B.day, date_from, date_to))
+        .group_by(B.day)
+    )
+    for day, count, amount in bills:
+        point = points[_period(day, granularity)]
+        point["billing_count"] += int(count)
+        point["billing_amount"] += float(amount)
+
+    sales = (
+        db.query(P.day, func.sum(P.sales), func.sum(P.amount))
+        .filter(*date_range(P.day, date_from, date_to))
+        .group_by(P.day)
+    )
+    for day, count, amount in sales:
+        point = points[_period(day, granularity)]
+        point["pharmacy_count"] += int(count)
+        point["pharmacy_amount"] += float(amount)
+
+    return [
+        {"period": period, **point, "total_amount": point["billing_amount"] + point["pharmacy_amount"]}
+        for period, point in sorted(points.items())
+    ]
+
+@router.get(
+    "/lab-volume", response_model=list[schemas.LabVolume],
+    dependencies=[versioned("rollup_lab_daily", "lab_tests")],
+)
+def get_lab_volume(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    L = models.LabDailyRollup
+    reports = func.sum(L.reports)
+    rows = (
+        db.query(L.test_id, models.LabTest.test_name, reports)
+        .outerjoin(models.LabTest, models.LabTest.id == L.test_id)
+        .filter(*date_range(L.day, date_from, date_to))
+        .group_by(L.test_id, models.LabTest.test_name)
+        .order_by(reports.desc())
+        .limit(limit)
+    )
+    return [{"test_id": test_id, "test_name": name, "reports": int(count)} for test_id, name, count in rows]
+
+@router.get(
+    "/appointments-by-doctor", response_model=list[schemas.DoctorAppointments],
+    dependencies=[versioned("rollup_appointments_daily", "doctors")],
+)
+def get_appointments_by_doctor(
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    A = models.AppointmentDailyRollup
+    appointments = func.sum(A.appointments)
+    rows = (
+        db.query(A.doctor_id, models.Doctor.name, appointments)
+        .outerjoin(models.Doctor, models.Doctor.id == A.doctor_id)
+        .filter(*equals((A.status, status)), *date_range(A.day, date_from, date_to))
+        .group_by(A.doctor_id, models.Doctor.name)
+        .order_by(appointments.desc())
+        .limit(limit)
+    )
+    return [
+        {"doctor_id": doctor_id or None, "doctor_name": name, "appointments": int(count)}
+        for doctor_id, name, count in rows
+    ]
+
+@router.get(
+    "/pharmacy-by-medicine", response_model=list[schemas.MedicineSales],
+    dependencies=[versioned("rollup_pharmacy_daily", "pharmacy_medicines")],
+)
+def get_pharmacy_by_medicine(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    P = models.PharmacyDailyRollup
+    amount = func.sum(P.amount)
+    rows = (
+        db.query(P.medicine_id, models.PharmacyMedicine.name, func.sum(P.sales), func.sum(P.quantity), amount)
+        .outerjoin(models.PharmacyMedicine, models.PharmacyMedicine.id == P.medicine_id)
+        .filter(*date_range(P.day, date_from, date_to))
+        .group_by(P.medicine_id, models.PharmacyMedicine.name)
+        .order_by(amount.desc())
+        .limit(limit)
+    )
+    return [
+        {"medicine_id": medicine_id, "medicine_name": name, "sales": int(sales), "quantity": int(quantity), "amount": float(total)}
+        for medicine_id, name, sales, quantity, total in rows
+    ]
@@ -0,0 +1,92 @@
+# routers/stats.py
+from datetime import date, datetime
+from fastapi import APIRouter, Depends
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import SessionLocal, get_read_db, pool_stats
+from cache import TTLCache, depends_on, cache_stats
+import models
+import schemas
+import live
+import admission
+from conditional import versioned
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+# Dashboard aggregates are served from memory for a short while and dropped
+# as soon as one of the underlying tables is written.
+SUMMARY_TABLES = ("patients", "doctors", "appointments", "medical_records", "billing", "lab_reports")
+summary_cache = depends_on(TTLCache(ttl=30, name="stats_summary"), *SUMMARY_TABLES)
+
+# Totals include rows moved to the archive tables (archive.py). Those only
+# change when the archival job runs, so they are kept for much longer.
+ARCHIVE_TABLES = tuple(archive.__table__.name for archive in models.ARCHIVE_MODELS.values())
+archive_totals_cache = depends_on(TTLCache(ttl=3600, name="stats_archive_totals"), *ARCHIVE_TABLES)
+
+def get_db():
+    db = SessionLocal()
+    try: yield db
+    finally: db.close()
+
+def _count(db: Session, model, *conditions):
+    return db.query(func.count(model.id)).filter(*conditions).scalar()
+
+def _archived_totals(db: Session):
+    B = models.BillingArchive
+    billing = db.query(B.status, func.count(B.id), func.coalesce(func.sum(B.total_amount), 0)).group_by(B.status)
+    return {
+        "counts": {model.__tablename__: _count(db, archive) for model, archive in models.ARCHIVE_MODELS.items()},
+        "billing": {status: {"count": count, "amount": float(amount)} for status, count, amount in billing},
+    }
+
+def _total(db: Session, archived: dict, model):
+    return _count(db, model) + archived["counts"][model.__tablename__]
+
+def _billing_totals(db: Session, archived: dict, status: str):
+    count, amount = db.query(
+        func.count(models.Billing.id),
+        func.coalesce(func.sum(models.Billing.total_amount), 0),
+    ).filter(models.Billing.status == status).one()
+    old = archived["billing"].get(status, {"count": 0, "amount": 0.0})
+    return {"count": count + old["count"], "amount": float(amount) + old["amount"]}
+
+def _build_summary(db: Session):
+    today = date.today()
+    archived = archive_totals_cache.get_or_load("totals", lambda: _archived_totals(db))
+    return {
+        "patients": _count(db, models.Patient),
+        "doctors": _count(db, models.Doctor),
+        "appointments": _total(db, archived, models.Appointment),
+        "medical_records": _total(db, archived, models.MedicalRecord),
+        "bills": _total(db, archived, models.Billing),
+        "lab_reports": _total(db, archived, models.LabReport),
+        "appointments_today": _count(db, models.Appointment, models.Appointment.appointment_date == today),
+        "appointments_upcoming": _count(
+            db, models.Appointment,
+            models.Appointment.appointment_date > today,
+            models.Appointment.status == "scheduled",
+        ),
+        "billing_pending": _billing_totals(db, archived, "pending"),
+        "billing_paid": _billing_totals(db, archived, "paid"),
+        "generated_at": datetime.now(),
+    }
+
+@router.get("/summary", response_model=schemas.StatsSummary, dependencies=[versioned(*SUMMARY_TABLES, vary=date.today)])
+def get_summary(db: Session = Depends(get_read_db)):
+    return summary_cache.get_or_load("summary", lambda: _build_summary(db))
+
+@router.get("/db-pool")
+def get_pool_stats():
+    return pool_stats()
+
+@router.get("/cache")
+def get_cache_stats():
+    return cache_stats()
+
+@router.get("/live")
+def get_live_stats():
+    return live.broker.stats()
+
+@router.get("/admission")
+def get_admission_stats():
+    return admission.controller.stats()
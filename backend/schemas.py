@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional
 from uuid import UUID
 from datetime import date, time, datetime
@@ -19,12 +19,27 @@ class PatientOut(PatientCreate):
     class Config:
         orm_mode = True
 
+# Likely duplicate of a patient being registered (see matching.py)
+class PatientMatch(BaseModel):
+    patient: PatientOut
+    score: float
+    reasons: list[str]
+
 # ----------------- DOCTORS -----------------
 class DoctorCreate(BaseModel):
     name: str
     specialization: str
     phone: Optional[str] = None
     room_no: Optional[str] = None
+    work_start: time = time(9, 0)
+    work_end: time = time(17, 0)
+    slot_minutes: int = Field(15, gt=0)
+
+    @model_validator(mode="after")
+    def check_hours(self):
+        if self.work_end <= self.work_start:
+            raise ValueError("work_end must be after work_start")
+        return self
 
 class DoctorOut(DoctorCreate):
     id: str
@@ -97,6 +112,19 @@ class PharmacySaleOut(PharmacySaleCreate):
     class Config:
         orm_mode = True
 
+# ----------------- CHECKOUT -----------------
+class CheckoutLine(BaseModel):
+    medicine_id: str
+    quantity: int
+
+class CheckoutCreate(BaseModel):
+    patient_id: Optional[str] = None
+    items: list[CheckoutLine]
+
+class CheckoutOut(BaseModel):
+    sales: list[PharmacySaleOut]
+    total_amount: float
+
 # ----------------- LAB TESTS -----------------
 class LabTestCreate(BaseModel):
     test_name: str
@@ -129,3 +157,120 @@ class StatusUpdate(BaseModel):
 
 class ResultUpdate(BaseModel):
     result: str
+
+
+# ----------------- BULK STATUS TRANSITIONS -----------------
+# Rows are selected by `ids`, or by the filter fields (at least one is required).
+# `from_status` narrows a filter to rows currently in that status.
+class BulkStatusUpdate(BaseModel):
+    status: str
+    ids: Optional[list[str]] = None
+    from_status: Optional[str] = None
+
+class AppointmentBulkStatus(BulkStatusUpdate):
+    doctor_id: Optional[str] = None
+    patient_id: Optional[str] = None
+    appointment_date: Optional[date] = None
+
+class BillingBulkStatus(BulkStatusUpdate):
+    patient_id: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+class LabReportBulkStatus(BulkStatusUpdate):
+    patient_id: Optional[str] = None
+    doctor_id: Optional[str] = None
+    test_id: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+class BulkStatusRejection(BaseModel):
+    id: str
+    reason: str
+
+class BulkStatusResult(BaseModel):
+    status: str
+    updated: list[str]
+    rejected: list[BulkStatusRejection]
+
+
+# ----------------- DASHBOARD STATS -----------------
+class BillingTotals(BaseModel):
+    count: int
+    amount: float
+
+class StatsSummary(BaseModel):
+    patients: int
+    doctors: int
+    appointments: int
+    medical_records: int
+    bills: int
+    lab_reports: int
+    appointments_today: int
+    appointments_upcoming: int
+    billing_pending: BillingTotals
+    billing_paid: BillingTotals
+    generated_at: datetime
+
+
+# ----------------- REPORTS -----------------
+class RevenuePoint(BaseModel):
+    period: str
+    billing_count: int
+    billing_amount: float
+    pharmacy_count: int
+    pharmacy_amount: float
+    total_amount: float
+
+class LabVolume(BaseModel):
+    test_id: str
+    test_name: Optional[str]
+    reports: int
+
+class DoctorAppointments(BaseModel):
+    doctor_id: Optional[str]
+    doctor_name: Optional[str]
+    appointments: int
+
+class MedicineSales(BaseModel):
+    medicine_id: str
+    medicine_name: Optional[str]
+    sales: int
+    quantity: int
+    amount: float
+
+
+# ----------------- BULK CREATE -----------------
+class BulkRowResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkRowResult]
+
+
+# ----------------- AVAILABILITY -----------------
+class DoctorAvailability(BaseModel):
+    doctor_id: str
+    doctor_name: str
+    specialization: str
+    date: date
+    slot_minutes: int
+    free_slots: list[time]
+
+
+# ----------------- PATIENT TIMELINE -----------------
+class TimelineEntry(BaseModel):
+    type: str
+    id: str
+    occurred_at: Optional[datetime]
+    title: str
+    detail: Optional[str] = None
+    status: Optional[str] = None
+    amount: Optional[float] = None
+    doctor_id: Optional[str] = None
+    doctor_name: Optional[str] = None
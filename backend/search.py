@@ -0,0 +1,257 @@
+# search.py
+# Typeahead search over patients (name words, phone) and medicines (name and
+# batch words), plus full-text search over medical record text.
+#
+# Patients and medicines are indexed into `search_terms`, one row per word
+# (and per phone prefix / reversed-phone prefix so both leading and trailing
+# digits can be typed). Every query word becomes a range scan on
+# (kind, term), so a lookup reads a bounded slice of one index no matter
+# how many rows the table has. Terms are kept in sync on flush, and by the
+# bulk loader for multi-row inserts. Re-index everything (e.g. after
+# changing how terms are built) with:
+#
+#     python -m search rebuild
+#
+# Medical records use a FULLTEXT index on MySQL (added by migration 0005);
+# other databases fall back to an unindexed LIKE scan, which is fine for
+# local development only.
+import re
+import sys
+import unicodedata
+from collections import defaultdict
+
+from sqlalchemy import and_, case, delete, event, func, insert, literal, or_, select, union_all
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Session
+
+import models
+
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+# Rows matching the whole query that are ranked in Python; bounds the work
+# for short, unselective prefixes like "a"
+CANDIDATE_LIMIT = 500
+
+TERM_LENGTH = 100
+REBUILD_BATCH_SIZE = 5000
+
+_WORD = re.compile(r"\w+")
+
+
+def _normalize(value: str) -> str:
+    value = unicodedata.normalize("NFKD", value)
+    return "".join(ch for ch in value if not unicodedata.combining(ch)).casefold()
+
+
+def words(value) -> list:
+    return _WORD.findall(_normalize(value)) if value else []
+
+
+def _phone_terms(phone) -> set:
+    digits = re.sub(r"\D", "", phone or "")
+    if not digits:
+        return set()
+    return {"#" + digits, "~" + digits[::-1]}
+
+
+# ------------ INDEXED MODELS ------------
+def patient_terms(values) -> set:
+    return set(words(values.get("name"))) | _phone_terms(values.get("phone"))
+
+
+def medicine_terms(values) -> set:
+    return set(words(values.get("name"))) | set(words(values.get("batch_no")))
+
+
+INDEXED = {
+    models.Patient: ("patient", patient_terms),
+    models.PharmacyMedicine: ("medicine", medicine_terms),
+}
+
+
+def term_rows(kind, terms_for, rows):
+    return [
+        {"kind": kind, "ref_id": values["id"], "term": term[:TERM_LENGTH]}
+        for values in rows
+        for term in {t[:TERM_LENGTH] for t in terms_for(values)}
+    ]
+
+
+def index_rows(conn, model, rows):
+    """(Re)index `rows` (dicts with the model's columns) of an indexed model."""
+    if model not in INDEXED or not rows:
+        return
+    kind, terms_for = INDEXED[model]
+    SearchTerm = models.SearchTerm
+    conn.execute(delete(SearchTerm).where(
+        SearchTerm.kind == kind, SearchTerm.ref_id.in_([values["id"] for values in rows])
+    ))
+    new_terms = term_rows(kind, terms_for, rows)
+    if new_terms:
+        conn.execute(insert(SearchTerm), new_terms)
+
+
+def unindex_rows(conn, model, ids):
+    if model not in INDEXED or not ids:
+        return
+    kind, _ = INDEXED[model]
+    SearchTerm = models.SearchTerm
+    conn.execute(delete(SearchTerm).where(SearchTerm.kind == kind, SearchTerm.ref_id.in_(ids)))
+
+
+def _columns(obj):
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+
+def rebuild(conn):
+    """Re-index every patient and medicine from scratch."""
+    conn.execute(delete(models.SearchTerm))
+    for model, (kind, terms_for) in INDEXED.items():
+        table = model.__table__
+        stmt = select(table).order_by(table.c.id).limit(REBUILD_BATCH_SIZE)
+        last_id = None
+        while True:
+            chunk = conn.execute(stmt if last_id is None else stmt.where(table.c.id > last_id)).mappings().all()
+            if not chunk:
+                break
+            rows = term_rows(kind, terms_for, chunk)
+            if rows:
+                conn.execute(insert(models.SearchTerm), rows)
+            last_id = chunk[-1]["id"]
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_search_terms(session, flush_context):
+    changed = defaultdict(list)
+    removed = defaultdict(list)
+    for obj in (*session.new, *session.dirty):
+        if type(obj) in INDEXED:
+            changed[type(obj)].append(_columns(obj))
+    for obj in session.deleted:
+        if type(obj) in INDEXED:
+            removed[type(obj)].append(obj.id)
+
+    conn = session.connection()
+    for model, rows in changed.items():
+        index_rows(conn, model, rows)
+    for model, ids in removed.items():
+        unindex_rows(conn, model, ids)
+
+
+# ------------ TERM SEARCH ------------
+def _prefix(column, prefix: str):
+    # A range instead of LIKE, so every database can use the index for it
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+
+def _alternatives(word: str) -> list:
+    # Digits may be part of a name word, or a leading / trailing phone fragment
+    if word.isdigit():
+        return [word, "#" + word, "~" + word[::-1]]
+    return [word]
+
+
+def _word_matches(kind, index: int, word: str):
+    """(ref_id, word, score) for rows with a term starting with `word`; exact words score 2."""
+    SearchTerm = models.SearchTerm
+    alternatives = _alternatives(word)
+    return select(
+        SearchTerm.ref_id.label("ref_id"),
+        literal(index).label("word"),
+        case((SearchTerm.term.in_(alternatives), 2), else_=1).label("score"),
+    ).where(SearchTerm.kind == kind, or_(*(_prefix(SearchTerm.term, alt) for alt in alternatives)))
+
+
+def _matches(db, model, kind, query_words) -> dict:
+    """
+    ref_id -> score for rows matching every word, intersected in the database
+    so the candidate limit applies to rows that match the whole query.
+    """
+    hits = union_all(*(_word_matches(kind, i, word) for i, word in enumerate(query_words))).subquery()
+    # Best score per (row, word), so a word matching two terms of a row counts once
+    per_word = (
+        select(hits.c.ref_id, func.max(hits.c.score).label("score"))
+        .group_by(hits.c.ref_id, hits.c.word)
+        .subquery()
+    )
+    score = func.sum(per_word.c.score)
+    stmt = (
+        select(per_word.c.ref_id, score)
+        .join(model, model.id == per_word.c.ref_id)
+        .group_by(per_word.c.ref_id, model.name)
+        .having(func.count() == len(query_words))
+        .order_by(score.desc(), model.name)
+        .limit(CANDIDATE_LIMIT)
+    )
+    return dict(db.execute(stmt).all())
+
+
+def search_terms(db, model, q: str, limit: int):
+    """
+    Rows of an indexed `model` whose terms match every word of `q` by prefix,
+    best first: exact word matches, then names starting with the query, then
+    alphabetical.
+    """
+    kind, _ = INDEXED[model]
+    query_words = list(dict.fromkeys(words(q)))
+    if not query_words:
+        return []
+
+    scores = _matches(db, model, kind, query_words)
+    if not scores:
+        return []
+
+    # Rank on (id, name) only, then load full rows for the winners
+    query = " ".join(words(q))
+
+    def rank(row):
+        name = " ".join(words(row.name))
+        return (-scores[row.id], not name.startswith(query), name)
+
+    names = db.execute(select(model.id, model.name).where(model.id.in_(list(scores)))).all()
+    best = [row.id for row in sorted(names, key=rank)[:limit]]
+    rows = {obj.id: obj for obj in db.execute(select(model).where(model.id.in_(best))).scalars()}
+    return [rows[id] for id in best if id in rows]
+
+
+# ------------ FULL-TEXT SEARCH ------------
+def _boolean_query(q: str) -> str:
+    # Every word required, each matched as a prefix: "hyper tens" -> "+hyper* +tens*"
+    return " ".join(f"+{word}*" for word in words(q))
+
+
+def search_records(db, q: str, limit: int, patient_id=None):
+    """Medical records matching `q` in diagnosis / prescription, most relevant first."""
+    R = models.MedicalRecord
+    if not words(q):
+        return []
+
+    conditions = [R.patient_id == patient_id] if patient_id else []
+    if db.get_bind().dialect.name == "mysql":
+        score = mysql.match(R.diagnosis, R.prescription, against=_boolean_query(q)).in_boolean_mode()
+        stmt = select(R).where(score, *conditions).order_by(score.desc(), R.visit_date.desc())
+    else:
+        conditions += [
+            or_(R.diagnosis.icontains(word, autoescape=True), R.prescription.icontains(word, autoescape=True))
+            for word in words(q)
+        ]
+        stmt = select(R).where(*conditions).order_by(R.visit_date.desc())
+    return db.execute(stmt.limit(limit)).scalars().all()
+
+
+def main(argv):
+    from database import engine
+
+    if argv[:1] != ["rebuild"]:
+        print("usage: python -m search rebuild")
+        return 1
+    with engine.begin() as conn:
+        rebuild(conn)
+    print("Rebuilt search_terms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
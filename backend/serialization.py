@@ -0,0 +1,107 @@
+# serialization.py
+# Opt-in fast path for list and export responses.
+#
+# The regular path loads full ORM entities, validates each one again through
+# its `*Out` schema and JSON-encodes the result. The fast path selects only
+# the schema's columns as plain tuples, converts the few values whose JSON
+# form differs from the database type (Numeric -> float), and encodes with
+# orjson. Rows come straight from the database, so nothing is re-validated;
+# the output is byte-for-byte what the `response_model` path produces
+# (tests/test_serialization.py compares the two for every router).
+#
+# Enable per router with FAST_JSON_ROUTERS, e.g. "patients,billing" or "all".
+import json
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import get_args
+
+from fastapi import Response
+
+from pagination import paginate
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+FAST_JSON_ROUTERS = {name.strip() for name in os.getenv("FAST_JSON_ROUTERS", "").split(",") if name.strip()}
+
+
+def fast_json_enabled(router_name: str) -> bool:
+    return "all" in FAST_JSON_ROUTERS or router_name in FAST_JSON_ROUTERS
+
+
+def _default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps(value) -> bytes:
+    """Compact UTF-8 JSON, identical to FastAPI's JSONResponse rendering."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(
+        value, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+def _schema_fields(schema) -> dict:
+    fields = getattr(schema, "model_fields", None) or schema.__fields__
+    return {
+        name: getattr(field, "annotation", None) or getattr(field, "outer_type_", None)
+        for name, field in fields.items()
+    }
+
+
+class RowEncoder:
+    """Selects and encodes the columns of `model` that `schema` outputs, in schema order."""
+
+    def __init__(self, model, schema):
+        fields = _schema_fields(schema)
+        self.names = list(fields)
+        self.columns = [getattr(model, name) for name in self.names]
+        self.floats = [
+            i for i, annotation in enumerate(fields.values())
+            if annotation is float or float in get_args(annotation)
+        ]
+
+    def to_dicts(self, rows):
+        names, floats, width = self.names, self.floats, len(self.names)
+        out = []
+        for row in rows:
+            values = list(row[:width])
+            for i in floats:
+                if values[i] is not None:
+                    values[i] = float(values[i])
+            out.append(dict(zip(names, values)))
+        return out
+
+
+_encoders = {}
+
+
+def row_encoder(model, schema) -> RowEncoder:
+    key = (model, schema)
+    if key not in _encoders:
+        _encoders[key] = RowEncoder(model, schema)
+    return _encoders[key]
+
+
+def fast_paginate(query, model, schema, params, response: Response, sort_fields: dict, default_sort: str):
+    """
+    `paginate` over column tuples, returning a ready JSON response.
+
+    Headers already set on `response` (ETag, next cursor) are carried over.
+    """
+    encoder = row_encoder(model, schema)
+    # The keyset needs the sort column and id on each row, even if the schema omits them
+    extra = [column for column in sort_fields.values() if column.key not in encoder.names]
+    rows = paginate(
+        query.with_entities(*encoder.columns, *extra), model, params, response, sort_fields, default_sort
+    )
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    return Response(dumps(encoder.to_dicts(rows)), media_type="application/json", headers=headers)
@@ -0,0 +1,198 @@
+# startup.py
+# Worker start-up: schema migrations, connection / cache warm-up and the
+# readiness state reported at /health/ready.
+#
+# Nothing here runs at import time. The engine only connects when first used,
+# so importing the app never touches the database; the lifespan hook in
+# main.py decides what happens before and after the worker starts serving:
+#
+#   STARTUP_MODE=dev         apply pending migrations, then warm up, before
+#                            serving (a database error stops the worker)
+#   STARTUP_MODE=production  never run DDL (deploys run `python -m migrations
+#                            upgrade` once); warm up in the background,
+#                            retrying until the database answers, and report
+#                            not-ready until then
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+import ids
+
+STARTUP_MODE = os.getenv("STARTUP_MODE", "dev")
+# Pooled connections opened before the worker reports ready
+WARM_CONNECTIONS = int(os.getenv("DB_WARM_CONNECTIONS", "2"))
+WARM_CACHES = os.getenv("WARM_REFERENCE_CACHES", "1") not in ("0", "false", "False")
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "2"))
+WARMUP_RETRY_MAX_SECONDS = 30.0
+
+log = logging.getLogger("hms.startup")
+
+
+def _process_started() -> float:
+    """Wall-clock time the process started (falls back to now)."""
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.time()
+
+
+class StartupState:
+    def __init__(self):
+        self.process_started = _process_started()
+        self.ready = False
+        self.ready_after = None
+        self.first_request_after = None
+        self.warmup_seconds = None
+        self.attempts = 0
+        self.error = None
+        self.warmed = {}
+
+    def since_start(self) -> float:
+        return round(time.time() - self.process_started, 3)
+
+    def note_request(self):
+        if self.first_request_after is None:
+            self.first_request_after = self.since_start()
+            log.info("First request served %ss after process start", self.first_request_after)
+
+    def report(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "mode": STARTUP_MODE,
+            "ready_after_seconds": self.ready_after,
+            "first_request_after_seconds": self.first_request_after,
+            "warmup_seconds": self.warmup_seconds,
+            "warmup_attempts": self.attempts,
+            "warmed": self.warmed,
+            "last_error": self.error,
+        }
+
+
+state = StartupState()
+
+
+# ------------ WARM-UP ------------
+def warm_connections(engine, count: int) -> int:
+    """Open `count` connections at once (at most the pool size) and return them to the pool."""
+    size = getattr(engine.pool, "size", None)
+    count = min(count, size()) if size else min(count, 1)
+    if count <= 0:
+        return 0
+    errors = []
+
+    def ping():
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                barrier.wait(timeout=30)
+        except Exception as exc:  # reported below, from the calling thread
+            errors.append(exc)
+            barrier.abort()
+
+    # Held open together, so the pool really creates `count` connections
+    barrier = threading.Barrier(count)
+    threads = [threading.Thread(target=ping) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    real = [e for e in errors if not isinstance(e, threading.BrokenBarrierError)]
+    if real:
+        raise real[0]
+    return count
+
+
+def warm_reference_caches(session_factory) -> int:
+    """Load the default first page of doctors, lab tests and medicines through their handlers."""
+    from fastapi import Response
+    from pagination import PageParams, DEFAULT_LIMIT
+    from reference_cache import doctors_cache, lab_tests_cache, medicines_cache, warm
+    from routers import doctors, lab, pharmacy
+
+    page = PageParams(limit=DEFAULT_LIMIT, cursor=None, sort=None, order="asc")
+    with session_factory(info={"read_only": True}) as db:
+        return (
+            warm(doctors_cache, doctors.get_all_doctors(response=Response(), page=page, db=db))
+            + warm(lab_tests_cache, lab.list_tests(response=Response(), page=page, db=db))
+            + warm(
+                medicines_cache,
+                pharmacy.list_medicines(response=Response(), page=page, db=db),
+                pharmacy.LIVE_COLUMNS,
+            )
+        )
+
+
+def warm_up():
+    """Connect and preload caches; raises if the database is unreachable."""
+    from database import engine, replica_engines, SessionLocal
+
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        # Serving binary ids from a text-id database (or back) would find nothing
+        ids.check_storage(conn)
+    warmed = {"connections": warm_connections(engine, WARM_CONNECTIONS)}
+    for i, replica in enumerate(replica_engines):
+        warmed[f"replica_{i}_connections"] = warm_connections(replica, WARM_CONNECTIONS)
+    if WARM_CACHES:
+        warmed["reference_rows"] = warm_reference_caches(SessionLocal)
+    state.warmed = warmed
+    state.warmup_seconds = round(time.perf_counter() - started, 3)
+
+
+def _mark_ready():
+    state.ready = True
+    state.error = None
+    state.ready_after = state.since_start()
+    log.info("Worker ready %ss after process start (warm-up %ss, %s)", state.ready_after, state.warmup_seconds, state.warmed)
+
+
+async def _warm_until_ready():
+    delay = WARMUP_RETRY_SECONDS
+    while True:
+        state.attempts += 1
+        try:
+            await asyncio.to_thread(warm_up)
+        except Exception as exc:
+            state.error = f"{type(exc).__name__}: {exc}"
+            log.warning("Warm-up attempt %d failed (%s); retrying in %gs", state.attempts, state.error, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WARMUP_RETRY_MAX_SECONDS)
+        else:
+            _mark_ready()
+            return
+
+
+async def start():
+    """Run from the lifespan hook before the worker starts serving."""
+    if STARTUP_MODE == "production":
+        return asyncio.create_task(_warm_until_ready())
+
+    from database import engine
+    import migrations
+
+    await asyncio.to_thread(migrations.upgrade, engine)
+    state.attempts += 1
+    await asyncio.to_thread(warm_up)
+    _mark_ready()
+    return None
+
+
+# ------------ PROBES ------------
+def liveness():
+    return {"status": "alive", "uptime_seconds": state.since_start()}
+
+
+def readiness():
+    report = state.report()
+    if not state.ready:
+        return JSONResponse(report, status_code=503)
+    return report
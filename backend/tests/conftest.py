@@ -0,0 +1,63 @@
+# tests/conftest.py
+# Runs the app against a throwaway SQLite file. database.py creates its
+# engines at import, so the environment is set before anything imports it.
+import itertools
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="hms-tests-")
+_db_path = os.path.join(_db_dir, "hms.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_path}"
+os.environ["STARTUP_MODE"] = "dev"
+
+import pytest
+from fastapi.testclient import TestClient
+
+_numbers = itertools.count(1)
+
+
+def unique(prefix: str = "") -> str:
+    return f"{prefix}{next(_numbers):06d}"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from main import app
+
+    # Entering the client runs the lifespan, which applies migrations
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db(client):
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def patient(client):
+    def create(**fields):
+        body = {"name": "Test Patient", "phone": unique("555")} | fields
+        r = client.post("/patients/", json=body)
+        assert r.status_code in (200, 201), r.text
+        return r.json()
+
+    return create
+
+
+@pytest.fixture
+def doctor(client):
+    def create(**fields):
+        body = {"name": "Dr Test", "specialization": "General", "phone": unique("777")} | fields
+        r = client.post("/doctors/", json=body)
+        assert r.status_code in (200, 201), r.text
+        return r.json()
+
+    return create
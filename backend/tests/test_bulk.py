@@ -0,0 +1,58 @@
+import bulk
+from conftest import unique
+
+
+def test_rows_are_reported_one_by_one(client):
+    taken = unique("200")
+    client.post("/patients/", json={"name": "Already Here", "phone": taken})
+    fresh = unique("200")
+    rows = [
+        {"name": "Bulk One", "phone": fresh},
+        {"phone": unique("200")},                 # no name
+        {"name": "Bulk Taken", "phone": taken},   # phone already stored
+        {"name": "Bulk Twice", "phone": fresh},   # phone repeated in the upload
+        {"name": "Bulk Two"},
+    ]
+
+    r = client.post("/patients/bulk", json=rows, params={"batch_size": 2})
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["created"], body["failed"]) == (2, 3)
+    assert [row["status"] for row in body["results"]] == ["created", "error", "error", "error", "created"]
+    assert [row["index"] for row in body["results"]] == [0, 1, 2, 3, 4]
+    assert body["results"][1]["error"].startswith("name:")
+    assert body["results"][2]["error"] == f"Duplicate phone: {taken}"
+
+
+def test_rejected_batch_is_replayed_row_by_row(client, monkeypatch):
+    # A concurrent insert the duplicate check cannot see: the batch INSERT
+    # fails on the unique index and every row is retried on its own
+    taken = unique("300")
+    client.post("/patients/", json={"name": "Racer", "phone": taken})
+    monkeypatch.setattr(bulk.BulkLoader, "_drop_duplicates", lambda self, batch: batch)
+    rows = [
+        {"name": "Replay Aster", "phone": unique("300")},
+        {"name": "Replay Birch", "phone": taken},
+        {"name": "Replay Cedar", "phone": unique("300")},
+    ]
+
+    body = client.post("/patients/bulk", json=rows).json()
+    assert [row["status"] for row in body["results"]] == ["created", "error", "created"]
+    assert "UNIQUE" in body["results"][1]["error"]
+
+    created = {row["id"] for row in body["results"] if row["id"]}
+    assert all(client.get(f"/patients/{id}").status_code == 200 for id in created)
+    # The replayed rows are indexed for search like batch inserts
+    found = client.get("/patients/search", params={"q": "replay"}).json()
+    assert {p["id"] for p in found} == created
+
+
+def test_csv_upload(client):
+    phone = unique("400")
+    body = "\ufeffname,phone,age\nCsv Rowan,{0},41\n\"Csv, Quoted\",,\n,{1},3\n".format(phone, unique("400"))
+
+    r = client.post("/patients/bulk/csv", content=body.encode(), params={"batch_size": 1})
+    result = r.json()
+    assert (result["created"], result["failed"]) == (2, 1)
+    names = {p["name"] for p in client.get("/patients/search", params={"q": "csv"}).json()}
+    assert names == {"Csv Rowan", "Csv, Quoted"}
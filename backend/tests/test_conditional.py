@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+
+def test_unchanged_list_is_not_modified(client, patient):
+    patient()
+    first = client.get("/patients/")
+    etag = first.headers["ETag"]
+
+    again = client.get("/patients/", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+
+
+def test_write_changes_the_etag(client, patient):
+    etag = client.get("/patients/").headers["ETag"]
+    patient()
+
+    r = client.get("/patients/", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+
+def test_etag_depends_on_the_query(client, patient):
+    patient()
+    etag = client.get("/patients/", params={"limit": 5}).headers["ETag"]
+
+    r = client.get("/patients/", params={"limit": 6}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+
+
+def test_last_modified_is_the_time_of_the_last_write(client, patient):
+    patient()
+    last_modified = parsedate_to_datetime(client.get("/patients/").headers["Last-Modified"])
+    assert abs(last_modified - datetime.now(timezone.utc)) < timedelta(minutes=1)
@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import models
+
+TOMORROW = (date.today() + timedelta(days=1)).isoformat()
+
+
+@pytest.mark.parametrize("hours", [
+    {"slot_minutes": 0},
+    {"slot_minutes": -15},
+    {"work_start": "17:00", "work_end": "09:00"},
+    {"work_start": "09:00", "work_end": "09:00"},
+])
+def test_invalid_hours_are_rejected(client, hours):
+    r = client.post("/doctors/", json={"name": "Dr Bad Hours", "specialization": "General"} | hours)
+    assert r.status_code == 422
+
+
+def test_database_rejects_invalid_hours(db):
+    db.add(models.Doctor(name="Dr Zero", specialization="General", slot_minutes=0))
+    with pytest.raises(IntegrityError):
+        db.flush()
+
+
+def test_availability_lists_free_slots(client, doctor):
+    d = doctor(work_start="09:00", work_end="10:00", slot_minutes=20)
+
+    r = client.get(f"/doctors/{d['id']}/availability", params={"date": TOMORROW})
+    assert r.status_code == 200
+    assert r.json()["free_slots"] == ["09:00:00", "09:20:00", "09:40:00"]
+
+
+def test_double_booking_is_a_conflict(client, patient, doctor):
+    d = doctor()
+    booking = {"doctor_id": d["id"], "appointment_date": TOMORROW, "appointment_time": "10:00:00"}
+
+    first = client.post("/appointments/", json=booking | {"patient_id": patient()["id"]})
+    assert first.status_code == 200
+    second = client.post("/appointments/", json=booking | {"patient_id": patient()["id"]})
+    assert second.status_code == 409
+    assert second.json()["detail"] == "Doctor is already booked for this slot"
+
+    # Cancelling releases the slot
+    r = client.patch(f"/appointments/{first.json()['id']}/status", params={"status": "cancelled"})
+    assert r.status_code == 200
+    third = client.post("/appointments/", json=booking | {"patient_id": patient()["id"]})
+    assert third.status_code == 200
+
+
+def test_booking_off_the_slot_grid_is_rejected(client, patient, doctor):
+    d = doctor(slot_minutes=30)
+    r = client.post("/appointments/", json={
+        "patient_id": patient()["id"], "doctor_id": d["id"], "appointment_date": TOMORROW, "appointment_time": "10:15:00",
+    })
+    assert r.status_code == 400
@@ -0,0 +1,47 @@
+import asyncio
+import contextvars
+
+from sqlalchemy import text
+
+import database
+
+
+def count_statements(run):
+    # A fresh context, so the stats never leak into other tests' requests
+    def counted():
+        stats = database.track_queries()
+        run()
+        return stats
+
+    return contextvars.copy_context().run(counted)
+
+
+def test_primary_statements_are_counted():
+    def run():
+        with database.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+
+    stats = count_statements(run)
+    assert stats.count == 2
+    assert stats.statements == {"SELECT 1": 1, "SELECT 2": 1}
+
+
+def test_every_engine_from_make_engine_is_counted(tmp_path):
+    replica = database.make_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+
+    def run():
+        with replica.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    assert count_statements(run).count == 1
+    replica.dispose()
+
+
+def test_async_statements_are_counted(client):
+    async def query():
+        async with database.get_async_session_factory()() as db:
+            await db.execute(text("SELECT 1"))
+
+    stats = count_statements(lambda: asyncio.run(query()))
+    assert stats.count == 1
@@ -0,0 +1,70 @@
+from sqlalchemy import create_engine, inspect, text
+
+import migrations
+import models
+
+
+def quiet(message):
+    pass
+
+
+def fresh_engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+
+
+def test_every_migration_applies_to_an_empty_database(tmp_path):
+    engine = fresh_engine(tmp_path)
+    log = []
+    migrations.upgrade(engine, log=log.append)
+
+    versions = [version for version, _, _ in migrations.discover()]
+    assert versions == [f"{n:04d}" for n in range(1, len(versions) + 1)]
+    assert [line.split()[-1][:4] for line in log if line.startswith("Applying")] == versions
+    assert migrations.applied_versions(engine) == set(versions)
+    assert migrations.pending(engine) == []
+
+
+def test_migrated_schema_matches_the_models(tmp_path):
+    engine = fresh_engine(tmp_path)
+    migrations.upgrade(engine, log=quiet)
+    inspector = inspect(engine)
+
+    for table in models.Base.metadata.sorted_tables:
+        assert inspector.has_table(table.name), table.name
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        assert set(table.columns.keys()) <= columns, table.name
+        indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        assert {ix.name for ix in table.indexes} <= indexes, table.name
+
+
+def test_upgrading_twice_changes_nothing(tmp_path):
+    engine = fresh_engine(tmp_path)
+    migrations.upgrade(engine, log=quiet)
+    log = []
+    migrations.upgrade(engine, log=log.append)
+    assert not [line for line in log if line.startswith("Applying")]
+
+
+def test_data_from_before_a_migration_is_carried_forward(tmp_path):
+    engine = fresh_engine(tmp_path)
+    migrations.upgrade(engine, target="0002", log=quiet)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO patients (id, name, phone) VALUES ('p1', 'Legacy Person', '555-0100')"))
+        conn.execute(text("INSERT INTO doctors (id, name, specialization) VALUES ('d1', 'Dr Legacy', 'General')"))
+        # Two bookings of the same slot, from before the slot lock existed
+        for id, created in (("a1", "2024-01-01 08:00:00"), ("a2", "2024-01-01 09:00:00")):
+            conn.execute(text(
+                "INSERT INTO appointments (id, patient_id, doctor_id, appointment_date, appointment_time, status, created_at) "
+                "VALUES (:id, 'p1', 'd1', '2024-02-01', '10:00:00', 'scheduled', :created)"
+            ), {"id": id, "created": created})
+
+    migrations.upgrade(engine, log=quiet)
+    with engine.connect() as conn:
+        slots = dict(conn.execute(text("SELECT id, slot_taken FROM appointments")).all())
+        assert slots == {"a1": 1, "a2": None}
+        assert conn.execute(text("SELECT slot_minutes FROM doctors")).scalar() == 15
+        # Derived tables are filled by the rebuilds that run after the upgrade
+        terms = set(conn.execute(text("SELECT term FROM search_terms WHERE ref_id = 'p1'")).scalars())
+        assert {"legacy", "person"} <= terms
+        assert conn.execute(text("SELECT COUNT(*) FROM patient_match_keys WHERE patient_id = 'p1'")).scalar() > 0
+        assert conn.execute(text("SELECT SUM(appointments) FROM rollup_appointments_daily")).scalar() == 2
@@ -0,0 +1,65 @@
+import pytest
+
+from pagination import NEXT_CURSOR_HEADER, encode_cursor
+
+
+@pytest.fixture
+def bills(client, patient):
+    owner = patient()["id"]
+    # Repeated amounts and same-second created_at values exercise the id tie-breaker
+    for amount in (30, 10, 20, 10, 50, 40, 10):
+        r = client.post("/billing/", json={"patient_id": owner, "description": None, "total_amount": amount})
+        assert r.status_code == 200
+    return owner
+
+
+def walk(client, params):
+    pages, cursor = [], None
+    while True:
+        r = client.get("/billing/", params=params | ({"cursor": cursor} if cursor else {}))
+        assert r.status_code == 200, r.text
+        pages.append(r.json())
+        cursor = r.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return pages
+
+
+@pytest.mark.parametrize("sort", ["created_at", "total_amount"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages_cover_every_row_once_in_order(client, bills, sort, order):
+    params = {"patient_id": bills, "sort": sort, "order": order}
+    everything = client.get("/billing/", params=params).json()
+
+    pages = walk(client, params | {"limit": 3})
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [b["id"] for page in pages for b in page] == [b["id"] for b in everything]
+
+    amounts = [b["total_amount"] for b in everything]
+    if sort == "total_amount":
+        assert amounts == sorted(amounts, reverse=order == "desc")
+
+
+def test_last_page_has_no_cursor(client, bills):
+    r = client.get("/billing/", params={"patient_id": bills, "limit": 7})
+    assert len(r.json()) == 7
+    assert NEXT_CURSOR_HEADER not in r.headers
+
+
+@pytest.mark.parametrize("sort, cursor", [
+    ("created_at", "not a cursor!"),
+    ("created_at", "bm90IGpzb24"),                                                   # base64, not JSON
+    ("created_at", encode_cursor("created_at", "asc", "yesterday", "x")),           # well formed, bad date
+    ("created_at", encode_cursor("created_at", "asc", ["2025-01-01"], "x")),        # value is not a scalar
+    ("created_at", encode_cursor("created_at", "asc", "2025-01-01T00:00:00", 7)),   # id is not a string
+    ("total_amount", encode_cursor("total_amount", "asc", "lots", "x")),            # bad decimal
+])
+def test_malformed_cursor_is_a_bad_request(client, sort, cursor):
+    r = client.get("/billing/", params={"cursor": cursor, "sort": sort})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid cursor"
+
+
+def test_cursor_must_match_the_sort(client):
+    cursor = encode_cursor("created_at", "asc", "2025-01-01T00:00:00", "x")
+    r = client.get("/billing/", params={"cursor": cursor, "order": "desc"})
+    assert r.status_code == 400
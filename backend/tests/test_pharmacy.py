@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import models
+
+
+@pytest.fixture
+def medicine(client):
+    def create(stock, price=2.5):
+        r = client.post("/pharmacy/medicines", json={
+            "name": "Amoxicillin", "batch_no": None, "stock": stock, "price": price, "expiry_date": None,
+        })
+        assert r.status_code == 200, r.text
+        return r.json()["id"]
+
+    return create
+
+
+def stock(db, medicine_id):
+    db.expire_all()
+    return db.get(models.PharmacyMedicine, medicine_id).stock
+
+
+def test_checkout_sells_every_line(client, db, medicine):
+    a, b = medicine(10, price=2.5), medicine(4, price=1)
+    r = client.post("/pharmacy/checkout", json={"items": [
+        {"medicine_id": a, "quantity": 2}, {"medicine_id": b, "quantity": 4}, {"medicine_id": a, "quantity": 1},
+    ]})
+    assert r.status_code == 200, r.text
+    assert r.json()["total_amount"] == 11.5
+    assert (stock(db, a), stock(db, b)) == (7, 0)
+
+
+def test_checkout_never_oversells(client, db, medicine):
+    a = medicine(5)
+    r = client.post("/pharmacy/sell", json={"patient_id": None, "medicine_id": a, "quantity": 6})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Not enough stock"
+    assert stock(db, a) == 5
+
+
+def test_short_line_rolls_back_the_whole_cart(client, db, medicine):
+    plenty, short = medicine(10), medicine(1)
+    r = client.post("/pharmacy/checkout", json={"items": [
+        {"medicine_id": plenty, "quantity": 3}, {"medicine_id": short, "quantity": 2},
+    ]})
+    assert r.status_code == 400
+    assert (stock(db, plenty), stock(db, short)) == (10, 1)
+    assert db.query(models.PharmacySale).filter(models.PharmacySale.medicine_id == plenty).count() == 0
+
+
+def test_concurrent_buyers_share_the_last_units(client, db, medicine):
+    a = medicine(4)
+
+    def buy(_):
+        return client.post("/pharmacy/sell", json={"patient_id": None, "medicine_id": a, "quantity": 1}).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = list(pool.map(buy, range(12)))
+
+    assert sorted(statuses) == [200] * 4 + [400] * 8
+    assert stock(db, a) == 0
+
+
+@pytest.mark.parametrize("items, status", [
+    ([], 400),
+    ([{"medicine_id": "missing", "quantity": 1}], 404),
+])
+def test_invalid_carts_are_rejected(client, items, status):
+    assert client.post("/pharmacy/checkout", json={"items": items}).status_code == status
+
+
+def test_quantity_must_be_positive(client, medicine):
+    r = client.post("/pharmacy/checkout", json={"items": [{"medicine_id": medicine(3), "quantity": 0}]})
+    assert r.status_code == 400
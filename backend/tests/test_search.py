@@ -0,0 +1,31 @@
+from conftest import unique
+from search import CANDIDATE_LIMIT
+
+
+def test_all_words_are_matched_beyond_the_candidate_limit(client):
+    # More rows match the longest word, and sort before the one wanted, than
+    # are ever pulled as candidates
+    rows = [{"name": f"Quilla{i:04d} Other", "phone": unique("100")} for i in range(CANDIDATE_LIMIT + 100)]
+    r = client.post("/patients/bulk", json=rows)
+    assert r.json()["created"] == len(rows)
+    target = client.post("/patients/", json={"name": "Quillzz Zed", "phone": unique("101")}).json()
+
+    r = client.get("/patients/search", params={"q": "quill zed"})
+    assert r.status_code == 200
+    assert [p["id"] for p in r.json()] == [target["id"]]
+
+
+def test_exact_words_rank_first(client, patient):
+    prefix = patient(name="Marlowe Annabel")
+    exact = patient(name="Marlowe Ann")
+
+    r = client.get("/patients/search", params={"q": "marlowe ann"})
+    assert [p["id"] for p in r.json()] == [exact["id"], prefix["id"]]
+
+
+def test_phone_digits_match_either_end(client, patient):
+    found = patient(name="Phone Match", phone="415-867-5309")
+
+    for q in ("415867", "5309"):
+        r = client.get("/patients/search", params={"q": q})
+        assert found["id"] in [p["id"] for p in r.json()]
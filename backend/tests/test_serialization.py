@@ -0,0 +1,88 @@
+import importlib
+import pkgutil
+from datetime import date, timedelta
+
+import pytest
+
+import routers
+from routers import appointments, billing, lab, medical_records, patients, pharmacy
+
+# {FAST_JSON_ROUTERS name: (router module, list path)}
+LISTS = {
+    "patients": (patients, "/patients/"),
+    "appointments": (appointments, "/appointments/"),
+    "billing": (billing, "/billing/"),
+    "lab": (lab, "/lab/reports"),
+    "pharmacy": (pharmacy, "/pharmacy/sales"),
+    "medical_records": (medical_records, "/records/"),
+}
+
+# {FAST_JSON_ROUTERS name: (router module, NDJSON export path)}
+EXPORTS = {
+    "billing": (billing, "/billing/export"),
+    "lab": (lab, "/lab/reports/export"),
+    "pharmacy": (pharmacy, "/pharmacy/sales/export"),
+    "medical_records": (medical_records, "/records/export"),
+}
+
+
+@pytest.fixture(scope="module")
+def owner(client):
+    # Non-ASCII text, quotes, fractional amounts and every date/time type
+    p = client.post("/patients/", json={
+        "name": 'Zoë "Ångström" 李', "phone": "+44 20 7946 0958", "dob": "1980-02-29", "age": 45, "address": "1 Rue d’Été\n2nd floor",
+    }).json()
+    d = client.post("/doctors/", json={"name": "Dr Ünal", "specialization": "Cardiology"}).json()
+    client.post("/appointments/", json={
+        "patient_id": p["id"], "doctor_id": d["id"],
+        "appointment_date": (date.today() + timedelta(days=2)).isoformat(), "appointment_time": "09:15:00",
+    })
+    for amount in (1234.5, 0.1, 99999.99):
+        client.post("/billing/", json={"patient_id": p["id"], "description": "Consultation — follow-up", "total_amount": amount})
+    test = client.post("/lab/tests", json={"test_name": "HbA1c", "description": None, "charges": 12.75}).json()
+    client.post("/lab/reports", json={"patient_id": p["id"], "doctor_id": d["id"], "test_id": test["id"]})
+    medicine = client.post("/pharmacy/medicines", json={
+        "name": "Paracétamol", "batch_no": "B-1", "stock": 100, "price": 0.1, "expiry_date": "2030-12-31",
+    }).json()
+    client.post("/pharmacy/sell", json={"patient_id": p["id"], "medicine_id": medicine["id"], "quantity": 3})
+    client.post("/records/", json={"patient_id": p["id"], "doctor_id": d["id"], "diagnosis": "Ça va 🙂", "prescription": None})
+    return p["id"]
+
+
+def test_every_fast_json_router_is_covered():
+    uses_fast_json = {
+        info.name for info in pkgutil.iter_modules(routers.__path__)
+        if hasattr(importlib.import_module(f"routers.{info.name}"), "FAST_JSON")
+    }
+    assert uses_fast_json == set(LISTS)
+
+
+@pytest.mark.parametrize("name", sorted(LISTS))
+def test_fast_path_matches_the_response_model_path(client, owner, monkeypatch, name):
+    module, path = LISTS[name]
+    params = {} if name == "patients" else {"patient_id": owner}
+
+    monkeypatch.setattr(module, "FAST_JSON", False)
+    regular = client.get(path, params=params)
+    monkeypatch.setattr(module, "FAST_JSON", True)
+    fast = client.get(path, params=params)
+
+    assert regular.status_code == fast.status_code == 200
+    assert regular.json(), "nothing was listed"
+    assert fast.content == regular.content
+    assert fast.headers["content-type"] == regular.headers["content-type"]
+    assert fast.headers["ETag"] == regular.headers["ETag"]
+
+
+@pytest.mark.parametrize("name", sorted(EXPORTS))
+def test_fast_export_matches_the_regular_export(client, owner, monkeypatch, name):
+    module, path = EXPORTS[name]
+
+    monkeypatch.setattr(module, "FAST_JSON", False)
+    regular = client.get(path, params={"patient_id": owner})
+    monkeypatch.setattr(module, "FAST_JSON", True)
+    fast = client.get(path, params={"patient_id": owner})
+
+    assert regular.status_code == fast.status_code == 200
+    assert regular.content.count(b"\n") >= 1
+    assert fast.content == regular.content
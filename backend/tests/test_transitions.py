@@ -0,0 +1,126 @@
+from datetime import date, timedelta
+
+import pytest
+
+TOMORROW = (date.today() + timedelta(days=1)).isoformat()
+
+
+@pytest.fixture
+def appointment(client, patient, doctor):
+    def create():
+        r = client.post("/appointments/", json={
+            "patient_id": patient()["id"], "doctor_id": doctor()["id"],
+            "appointment_date": TOMORROW, "appointment_time": "09:00:00",
+        })
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    return create
+
+
+@pytest.fixture
+def bill(client, patient):
+    def create(**fields):
+        r = client.post("/billing/", json={"patient_id": patient()["id"], "description": "Visit", "total_amount": 50} | fields)
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    return create
+
+
+@pytest.fixture
+def report(client, patient):
+    def create():
+        test = client.post("/lab/tests", json={"test_name": "CBC", "description": None, "charges": 10}).json()
+        r = client.post("/lab/reports", json={"patient_id": patient()["id"], "doctor_id": None, "test_id": test["id"]})
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    return create
+
+
+# ------------ SINGLE ROW ------------
+def test_appointment_status_follows_the_transitions(client, appointment):
+    id = appointment()["id"]
+    assert client.patch(f"/appointments/{id}/status", params={"status": "completed"}).status_code == 200
+
+    r = client.patch(f"/appointments/{id}/status", params={"status": "cancelled"})
+    assert r.status_code == 409
+    assert r.json()["detail"] == "Cannot change from completed to cancelled"
+    assert client.get(f"/appointments/{id}").json()["status"] == "completed"
+
+
+def test_unknown_status_is_rejected(client, appointment):
+    r = client.patch(f"/appointments/{appointment()['id']}/status", params={"status": "lost"})
+    assert r.status_code == 400
+
+
+def test_bill_put_cannot_skip_the_transitions(client, bill):
+    b = bill()
+    paid = client.put(f"/billing/{b['id']}", json=b | {"status": "paid"})
+    assert paid.status_code == 200
+
+    r = client.put(f"/billing/{b['id']}", json=b | {"status": "due"})
+    assert r.status_code == 409
+    # Nothing moves back to pending
+    r = client.put(f"/billing/{b['id']}", json=b | {"status": "pending"})
+    assert r.status_code == 400
+    assert client.get(f"/billing/{b['id']}").json()["status"] == "paid"
+
+    # Edits that keep the status are still allowed
+    r = client.put(f"/billing/{b['id']}", json=b | {"status": "paid", "description": "Visit and X-ray"})
+    assert r.status_code == 200
+
+
+def test_lab_report_status_follows_the_transitions(client, report):
+    id = report()["id"]
+    assert client.patch(f"/lab/reports/{id}/status", json={"status": "cancelled"}).status_code == 200
+    assert client.patch(f"/lab/reports/{id}/status", json={"status": "completed"}).status_code == 409
+
+
+# ------------ BULK ------------
+def test_bulk_moves_allowed_rows_and_reports_the_rest(client, bill):
+    pending, due, paid = bill(), bill(status="due"), bill(status="paid")
+    missing = "00000000-0000-0000-0000-000000000000"
+
+    r = client.patch("/billing/status", json={"status": "due", "ids": [pending["id"], due["id"], paid["id"], missing]})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["updated"] == [pending["id"]]
+    assert {row["id"]: row["reason"] for row in body["rejected"]} == {
+        due["id"]: "Already due",
+        paid["id"]: "Cannot change from paid to due",
+        missing: "Not found",
+    }
+    assert client.get(f"/billing/{pending['id']}").json()["status"] == "due"
+    assert client.get(f"/billing/{paid['id']}").json()["status"] == "paid"
+
+
+def test_bulk_by_filter_respects_from_status(client, patient):
+    owner = patient()["id"]
+    bills = [
+        client.post("/billing/", json={"patient_id": owner, "description": None, "total_amount": 5, "status": s}).json()
+        for s in ("pending", "due", "pending")
+    ]
+
+    r = client.patch("/billing/status", json={"status": "cancelled", "patient_id": owner, "from_status": "pending"})
+    assert sorted(r.json()["updated"]) == sorted(b["id"] for b in bills if b["status"] == "pending")
+    assert client.get(f"/billing/{bills[1]['id']}").json()["status"] == "due"
+
+
+def test_bulk_needs_ids_or_a_filter(client):
+    assert client.patch("/billing/status", json={"status": "paid"}).status_code == 400
+
+
+def test_bulk_rejects_a_status_nothing_leads_to(client, bill):
+    r = client.patch("/billing/status", json={"status": "pending", "ids": [bill()["id"]]})
+    assert r.status_code == 400
+
+
+def test_bulk_cancel_releases_appointment_slots(client, appointment):
+    booked = appointment()
+    r = client.patch("/appointments/status", json={"status": "cancelled", "ids": [booked["id"]]})
+    assert r.json()["updated"] == [booked["id"]]
+
+    again = client.post("/appointments/", json={k: booked[k] for k in ("patient_id", "doctor_id", "appointment_date", "appointment_time")})
+    assert again.status_code == 200
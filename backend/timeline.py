@@ -0,0 +1,181 @@
+# timeline.py
+# One patient's history across appointments, medical records, bills,
+# pharmacy sales and lab reports, newest first.
+#
+# Each source is read with its own (patient_id, date) index, already joined
+# to the doctor / lab test / medicine it references and limited to one page,
+# and the sorted results are merged in Python. The keyset is
+# (occurred_at, id), so every page costs five short index range scans no
+# matter how long the history is. With `include_archive` the same scans also
+# run against the archive tables (see archive.py) and are merged in.
+import heapq
+from datetime import datetime, time
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+from pagination import encode_cursor, decode_cursor
+import models
+
+TIMELINE_TYPES = ("appointment", "medical_record", "bill", "pharmacy_sale", "lab_report")
+
+# Every table an entry is read from, including the joined name lookups
+TIMELINE_TABLES = (
+    "appointments", "medical_records", "billing", "pharmacy_sales", "lab_reports",
+    "doctors", "lab_tests", "pharmacy_medicines",
+)
+
+
+def _before(column, id_column, value: datetime, id: str):
+    return or_(column < value, and_(column == value, id_column < id))
+
+
+def _appointments_before(A, value: datetime, id: str):
+    # Appointments are placed at midnight of their date on the timeline.
+    column = A.appointment_date
+    if value.time() == time.min:
+        return or_(column < value.date(), and_(column == value.date(), A.id < id))
+    return column <= value.date()
+
+
+def _source(model, archived: bool):
+    return models.ARCHIVE_MODELS[model] if archived else model
+
+
+def _appointments(db, patient_id, cursor, limit, archived=False):
+    A, D = _source(models.Appointment, archived), models.Doctor
+    query = (
+        db.query(A.id, A.appointment_date, A.appointment_time, A.status, A.doctor_id, D.name)
+        .outerjoin(D, D.id == A.doctor_id)
+        .filter(A.patient_id == patient_id)
+    )
+    if cursor:
+        query = query.filter(_appointments_before(A, *cursor))
+    rows = query.order_by(A.appointment_date.desc(), A.id.desc()).limit(limit)
+    for id, day, at, status, doctor_id, doctor_name in rows:
+        yield {
+            "type": "appointment", "id": id,
+            "occurred_at": datetime.combine(day, time.min),
+            "title": "Appointment",
+            "detail": at.strftime("%H:%M") if at else None,
+            "status": status, "amount": None,
+            "doctor_id": doctor_id, "doctor_name": doctor_name,
+        }
+
+
+def _medical_records(db, patient_id, cursor, limit, archived=False):
+    R, D = _source(models.MedicalRecord, archived), models.Doctor
+    query = (
+        db.query(R.id, R.visit_date, R.diagnosis, R.prescription, R.doctor_id, D.name)
+        .outerjoin(D, D.id == R.doctor_id)
+        .filter(R.patient_id == patient_id)
+    )
+    if cursor:
+        query = query.filter(_before(R.visit_date, R.id, *cursor))
+    rows = query.order_by(R.visit_date.desc(), R.id.desc()).limit(limit)
+    for id, visit_date, diagnosis, prescription, doctor_id, doctor_name in rows:
+        yield {
+            "type": "medical_record", "id": id,
+            "occurred_at": visit_date,
+            "title": diagnosis or "Medical record",
+            "detail": prescription,
+            "status": None, "amount": None,
+            "doctor_id": doctor_id, "doctor_name": doctor_name,
+        }
+
+
+def _bills(db, patient_id, cursor, limit, archived=False):
+    B = _source(models.Billing, archived)
+    query = db.query(B.id, B.created_at, B.description, B.status, B.total_amount).filter(B.patient_id == patient_id)
+    if cursor:
+        query = query.filter(_before(B.created_at, B.id, *cursor))
+    rows = query.order_by(B.created_at.desc(), B.id.desc()).limit(limit)
+    for id, created_at, description, status, total in rows:
+        yield {
+            "type": "bill", "id": id,
+            "occurred_at": created_at,
+            "title": description or "Bill",
+            "detail": None,
+            "status": status, "amount": float(total),
+            "doctor_id": None, "doctor_name": None,
+        }
+
+
+def _pharmacy_sales(db, patient_id, cursor, limit, archived=False):
+    S, M = _source(models.PharmacySale, archived), models.PharmacyMedicine
+    query = (
+        db.query(S.id, S.sale_date, S.quantity, S.total_amount, M.name)
+        .outerjoin(M, M.id == S.medicine_id)
+        .filter(S.patient_id == patient_id)
+    )
+    if cursor:
+        query = query.filter(_before(S.sale_date, S.id, *cursor))
+    rows = query.order_by(S.sale_date.desc(), S.id.desc()).limit(limit)
+    for id, sale_date, quantity, total, medicine_name in rows:
+        yield {
+            "type": "pharmacy_sale", "id": id,
+            "occurred_at": sale_date,
+            "title": medicine_name or "Pharmacy sale",
+            "detail": f"Qty {quantity}",
+            "status": None, "amount": float(total),
+            "doctor_id": None, "doctor_name": None,
+        }
+
+
+def _lab_reports(db, patient_id, cursor, limit, archived=False):
+    L, T, D = _source(models.LabReport, archived), models.LabTest, models.Doctor
+    query = (
+        db.query(L.id, L.test_date, L.result, L.status, L.doctor_id, T.test_name, D.name)
+        .outerjoin(T, T.id == L.test_id)
+        .outerjoin(D, D.id == L.doctor_id)
+        .filter(L.patient_id == patient_id)
+    )
+    if cursor:
+        query = query.filter(_before(L.test_date, L.id, *cursor))
+    rows = query.order_by(L.test_date.desc(), L.id.desc()).limit(limit)
+    for id, test_date, result, status, doctor_id, test_name, doctor_name in rows:
+        yield {
+            "type": "lab_report", "id": id,
+            "occurred_at": test_date,
+            "title": test_name or "Lab report",
+            "detail": result,
+            "status": status, "amount": None,
+            "doctor_id": doctor_id, "doctor_name": doctor_name,
+        }
+
+
+SOURCES = {
+    "appointment": _appointments,
+    "medical_record": _medical_records,
+    "bill": _bills,
+    "pharmacy_sale": _pharmacy_sales,
+    "lab_report": _lab_reports,
+}
+
+
+def patient_timeline(db, patient_id: str, types, limit: int, cursor: str = None, include_archive: bool = False):
+    """
+    Return (entries, next_cursor) for one page of the patient's timeline.
+    """
+    position = None
+    if cursor:
+        sort, order, value, id = decode_cursor(cursor)
+        if sort != "occurred_at" or order != "desc":
+            raise HTTPException(400, "Invalid cursor")
+        try:
+            position = (datetime.fromisoformat(value), id)
+        except (TypeError, ValueError):
+            raise HTTPException(400, "Invalid cursor")
+
+    sources = [list(SOURCES[t](db, patient_id, position, limit + 1)) for t in types]
+    if include_archive:
+        sources += [list(SOURCES[t](db, patient_id, position, limit + 1, archived=True)) for t in types]
+    merged = heapq.merge(*sources, key=lambda e: (e["occurred_at"] or datetime.min, e["id"]), reverse=True)
+    entries = [entry for _, entry in zip(range(limit + 1), merged)]
+
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        last = entries[-1]
+        next_cursor = encode_cursor("occurred_at", "desc", last["occurred_at"], last["id"])
+    return entries, next_cursor
@@ -0,0 +1,157 @@
+# transitions.py
+"""
+Allowed status changes, single-row checks and set-based bulk transitions.
+
+Every ORM write of `status` on an existing row (PATCH, PUT, async CRUD) is
+checked against the allowed changes by an attribute listener, so no route
+can skip them. `bulk_transition` moves many rows to a new status with one UPDATE per
+batch of ids instead of one get/commit per row. The UPDATE bypasses the
+unit of work, so it does by hand what the flush hooks do for ORM writes:
+it adjusts the daily rollups, marks the table changed (ETags and caches)
+and records appointment events for the live queue feed.
+"""
+from fastapi import HTTPException
+from sqlalchemy import event, inspect, select, update
+
+from cache import mark_changed
+import live
+import models
+import rollups
+
+# {current status: statuses it may move to}
+APPOINTMENT_TRANSITIONS = {
+    "scheduled": {"completed", "cancelled", "no_show"},
+}
+BILLING_TRANSITIONS = {
+    "pending": {"due", "paid", "cancelled"},
+    "due": {"paid", "cancelled"},
+}
+LAB_REPORT_TRANSITIONS = {
+    "pending": {"completed", "cancelled"},
+}
+
+TRANSITIONS = {
+    models.Appointment: APPOINTMENT_TRANSITIONS,
+    models.Billing: BILLING_TRANSITIONS,
+    models.LabReport: LAB_REPORT_TRANSITIONS,
+}
+
+BATCH_SIZE = 500
+
+
+def _appointment_values(status):
+    return {"slot_taken": None if status in models.SLOT_RELEASING_STATUSES else 1}
+
+
+EXTRA_VALUES = {models.Appointment: _appointment_values}
+
+# {model: (columns to select, callback(db, moved rows, status))} run for the rows moved
+WATCHERS = {models.Appointment: (live.APPOINTMENT_FIELDS, live.record_status_changes)}
+
+
+def _check_target(transitions: dict, status: str) -> list:
+    """Statuses that may move to `status`; 400 if none can."""
+    allowed_from = sorted(current for current, targets in transitions.items() if status in targets)
+    if not allowed_from:
+        raise HTTPException(400, f"Invalid status, expected one of: {', '.join(sorted(set().union(*transitions.values())))}")
+    return allowed_from
+
+
+def check_transition(transitions: dict, current: str, status: str) -> bool:
+    """
+    Validate moving one row from `current` to `status`: 400 for a status no
+    transition leads to, 409 when `current` may not move to it. Returns False
+    when the row already has that status, so there is nothing to write.
+    """
+    allowed_from = _check_target(transitions, status)
+    if current == status:
+        return False
+    if current not in allowed_from:
+        raise HTTPException(409, f"Cannot change from {current} to {status}")
+    return True
+
+
+def _listen_for_status(model, transitions):
+    # active_history loads the stored status before it is replaced, so the
+    # check sees it even when the row's attributes were expired by a commit
+    @event.listens_for(model.status, "set", active_history=True)
+    def check(target, value, oldvalue, initiator):
+        if inspect(target).persistent and value != oldvalue:
+            check_transition(transitions, oldvalue, value)
+
+
+for _model, _transitions in TRANSITIONS.items():
+    _listen_for_status(_model, _transitions)
+
+
+def bulk_transition(db, model, transitions: dict, payload, conditions: list):
+    """
+    Move the rows picked by `payload.ids` or `conditions` to `payload.status`.
+
+    Rows whose current status may not move to the new one are left alone and
+    reported in `rejected` with the reason, as are ids that do not exist.
+    """
+    status = payload.status
+    allowed_from = _check_target(transitions, status)
+    if payload.ids is None and not conditions:
+        raise HTTPException(400, "Provide ids or at least one filter")
+
+    if payload.from_status is not None:
+        conditions = [*conditions, model.status == payload.from_status]
+
+    rollup = rollups.BY_SOURCE.get(model)
+    columns = {"id", "status"}
+    if rollup is not None:
+        columns |= {rollup.timestamp, *rollup.keys.values(), *(a for a in rollup.measures.values() if a)}
+    watcher = WATCHERS.get(model)
+    if watcher is not None:
+        columns |= set(watcher[0])
+    columns = [getattr(model, name) for name in sorted(columns)]
+
+    def candidates(where):
+        # Locked until commit, so the status checked here is the one updated
+        return db.execute(select(*columns).where(*where).with_for_update()).mappings().all()
+
+    if payload.ids is not None:
+        ids = list(dict.fromkeys(payload.ids))
+        rows = []
+        for start in range(0, len(ids), BATCH_SIZE):
+            rows += candidates([model.id.in_(ids[start:start + BATCH_SIZE]), *conditions])
+    else:
+        ids = None
+        rows = candidates(conditions)
+
+    found = {row["id"] for row in rows}
+    rejected = [{"id": id, "reason": "Not found"} for id in ids or () if id not in found]
+    movable = []
+    for row in rows:
+        if row["status"] == status:
+            rejected.append({"id": row["id"], "reason": f"Already {status}"})
+        elif row["status"] not in allowed_from:
+            rejected.append({"id": row["id"], "reason": f"Cannot change from {row['status']} to {status}"})
+        else:
+            movable.append(row)
+
+    values = {"status": status, **EXTRA_VALUES.get(model, lambda s: {})(status)}
+    for start in range(0, len(movable), BATCH_SIZE):
+        batch = [row["id"] for row in movable[start:start + BATCH_SIZE]]
+        db.execute(
+            update(model)
+            .where(model.id.in_(batch), model.status.in_(allowed_from))
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+
+    if movable:
+        if rollup is not None:
+            deltas = {}
+            for row in movable:
+                rollups.add_contribution(deltas, rollup, row.get, sign=-1)
+                rollups.add_contribution(deltas, rollup, lambda attr: status if attr == "status" else row[attr])
+            mark_changed(db, *rollups.apply_deltas(db.connection(), deltas))
+        mark_changed(db, model.__tablename__)
+        if watcher is not None:
+            watcher[1](db, movable, status)
+    db.commit()
+
+    return {"status": status, "updated": [row["id"] for row in movable], "rejected": rejected}
@@ -2,7 +2,7 @@
 
 import { useState } from "react";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { api } from "@/lib/api";
+import { api, getAll } from "@/lib/api";
 
 import { Loader2, Trash2, Pencil, Plus } from "lucide-react";
 
@@ -17,12 +17,12 @@ export default function BillingPage() {
   // ---------------- Queries ----------------
   const { data: bills = [], isLoading } = useQuery({
     queryKey: ["billing"],
-    queryFn: () => api.get("/billing/"),
+    queryFn: () => getAll("/billing/"),
   });
 
   const { data: patients = [] } = useQuery({
     queryKey: ["patients"],
-    queryFn: () => api.get("/patients/"),
+    queryFn: () => getAll("/patients/"),
   });
 
   // ---------------- State ----------------
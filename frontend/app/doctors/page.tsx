@@ -1,7 +1,7 @@
 "use client";
 
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { api } from "@/lib/api";
+import { api, getAll } from "@/lib/api";
 import { useState } from "react";
 import { Plus, Pencil, Trash2 } from "lucide-react";
 
@@ -16,7 +16,7 @@ export default function DoctorsPage() {
 
   const { data: doctors = [] } = useQuery({
     queryKey: ["doctors"],
-queryFn: () => api.get("/doctors/"),
+queryFn: () => getAll("/doctors/"),
   });
 
   const createDoctor = useMutation({
@@ -3,7 +3,7 @@
 
 import { useState, useMemo } from "react";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { api } from "@/lib/api";
+import { api, getAll } from "@/lib/api";
 import { Plus, Pencil, Trash2, Loader2 } from "lucide-react";
 
 /* ---------------------- Reusable UI ---------------------- */
@@ -159,7 +159,7 @@ export default function LabPage() {
     queryKey: ["lab-tests"],
     queryFn: async () => {
       try {
-        const d = await api.get("/lab/tests/");
+        const d = await getAll("/lab/tests/");
         return d ?? [];
       } catch {
         return [];
@@ -171,7 +171,7 @@ export default function LabPage() {
     queryKey: ["lab-reports"],
     queryFn: async () => {
       try {
-        const d = await api.get("/lab/reports/");
+        const d = await getAll("/lab/reports/");
         return d ?? [];
       } catch {
         return [];
@@ -183,7 +183,7 @@ export default function LabPage() {
     queryKey: ["patients"],
     queryFn: async () => {
       try {
-        const d = await api.get("/patients/");
+        const d = await getAll("/patients/");
         return d ?? [];
       } catch {
         return [];
@@ -195,7 +195,7 @@ export default function LabPage() {
     queryKey: ["doctors"],
     queryFn: async () => {
       try {
-        const d = await api.get("/doctors/");
+        const d = await getAll("/doctors/");
         return d ?? [];
       } catch {
         return [];
@@ -764,8 +764,10 @@ export default function LabPage() {
                   }
                   className="w-full input mt-1"
                 >
-                  <option value="pending">pending</option>
+                  {/* pending -> completed | cancelled only (see backend transitions.py) */}
+                  <option value="pending" disabled>pending</option>
                   <option value="completed">completed</option>
+                  <option value="cancelled">cancelled</option>
                 </select>
               </div>
 
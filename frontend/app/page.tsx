@@ -2,7 +2,7 @@
 
 import { useState } from "react";
 import { useQuery } from "@tanstack/react-query";
-import { api } from "@/lib/api";
+import { api, getAll } from "@/lib/api";
 import { Users, Stethoscope, Calendar, CreditCard } from "lucide-react";
 import { CardMetric } from "@/components/CardMetric";
 
@@ -78,22 +78,22 @@ export default function DashboardPage() {
   /* Queries */
   const { data: patients = [] } = useQuery({
     queryKey: ["patients"],
-    queryFn: () => api.get("/patients/"),
+    queryFn: () => getAll("/patients/"),
   });
 
   const { data: doctors = [] } = useQuery({
     queryKey: ["doctors"],
-    queryFn: () => api.get("/doctors/"),
+    queryFn: () => getAll("/doctors/"),
   });
 
   const { data: appointments = [] } = useQuery({
     queryKey: ["appointments"],
-    queryFn: () => api.get("/appointments/"),
+    queryFn: () => getAll("/appointments/"),
   });
 
-  const { data: bills = [] } = useQuery({
-    queryKey: ["billing"],
-    queryFn: () => api.get("/billing/"),
+  const { data: stats } = useQuery({
+    queryKey: ["stats"],
+    queryFn: () => api.get("/stats/summary"),
   });
 
   /* Lookups */
@@ -183,18 +183,18 @@ export default function DashboardPage() {
 
       {/* Metrics */}
       <div className="grid grid-cols-1 md:grid-cols-4 gap-6">
-        <CardMetric title="Patients" value={patients.length} icon={<Users />} />
+        <CardMetric title="Patients" value={stats?.patients ?? 0} icon={<Users />} />
         <CardMetric
           title="Doctors"
-          value={doctors.length}
+          value={stats?.doctors ?? 0}
           icon={<Stethoscope />}
         />
         <CardMetric
           title="Appointments"
-          value={appointments.length}
+          value={stats?.appointments ?? 0}
           icon={<Calendar />}
         />
-        <CardMetric title="Bills" value={bills.length} icon={<CreditCard />} />
+        <CardMetric title="Bills" value={stats?.bills ?? 0} icon={<CreditCard />} />
       </div>
 
       {/* Charts */}
@@ -2,7 +2,7 @@
 
 import { useState, useMemo } from "react";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { api } from "@/lib/api";
+import { api, getAll } from "@/lib/api";
 import { Plus, Pencil, Trash2 } from "lucide-react";
 
 /* ============================================================
@@ -118,17 +118,17 @@ export default function PharmacyPage() {
   /* ----------- Queries ----------- */
   const { data: meds = [] } = useQuery({
     queryKey: ["medicines"],
-    queryFn: () => api.get("/pharmacy/medicines/"),
+    queryFn: () => getAll("/pharmacy/medicines/"),
   });
 
   const { data: sales = [] } = useQuery({
     queryKey: ["sales"],
-    queryFn: () => api.get("/pharmacy/sales/"),
+    queryFn: () => getAll("/pharmacy/sales/"),
   });
 
   const { data: patients = [] } = useQuery({
     queryKey: ["patients"],
-    queryFn: () => api.get("/patients/"),
+    queryFn: () => getAll("/patients/"),
   });
 
   /* ----------- Mutations ----------- */
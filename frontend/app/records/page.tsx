@@ -2,7 +2,7 @@
 
 import { useState } from "react";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { api } from "@/lib/api";
+import { api, getAll } from "@/lib/api";
 
 import { Pencil, Trash2, Loader2, Plus } from "lucide-react";
 
@@ -24,18 +24,18 @@ export default function RecordsPage() {
   // ---------------- FETCH RECORDS ----------------
   const { data: records = [], isLoading } = useQuery({
     queryKey: ["records"],
-    queryFn: () => api.get("/records/"),
+    queryFn: () => getAll("/records/"),
   });
 
   // Patient and Doctor List (for selection modal)
   const { data: patients = [] } = useQuery({
     queryKey: ["patients"],
-    queryFn: () => api.get("/patients/"),
+    queryFn: () => getAll("/patients/"),
   });
 
   const { data: doctors = [] } = useQuery({
     queryKey: ["doctors"],
-    queryFn: () => api.get("/doctors/"),
+    queryFn: () => getAll("/doctors/"),
   });
 
   // ---------------- MUTATIONS ----------------
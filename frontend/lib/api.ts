@@ -10,3 +10,21 @@ api.interceptors.response.use(
   (res) => res.data,
   (err) => Promise.reject(err?.response?.data || { message: "Unknown error" })
 );
+
+// List endpoints return one page at a time (up to `limit` rows, 100 by
+// default); follow the X-Next-Cursor header until the last page.
+export async function getAll(url: string, params: Record<string, any> = {}) {
+  const items: any[] = [];
+  let cursor: string | undefined = undefined;
+  do {
+    const res = await axios
+      .get(url, {
+        baseURL: api.defaults.baseURL,
+        params: { ...params, limit: 1000, cursor },
+      })
+      .catch((err) => Promise.reject(err?.response?.data || { message: "Unknown error" }));
+    items.push(...res.data);
+    cursor = res.headers["x-next-cursor"] || undefined;
+  } while (cursor);
+  return items;
+}
@@ -1,5 +1,5 @@
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { api } from "@/lib/api";
+import { api, getAll } from "@/lib/api";
 
 const trimTrailing = (u = "") => u.replace(/\/$/, "");
 
@@ -9,7 +9,7 @@ export function useCrud(key: string, url: string) {
 
   const list = useQuery({
     queryKey: [key],
-    queryFn: () => api.get(base),
+    queryFn: () => getAll(base),
     staleTime: 1000 * 30,
   });
 